@@ -0,0 +1,114 @@
+"""
+Budget Alert Batch Benchmark
+Counts AWS API calls made by the budget alert handler for a burst of alerts
+
+Delivers N SNS records in one invocation and compares per-record
+processing without the Cost Explorer cache, the baseline, with batch mode
+and the cache, then redelivers the same records. The cache and the
+deduplication store start empty in each scenario.
+
+Usage:
+    python benchmarks/budget_alert_batch.py [--alerts 10]
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['COST_CACHE_PERSIST'] = 'false'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'notifications'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared', 'python'))
+
+import budget_alert_handler  # noqa: E402
+import cost_query  # noqa: E402
+from cost_cache import CostCache  # noqa: E402
+from alert_dedup import LocalClaimStore  # noqa: E402
+
+
+class StubClient:
+    """Records calls to the handful of operations the handler uses"""
+
+    def __init__(self, service_name: str, calls: Counter):
+        self.service_name = service_name
+        self.calls = calls
+
+    def get_cost_and_usage(self, **kwargs):
+        self.calls['ce:GetCostAndUsage'] += 1
+        return {'ResultsByTime': [{'Groups': [
+            {'Keys': ['Amazon EC2', 'dev'], 'Metrics': {'UnblendedCost': {'Amount': '100.0'}}}
+        ]}]}
+
+    def invoke(self, **kwargs):
+        self.calls['lambda:Invoke'] += 1
+        return {'StatusCode': 202}
+
+    def publish(self, **kwargs):
+        self.calls['sns:Publish'] += 1
+        return {'MessageId': 'stub'}
+
+
+def build_event(count: int):
+    """Build an SNS event with one record per budget, thresholds 70-110%"""
+    records = []
+    for i in range(count):
+        message = {
+            'budgetName': f"budget-{i}",
+            'threshold': 70 + (i * 10) % 50,
+            'actualSpend': 900.0 + i,
+            'forecastedSpend': 1100.0 + i
+        }
+        records.append({'EventSource': 'aws:sns', 'Sns': {'Message': json.dumps(message)}})
+    return {'Records': records}
+
+
+def run_scenario(count: int, batch: bool, deliveries: int = 1, cached: bool = True) -> Counter:
+    """
+    Deliver count alerts deliveries times and return the API call counts of the last delivery
+
+    Without cached, every Cost Explorer query misses, as before the cache existed.
+    """
+    calls = Counter()
+    factory = lambda service_name, region=None: StubClient(service_name, calls)  # noqa: E731
+    budget_alert_handler.get_client = factory
+    cost_query.get_client = factory
+    budget_alert_handler.ENVIRONMENT = 'dev'
+    budget_alert_handler.COST_OPTIMIZER_LAMBDA_ARN = 'arn:aws:lambda:us-east-1:123456789012:function:optimizer'
+    budget_alert_handler.OPERATIONS_SNS_TOPIC_ARN = 'arn:aws:sns:us-east-1:123456789012:operations'
+    budget_alert_handler.BATCH_ALERTS = batch
+    budget_alert_handler.cost_cache = CostCache() if cached else CostCache(ttl_seconds=0, stale_seconds=0)
+    budget_alert_handler.alert_deduplicator.store = LocalClaimStore()
+
+    for _ in range(deliveries):
+        calls.clear()
+        budget_alert_handler.lambda_handler(build_event(count), None)
+    return calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--alerts', type=int, default=10)
+    args = parser.parse_args()
+
+    # Silence the handler's logging
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        before = run_scenario(args.alerts, batch=False, cached=False)
+        after = run_scenario(args.alerts, batch=True)
+        redelivered = run_scenario(args.alerts, batch=True, deliveries=2)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"API calls for {args.alerts} budget alerts in one invocation")
+    print(f"{'scenario':<24}{'ce':>6}{'invoke':>8}{'publish':>9}{'total':>7}")
+    for label, calls in (('per-record, no cache', before), ('batch, cached', after),
+                         ('batch, redelivered', redelivered)):
+        print(f"{label:<24}{calls['ce:GetCostAndUsage']:>6}{calls['lambda:Invoke']:>8}"
+              f"{calls['sns:Publish']:>9}{sum(calls.values()):>7}")
+
+
+if __name__ == '__main__':
+    main()
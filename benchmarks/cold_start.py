@@ -0,0 +1,107 @@
+"""
+Cold-Start Benchmark
+Times handler import plus AWS client construction per action in fresh interpreters
+
+The eager scenario builds every client the Lambda modules used to create at
+import time; the lazy scenarios build only the clients each action touches
+through the shared client registry.
+
+boto3's own import is reported apart from the handler's: every path pays
+it, and it dwarfs the handler modules. Scenarios run interleaved so that
+drift on the host spreads evenly, and the spread column is the
+interquartile range of the totals; differences inside it are noise.
+
+Usage:
+    python benchmarks/cold_start.py [--repeat 11]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SHARED_PATH = os.path.join(ROOT, 'lambda', 'shared', 'python')
+
+# (label, package dir, handler module, clients built, eager)
+SCENARIOS = [
+    ('cost_optimizer eager (import-time clients)', 'cost_optimizer', 'stop_dev_instances',
+     ['ec2', 'rds', 'ecs', 'sns', 'ecs'], True),
+    ('cost_optimizer stop_dev_instances (lazy)', 'cost_optimizer', 'stop_dev_instances',
+     ['ec2', 'rds', 'sns'], False),
+    ('cost_optimizer scale_ecs_tasks (lazy)', 'cost_optimizer', 'stop_dev_instances',
+     ['ecs', 'sns'], False),
+    ('budget_handler eager (import-time clients)', 'notifications', 'budget_alert_handler',
+     ['lambda', 'sns', 'ce'], True),
+    ('budget_handler monitoring alert (lazy)', 'notifications', 'budget_alert_handler',
+     ['ce', 'sns'], False),
+    ('budget_handler optimizing alert (lazy)', 'notifications', 'budget_alert_handler',
+     ['ce', 'lambda', 'sns'], False),
+]
+
+CHILD = '''
+import json, sys, time
+sys.path[:0] = [{package_path!r}, {shared_path!r}]
+start = time.perf_counter()
+import boto3
+boto3_loaded = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+if {eager!r}:
+    import boto3
+    for service_name in {services!r}:
+        boto3.client(service_name)
+else:
+    from aws_clients import get_client
+    for service_name in {services!r}:
+        get_client(service_name)
+done = time.perf_counter()
+print(json.dumps({{
+    'boto3_ms': (boto3_loaded - start) * 1000,
+    'import_ms': (imported - boto3_loaded) * 1000,
+    'clients_ms': (done - imported) * 1000
+}}))
+'''
+
+
+def run_once(package: str, module: str, services, eager: bool):
+    code = CHILD.format(
+        package_path=os.path.join(ROOT, 'lambda', package),
+        shared_path=SHARED_PATH,
+        module=module,
+        services=services,
+        eager=eager
+    )
+    env = {**os.environ, 'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-east-1')}
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=11)
+    args = parser.parse_args()
+
+    samples = {label: [] for label, *_ in SCENARIOS}
+    for _ in range(args.repeat):
+        for label, package, module, services, eager in SCENARIOS:
+            samples[label].append(run_once(package, module, services, eager))
+
+    print(f"Cold start, median of {args.repeat} fresh interpreters (ms)")
+    print(f"{'scenario':<46}{'clients':>9}{'boto3':>9}{'handler':>9}{'client init':>13}{'total':>9}{'spread':>9}")
+    for label, package, module, services, eager in SCENARIOS:
+        runs = samples[label]
+        totals = [s['boto3_ms'] + s['import_ms'] + s['clients_ms'] for s in runs]
+        quartiles = statistics.quantiles(totals, n=4) if len(totals) > 1 else [0, 0, 0]
+        print(
+            f"{label:<46}{len(services):>9}"
+            f"{statistics.median(s['boto3_ms'] for s in runs):>9.1f}"
+            f"{statistics.median(s['import_ms'] for s in runs):>9.1f}"
+            f"{statistics.median(s['clients_ms'] for s in runs):>13.1f}"
+            f"{statistics.median(totals):>9.1f}{quartiles[2] - quartiles[0]:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Fleet Benchmark
+Drives both Lambda handlers end to end against synthetic fleets in a fake AWS
+
+Each scenario builds a fresh fleet, runs any setup invocations untimed,
+then times one lambda_handler invocation and reports wall time, API calls
+(attempts, retries included), throttled attempts, peak Python memory
+allocated during the invocation and the estimated hourly savings the
+optimizer reported.
+
+Usage:
+    python benchmarks/fleet.py [--sizes 10000,100000] [--latency-ms 5]
+                               [--throttle-rate 0.01] [--scenario stop]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+STATE_DIR = tempfile.mkdtemp(prefix='fleet-benchmark-')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.pop('STATE_BUCKET', None)
+os.environ['STATE_DIR'] = STATE_DIR
+os.environ['COST_CACHE_PERSIST'] = 'false'
+os.environ['INVENTORY_TABLE'] = 'inventory'
+os.environ['ENVIRONMENT'] = 'dev'
+os.environ['SNS_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789012:operations'
+os.environ['OPERATIONS_SNS_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789012:operations'
+os.environ['COST_OPTIMIZER_LAMBDA_ARN'] = 'arn:aws:lambda:us-east-1:123456789012:function:optimizer'
+os.environ['RESTORE_POLL_SECONDS'] = '0'
+os.environ['MONTHLY_BUDGET_LIMIT'] = '50000'
+# The fake AWS is shared with the cost optimizer's tests
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'cost_optimizer', 'tests'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'notifications'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'cost_optimizer'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared', 'python'))
+
+import budget_alert_handler  # noqa: E402
+import stop_dev_instances  # noqa: E402
+from alert_dedup import LocalClaimStore  # noqa: E402
+from fake_aws import FakeAWS, build_fleet  # noqa: E402
+from rate_limiter import rate_limiters  # noqa: E402
+
+
+def budget_event(count: int):
+    """SNS event carrying count budget alerts at thresholds 70-110%"""
+    records = []
+    for i in range(count):
+        message = {
+            'budgetName': f"budget-{i}",
+            'threshold': 70 + (i * 10) % 50,
+            'actualSpend': 900.0 + i,
+            'forecastedSpend': 1100.0 + i
+        }
+        records.append({'EventSource': 'aws:sns', 'Sns': {'Message': json.dumps(message)}})
+    return {'Records': records}
+
+
+# (name, handler, setup events, timed event)
+SCENARIOS = [
+    ('stop-dry-run', stop_dev_instances.lambda_handler, [],
+     {'action': 'stop_dev_instances', 'dry_run': True}),
+    ('stop', stop_dev_instances.lambda_handler, [],
+     {'action': 'stop_dev_instances'}),
+    ('stop-aggressive', stop_dev_instances.lambda_handler, [],
+     {'action': 'stop_dev_instances', 'aggressive': True}),
+    ('stop-budgeted', stop_dev_instances.lambda_handler, [],
+     {'action': 'stop_dev_instances', 'aggressive': True, 'api_call_budget': 100}),
+    ('scale-ecs', stop_dev_instances.lambda_handler, [],
+     {'action': 'scale_ecs_tasks'}),
+    ('reconcile', stop_dev_instances.lambda_handler, [],
+     {'action': 'reconcile_inventory'}),
+    ('stop-indexed', stop_dev_instances.lambda_handler, [{'action': 'reconcile_inventory'}],
+     {'action': 'stop_dev_instances', 'use_inventory': True}),
+    ('apply-plan', stop_dev_instances.lambda_handler, [{'action': 'stop_dev_instances', 'mode': 'plan'}],
+     {'action': 'apply'}),
+    ('restore', stop_dev_instances.lambda_handler,
+     [{'action': 'stop_dev_instances'}, {'action': 'scale_ecs_tasks'}],
+     {'action': 'restore'}),
+    ('budget-alerts', budget_alert_handler.lambda_handler, [],
+     budget_event(10)),
+    ('forecast-cold', budget_alert_handler.lambda_handler, [],
+     {'action': 'forecast'}),
+    ('forecast', budget_alert_handler.lambda_handler, [{'action': 'forecast'}],
+     {'action': 'forecast'}),
+]
+
+
+def reset_state():
+    """Clear persisted run state and in-memory caches between scenarios"""
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+    os.makedirs(STATE_DIR)
+    budget_alert_handler.cost_cache.invalidate()
+    budget_alert_handler.alert_deduplicator.store = LocalClaimStore()
+    # Every scenario starts from the initial rates, as a cold container would
+    rate_limiters.clear()
+
+
+def run_scenario(scenario, size: int, args) -> dict:
+    name, handler, setup, event = scenario
+    reset_state()
+    fake = FakeAWS(build_fleet(size, seed=args.seed), latency_ms=args.latency_ms,
+                   throttle_rate=args.throttle_rate, cost_groups_count=max(100, size // 10), seed=args.seed)
+    fake.install()
+
+    for setup_event in setup:
+        response = handler(setup_event, None)
+        if setup_event.get('mode') == 'plan':
+            event = {**event, 'plan_id': json.loads(response['body'])['plan_id']}
+    fake.calls.clear()
+    fake.throttles.clear()
+
+    if args.memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    response = handler(event, None)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if args.memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'scenario': name,
+        'size': size,
+        'status': response['statusCode'],
+        'seconds': round(elapsed, 3),
+        'calls': fake.total_calls(),
+        'throttles': sum(fake.throttles.values()),
+        'peak_mb': round(peak / 1024 / 1024, 1),
+        'saved_per_hour': json.loads(response['body']).get('savings', {}).get('hourly_savings', 0),
+        'body_kb': round(len(response['body']) / 1024, 1),
+        'report_records': json.loads(response['body']).get('report', {}).get('records', 0),
+        'by_operation': dict(fake.calls)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000', help='Comma-separated fleet sizes')
+    parser.add_argument('--scenario', action='append', help='Only run these scenarios (repeatable)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every API attempt')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probability an attempt is throttled')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='Skip tracemalloc, which slows the timed invocation')
+    parser.add_argument('--json', action='store_true', help='Print one JSON result per line')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    scenarios = [s for s in SCENARIOS if not args.scenario or s[0] in args.scenario]
+
+    results = []
+    for size in sizes:
+        for scenario in scenarios:
+            # Silence the handlers' logging
+            stdout = sys.stdout
+            sys.stdout = open(os.devnull, 'w')
+            try:
+                result = run_scenario(scenario, size, args)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            results.append(result)
+            if args.json:
+                print(json.dumps(result))
+
+    shutil.rmtree(STATE_DIR, ignore_errors=True)
+    if args.json:
+        return
+
+    print(f"Fleet benchmark (latency {args.latency_ms}ms, throttle rate {args.throttle_rate})")
+    print(f"{'scenario':<16}{'size':>8}{'status':>8}{'seconds':>10}{'calls':>8}{'throttled':>11}{'peak MB':>9}"
+          f"{'saved $/h':>11}{'body KB':>9}{'report':>8}")
+    for result in results:
+        print(f"{result['scenario']:<16}{result['size']:>8}{result['status']:>8}{result['seconds']:>10}"
+              f"{result['calls']:>8}{result['throttles']:>11}{result['peak_mb']:>9}{result['saved_per_hour']:>11}"
+              f"{result['body_kb']:>9}{result['report_records']:>8}")
+
+
+if __name__ == '__main__':
+    main()
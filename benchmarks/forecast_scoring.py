@@ -0,0 +1,79 @@
+"""
+Spend Forecast Benchmark
+Times vectorized trend and anomaly scoring over a synthetic daily cost history
+
+Builds a (series x day) history with a weekly cycle, a trend per series
+and a few injected spikes, then times score_history over all series at
+once and a state store save/load round trip.
+
+Usage:
+    python benchmarks/forecast_scoring.py [--series 9000] [--days 90]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'notifications'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared', 'python'))
+
+from spend_forecast import CostHistory, HISTORY_KEY, numpy_available, score_history  # noqa: E402
+from state_store import LocalStateStore  # noqa: E402
+
+
+def build_history(series: int, days: int, today: date, seed: int = 0) -> CostHistory:
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    base = rng.gamma(2.0, 20.0, size=(series, 1))
+    trend = rng.normal(0, 0.002, size=(series, 1)) * base * t
+    weekly = 1 + 0.1 * np.sin(2 * np.pi * t / 7)
+    costs = np.clip(base * weekly + trend + rng.normal(0, 0.05, size=(series, days)) * base, 0, None)
+    spikes = rng.choice(series, size=max(1, series // 500), replace=False)
+    costs[spikes, -1] *= 5
+    keys = [(f"Service {i % 300}", f"{100000000000 + i // 300}") for i in range(series)]
+    return CostHistory(['SERVICE', 'LINKED_ACCOUNT'], today - timedelta(days=days), keys, costs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=9000, help='Service x account series')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not numpy_available():
+        print("numpy is not installed, skipping spend forecast benchmark")
+        return
+
+    today = date(2026, 10, 17)
+    history = build_history(args.series, args.days, today)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = score_history(history, today, budget_limit=1_000_000)
+        timings.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = LocalStateStore(state_dir)
+        start = time.perf_counter()
+        history.save(store)
+        saved = time.perf_counter()
+        loaded = CostHistory.load(history.group_by, store)
+        load_seconds = time.perf_counter() - saved
+        size_kb = len(store.get_bytes(HISTORY_KEY)) / 1024
+    assert loaded is not None and loaded.costs.shape == history.costs.shape
+
+    print(f"Spend forecast ({args.series} series x {args.days} days)")
+    print(f"  Scoring (best of {args.repeat}): {min(timings) * 1000:.1f}ms")
+    print(f"  Store save: {(saved - start) * 1000:.1f}ms, load: {load_seconds * 1000:.1f}ms, {size_kb:.0f}KB")
+    print(f"  Projected month total: ${result['projected_month_total']:,.2f}")
+    print(f"  Anomalies reported: {len(result['anomalies'])} of {max(1, args.series // 500)} injected spikes")
+
+
+if __name__ == '__main__':
+    main()
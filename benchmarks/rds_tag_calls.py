@@ -0,0 +1,113 @@
+"""
+RDS Tag Resolution Benchmark
+Counts RDS API round trips needed to scan a stubbed fleet of DB instances
+
+Compares the legacy path (a list_tags_for_resource call per instance) with
+reading the TagList returned by describe_db_instances.
+
+Usage:
+    python benchmarks/rds_tag_calls.py [--instances 1000]
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Any
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'cost_optimizer'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'shared', 'python'))
+
+import stop_dev_instances  # noqa: E402
+
+PAGE_SIZE = 100  # describe_db_instances MaxRecords upper bound
+
+
+class StubPaginator:
+    """Paginator stand-in that serves a fixed list in MaxRecords-sized pages"""
+
+    def __init__(self, client, items: List[Dict[str, Any]]):
+        self.client = client
+        self.items = items
+
+    def paginate(self, **kwargs):
+        for start in range(0, len(self.items), PAGE_SIZE):
+            self.client.calls['describe_db_instances'] += 1
+            yield {'DBInstances': self.items[start:start + PAGE_SIZE]}
+
+
+class StubRDSClient:
+    """Minimal RDS client that records every API call"""
+
+    def __init__(self, db_instances: List[Dict[str, Any]], tags: Dict[str, List[Dict[str, str]]]):
+        self.db_instances = db_instances
+        self.tags = tags
+        self.calls = Counter()
+        self.meta = SimpleNamespace(region_name='us-east-1')
+
+    def get_paginator(self, operation_name: str):
+        return StubPaginator(self, self.db_instances)
+
+    def list_tags_for_resource(self, ResourceName: str):
+        self.calls['list_tags_for_resource'] += 1
+        return {'TagList': self.tags[ResourceName]}
+
+
+def build_fleet(count: int, include_tag_list: bool):
+    """Build a synthetic fleet where every fourth instance is a stop candidate"""
+    db_instances = []
+    tags = {}
+    for i in range(count):
+        arn = f"arn:aws:rds:us-east-1:123456789012:db:dev-db-{i}"
+        tag_list = [
+            {'Key': 'Environment', 'Value': 'dev'},
+            {'Key': 'AutoStop', 'Value': 'true' if i % 4 == 0 else 'false'}
+        ]
+        db_instance = {
+            'DBInstanceIdentifier': f"dev-db-{i}",
+            'DBInstanceArn': arn,
+            'DBInstanceStatus': 'available',
+            'DBInstanceClass': 'db.t3.micro',
+            'Engine': 'postgres',
+            'MultiAZ': False
+        }
+        if include_tag_list:
+            db_instance['TagList'] = tag_list
+        db_instances.append(db_instance)
+        tags[arn] = tag_list
+    return db_instances, tags
+
+
+def run_scenario(count: int, include_tag_list: bool) -> Counter:
+    """Run a dry-run RDS scan against the stub and return the call counts"""
+    client = StubRDSClient(*build_fleet(count, include_tag_list))
+    stop_dev_instances.ENVIRONMENT = 'dev'
+    stop_dev_instances.stop_dev_rds_instances(dry_run=True, clients=lambda service_name: client)
+    return client.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--instances', type=int, default=1000)
+    args = parser.parse_args()
+
+    # Silence per-resource logging from the scan
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        before = run_scenario(args.instances, include_tag_list=False)
+        after = run_scenario(args.instances, include_tag_list=True)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"RDS round trips for {args.instances} DB instances")
+    print(f"{'scenario':<32}{'describe':>10}{'list_tags':>12}{'total':>8}")
+    for label, calls in (('per-instance list_tags (before)', before), ('describe TagList (after)', after)):
+        print(f"{label:<32}{calls['describe_db_instances']:>10}"
+              f"{calls['list_tags_for_resource']:>12}{sum(calls.values()):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Tag Policy Benchmark
+Times compiled tag policy matching over a synthetic tagged fleet
+
+Builds a policy from the bundled rules plus extra exclude rules on
+unrelated tag keys, and resources carrying a handful of tags each. The
+compiled selector, which looks up rules by the tags a resource carries,
+is timed against checking every rule against every resource.
+
+Usage:
+    python benchmarks/tag_policy_matching.py [--resources 10000] [--rules 40]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda', 'cost_optimizer'))
+
+from tag_policy import TagPolicy, load_policy_document  # noqa: E402
+
+
+def build_policy(extra_rules: int) -> dict:
+    document = json.loads(json.dumps(load_policy_document()))
+    for i in range(extra_rules):
+        document['rules'].append({
+            'name': f"exclude-team-{i}",
+            'effect': 'exclude',
+            'tag': f"Team{i % 10}",
+            'values': [f"frozen-{i}"]
+        })
+    return document
+
+
+def build_tags(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    fleet = []
+    for i in range(count):
+        tags = {'Name': f"resource-{i}", 'Owner': f"user{i % 50}", f"Team{i % 10}": f"team-{i % 7}"}
+        if rng.random() < 0.9:
+            tags['Environment'] = rng.choice(['dev', 'dev', 'Dev', 'staging', 'prod'])
+        if rng.random() < 0.8:
+            tags['AutoStop'] = rng.choice(['true', 'true', 'True', 'false'])
+        fleet.append(tags)
+    return fleet
+
+
+def naive_matches(rules, environment: str, tags: dict) -> bool:
+    """Every rule against every resource, values normalized per check"""
+    for rule in rules:
+        if 'ec2' not in rule.get('kinds', ('ec2',)) or 'tag' not in rule:
+            continue
+        values = {environment.lower() if v == '${environment}' else v.lower() for v in rule['values']}
+        present = rule['tag'] in tags
+        hit = present and tags[rule['tag']].lower() in values
+        if rule['effect'] == 'exclude' and hit:
+            return False
+        if rule['effect'] == 'require' and not hit:
+            return False
+    return True
+
+
+def best_of(repeat: int, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resources', type=int, default=10000)
+    parser.add_argument('--rules', type=int, default=40, help='Extra exclude rules added to the bundled policy')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    document = build_policy(args.rules)
+    fleet = build_tags(args.resources)
+
+    start = time.perf_counter()
+    selector = TagPolicy(document, 'dev').selector('ec2')
+    compile_seconds = time.perf_counter() - start
+
+    compiled_seconds, compiled = best_of(args.repeat, lambda: [selector.matches(tags) for tags in fleet])
+    naive_seconds, naive = best_of(
+        args.repeat, lambda: [naive_matches(document['rules'], 'dev', tags) for tags in fleet]
+    )
+    assert compiled == naive, "compiled policy disagrees with rule-by-rule matching"
+
+    print(f"Tag policy ({args.resources} resources x {len(document['rules'])} rules)")
+    print(f"  Compile: {compile_seconds * 1000:.2f}ms")
+    print(f"  Compiled selector (best of {args.repeat}): {compiled_seconds * 1000:.1f}ms")
+    print(f"  Rule by rule (best of {args.repeat}): {naive_seconds * 1000:.1f}ms")
+    print(f"  Selected: {sum(compiled)}, server filters: {selector.server_filters()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Checkpoint Module
+Persists resumable cursors for runs that outlive a single Lambda invocation
+"""
+import json
+import os
+import uuid
+from typing import Any, Dict, Optional
+
+from aws_clients import get_client
+from state_store import get_state_store
+
+STATE_NAMESPACE = 'cost-optimizer'
+
+# Upper bound on self re-invocations for one run
+MAX_RESUMES = int(os.environ.get('MAX_RESUMES', '10'))
+
+
+def _key(run_id: str) -> str:
+    return f"checkpoints/{run_id}.json"
+
+
+def new_checkpoint(action: str) -> Dict[str, Any]:
+    """Start an empty checkpoint for a fresh run"""
+    return {
+        'run_id': uuid.uuid4().hex,
+        'action': action,
+        'invocation': 0,
+        'cursors': {},
+        'reports': [],
+        'plan': {}
+    }
+
+
+def load_checkpoint(run_id: str) -> Optional[Dict[str, Any]]:
+    """Load a stored checkpoint, or None if it does not exist"""
+    return get_state_store(STATE_NAMESPACE).get(_key(run_id))
+
+
+def save_checkpoint(checkpoint: Dict[str, Any]):
+    """Persist a checkpoint so a later invocation can resume it"""
+    get_state_store(STATE_NAMESPACE).put(_key(checkpoint['run_id']), checkpoint)
+
+
+def delete_checkpoint(run_id: str):
+    """Remove a checkpoint once its run has finished"""
+    get_state_store(STATE_NAMESPACE).delete(_key(run_id))
+
+
+def resume_async(function_arn: str, event: Dict[str, Any], run_id: str) -> int:
+    """
+    Re-invoke the optimizer asynchronously to continue a checkpointed run
+
+    Returns:
+        Status code from the Lambda invoke call
+    """
+    payload = {**event, 'resume_run_id': run_id}
+    response = get_client('lambda').invoke(
+        FunctionName=function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload)
+    )
+    return response['StatusCode']
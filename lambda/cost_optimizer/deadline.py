@@ -0,0 +1,37 @@
+"""
+Deadline Module
+Tracks the remaining Lambda execution time so long runs can stop taking new work
+"""
+import os
+import time
+from typing import Optional
+
+# Time reserved to persist the checkpoint and re-invoke before the hard timeout
+DEADLINE_MARGIN_MS = int(os.environ.get('DEADLINE_MARGIN_MS', '30000'))
+
+
+class Deadline:
+    """
+    Remaining-time check backed by the Lambda context
+
+    Without a context (local runs, tests) the deadline never expires unless
+    an explicit budget in milliseconds is given.
+    """
+
+    def __init__(self, context=None, margin_ms: int = DEADLINE_MARGIN_MS, budget_ms: Optional[int] = None):
+        self.context = context
+        self.margin_ms = margin_ms
+        self._expires_at = time.monotonic() + budget_ms / 1000 if budget_ms is not None else None
+
+    def remaining_ms(self) -> Optional[float]:
+        """Milliseconds left before the hard timeout, or None when unbounded"""
+        if self.context is not None and hasattr(self.context, 'get_remaining_time_in_millis'):
+            return self.context.get_remaining_time_in_millis()
+        if self._expires_at is not None:
+            return (self._expires_at - time.monotonic()) * 1000
+        return None
+
+    def expired(self) -> bool:
+        """True once the remaining time drops below the safety margin"""
+        remaining = self.remaining_ms()
+        return remaining is not None and remaining < self.margin_ms
@@ -0,0 +1,186 @@
+"""
+Resource Discovery Module
+Walks boto3 paginators and yields EC2, RDS and ECS resources lazily
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+from botocore.paginate import TokenEncoder
+
+from executor import run_bounded
+
+# Service pagination token field for each paginated operation
+TOKEN_KEYS = {
+    'describe_instances': 'NextToken',
+    'describe_db_instances': 'Marker',
+    'list_clusters': 'nextToken',
+    'list_services': 'nextToken'
+}
+
+# Most values a single Describe filter accepts
+EC2_FILTER_VALUES = 200
+RDS_FILTER_VALUES = 100
+# describe_services accepts at most 10 services per call
+ECS_DESCRIBE_BATCH = 10
+# Largest page list_clusters and list_services return
+ECS_LIST_PAGE_SIZE = 100
+
+_token_encoder = TokenEncoder()
+
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive slices of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_pages(client, operation_name: str, cursor: Optional[Dict[str, Any]] = None,
+               **kwargs) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every page of a paginated AWS API call
+
+    Args:
+        client: boto3 client exposing the operation
+        operation_name: Paginated operation name (e.g. 'describe_instances')
+        cursor: Optional resumable cursor. Pagination starts from
+            cursor['token'] and the token is advanced only once a page has
+            been fully consumed, so an interrupted page is read again on resume.
+        **kwargs: Parameters passed to the operation
+
+    Returns:
+        Iterator over raw response pages
+    """
+    paginator = client.get_paginator(operation_name)
+    token_key = TOKEN_KEYS.get(operation_name)
+
+    if cursor is not None and cursor.get('token'):
+        kwargs['PaginationConfig'] = {
+            'StartingToken': _token_encoder.encode({token_key: cursor['token']})
+        }
+
+    for page in paginator.paginate(**kwargs):
+        yield page
+        if cursor is not None:
+            cursor['token'] = page.get(token_key)
+
+
+def iter_ec2_instances(ec2_client, filters: Optional[List[Dict[str, Any]]] = None,
+                       cursor: Optional[Dict[str, Any]] = None,
+                       instance_ids: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield EC2 instances matching the given filters across all pages
+
+    When instance_ids is given only those instances are described, through
+    an instance-id filter so IDs that no longer exist are simply not
+    returned. The cursor is not used in that mode.
+    """
+    if instance_ids is not None:
+        for chunk in chunked(instance_ids, EC2_FILTER_VALUES):
+            chunk_filters = (filters or []) + [{'Name': 'instance-id', 'Values': chunk}]
+            yield from iter_ec2_instances(ec2_client, chunk_filters)
+        return
+
+    for page in iter_pages(ec2_client, 'describe_instances', cursor, Filters=filters or []):
+        for reservation in page['Reservations']:
+            yield from reservation['Instances']
+
+
+def iter_db_instances(rds_client, cursor: Optional[Dict[str, Any]] = None,
+                      db_instance_ids: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield RDS DB instances across all pages
+
+    When db_instance_ids is given only those instances are described; the
+    cursor is not used in that mode.
+    """
+    if db_instance_ids is not None:
+        for chunk in chunked(db_instance_ids, RDS_FILTER_VALUES):
+            for page in iter_pages(rds_client, 'describe_db_instances',
+                                   Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+                yield from page['DBInstances']
+        return
+
+    for page in iter_pages(rds_client, 'describe_db_instances', cursor):
+        yield from page['DBInstances']
+
+
+def db_instance_tags(rds_client, db_instance: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Resolve tags for an RDS DB instance
+
+    describe_db_instances already returns a TagList for every instance, so
+    tags come from the describe page itself. list_tags_for_resource is only
+    called when an older API response omits the TagList entirely.
+    """
+    if 'TagList' in db_instance:
+        tag_list = db_instance['TagList']
+    else:
+        tag_list = rds_client.list_tags_for_resource(ResourceName=db_instance['DBInstanceArn'])['TagList']
+
+    return {tag['Key']: tag['Value'] for tag in tag_list}
+
+
+def iter_ecs_clusters(ecs_client, cursor: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Yield ECS cluster ARNs across all pages"""
+    for page in iter_pages(ecs_client, 'list_clusters', cursor, maxResults=ECS_LIST_PAGE_SIZE):
+        yield from page['clusterArns']
+
+
+def describe_ecs_services(ecs_client, cluster_arn: str, services: List[str]) -> Iterator[Dict[str, Any]]:
+    """Describe services by name or ARN, with tags, ECS_DESCRIBE_BATCH at a time"""
+    for chunk in chunked(services, ECS_DESCRIBE_BATCH):
+        response = ecs_client.describe_services(
+            cluster=cluster_arn,
+            services=chunk,
+            include=['TAGS']
+        )
+        yield from response['services']
+
+
+def iter_ecs_services(ecs_client, cluster_arn: str,
+                      services: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield described ECS services for a cluster
+
+    Each page of list_services is described as soon as it arrives, in
+    chunks of ECS_DESCRIBE_BATCH, so only one page of service details is
+    held in memory at a time. When services is given only those are
+    described and list_services is skipped.
+    """
+    if services is not None:
+        yield from describe_ecs_services(ecs_client, cluster_arn, services)
+        return
+
+    for page in iter_pages(ecs_client, 'list_services', cluster=cluster_arn, maxResults=ECS_LIST_PAGE_SIZE):
+        if not page['serviceArns']:
+            continue
+        yield from describe_ecs_services(ecs_client, cluster_arn, page['serviceArns'])
+
+
+def scan_ecs_clusters(
+    ecs_client,
+    scan_cluster: Callable[[str], Any],
+    clusters: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
+    stop_when: Optional[Callable[[], bool]] = None
+) -> List[Tuple[str, Any, Optional[Exception]]]:
+    """
+    Run scan_cluster on every ECS cluster concurrently
+
+    Clusters are scanned on their own workers, so the wall-clock time of
+    a scan follows the largest cluster rather than the sum of all of them.
+
+    Args:
+        ecs_client: boto3 ECS client, shared by the workers
+        scan_cluster: Callable taking a cluster ARN, typically iterating
+            iter_ecs_services for it
+        clusters: Cluster ARNs to scan; defaults to every cluster in the region
+        max_workers: Concurrency limit (defaults to MAX_CONCURRENCY)
+        stop_when: Passed to run_bounded; clusters not started once it
+            returns True come back with a Deferred error
+
+    Returns:
+        (cluster_arn, result, error) tuples in cluster order
+    """
+    if clusters is None:
+        clusters = iter_ecs_clusters(ecs_client)
+    return run_bounded(scan_cluster, clusters, max_workers, stop_when)
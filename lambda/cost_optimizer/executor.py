@@ -0,0 +1,141 @@
+"""
+Bounded Executor Module
+Runs mutating AWS calls concurrently on a size-limited thread pool
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple, Any
+
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', '10'))
+# EC2 batch errors caused by one instance in the batch; any other error fails the batch as a whole
+INSTANCE_ERROR_CODES = ('IncorrectInstanceState', 'UnsupportedOperation', 'OperationNotPermitted')
+INSTANCE_ERROR_PREFIXES = ('InvalidInstanceID.',)
+
+
+class Deferred(Exception):
+    """Marks an item that was not started because stop_when became true"""
+
+
+def split_concurrency(max_concurrency: int, fan_out: int) -> Tuple[int, int]:
+    """
+    Divide a concurrency limit between a fan-out and the work nested under it
+
+    Returns:
+        (outer, inner): workers for the fan-out's items, and for any pool
+        each item runs, so that outer * inner stays within max_concurrency
+    """
+    outer = max(1, min(max_concurrency, fan_out))
+    return outer, max(1, max_concurrency // outer)
+
+
+def run_bounded(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: Optional[int] = None,
+    stop_when: Optional[Callable[[], bool]] = None
+) -> List[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Apply func to every item using at most max_workers threads
+
+    Args:
+        func: Callable invoked once per item
+        items: Items to process
+        max_workers: Concurrency limit (defaults to MAX_CONCURRENCY)
+        stop_when: Optional check run before each item starts; once it
+            returns True the remaining items are skipped with a Deferred error
+
+    Returns:
+        List of (item, result, error) tuples in the same order as items.
+        Exceptions raised by func are captured in error instead of propagating.
+        With a single worker the items run in the calling thread, so
+        nested fan-outs cut down to one worker add no threads.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = max(1, min(max_workers or MAX_CONCURRENCY, len(items)))
+
+    def call(item):
+        if stop_when is not None and stop_when():
+            return item, None, Deferred()
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    if workers == 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(call, items))
+
+
+def run_batched(
+    func: Callable[[List[Any]], Any],
+    items: Iterable[Any],
+    batch_size: int,
+    max_workers: Optional[int] = None,
+    stop_when: Optional[Callable[[], bool]] = None,
+    should_split: Optional[Callable[[Exception], bool]] = None,
+    on_split: Optional[Callable[[], bool]] = None
+) -> List[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Apply func to items in batches, bisecting failed batches to isolate bad items
+
+    Batches of at most batch_size run concurrently. When a batch fails
+    and should_split accepts the error, it is split in half and each half
+    retried, so k bad items in a batch of n cost at most about
+    2k * log2(n) extra calls and every other item still goes through.
+
+    Args:
+        func: Callable invoked with a list of items
+        items: Items to process
+        batch_size: Largest batch passed to func
+        max_workers: Concurrency limit (defaults to MAX_CONCURRENCY)
+        stop_when: Passed to run_bounded; items of batches not started
+            once it returns True come back with a Deferred error
+        should_split: Decides whether a batch error may be caused by
+            individual items; errors it rejects (e.g. throttling) fail the
+            whole batch without splitting. Defaults to always splitting.
+        on_split: Called before a failed batch is split, e.g. to charge its
+            two extra calls to a budget; when it returns False the batch's
+            items come back with a Deferred error instead
+
+    Returns:
+        List of (item, result, error) tuples in the same order as items,
+        where result is func's result for the batch the item succeeded in
+    """
+    items = list(items)
+    batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+
+    def call(batch: List[Any]) -> List[Tuple[Any, Any, Optional[Exception]]]:
+        try:
+            result = func(batch)
+        except Exception as e:
+            if len(batch) == 1 or (should_split is not None and not should_split(e)):
+                return [(item, None, e) for item in batch]
+            if on_split is not None and not on_split():
+                return [(item, None, Deferred()) for item in batch]
+            middle = len(batch) // 2
+            return call(batch[:middle]) + call(batch[middle:])
+        return [(item, result, None) for item in batch]
+
+    outcomes = []
+    for batch, batch_outcomes, error in run_bounded(call, batches, max_workers, stop_when):
+        if error is not None:
+            outcomes.extend((item, None, error) for item in batch)
+        else:
+            outcomes.extend(batch_outcomes)
+    return outcomes
+
+
+def is_instance_error(error: Exception) -> bool:
+    """
+    True when an EC2 batch error names a problem with individual instances
+
+    Only those are worth bisecting a batch for; throttling, authorization
+    and other account-wide errors would fail every half the same way.
+    """
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code') or ''
+    return code in INSTANCE_ERROR_CODES or code.startswith(INSTANCE_ERROR_PREFIXES)
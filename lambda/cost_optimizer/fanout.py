@@ -0,0 +1,154 @@
+"""
+Fan-out Module
+Resolves target regions and accounts and merges their results into one report
+"""
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+from aws_clients import get_client
+
+# Report sections produced by the optimizer actions
+SECTIONS = ('ec2', 'rds', 'ecs')
+# Result list fields that are concatenated across regions
+LIST_FIELDS = ('instances', 'services', 'stopped', 'services_scaled', 'changed', 'started', 'services_restored',
+               'pending', 'missing')
+# Result counters and savings estimates that are summed across regions
+COUNT_FIELDS = ('instances_found', 'services_found', 'deferred', 'hourly_savings', 'monthly_savings', 'unpriced')
+
+
+def resolve_regions(requested: Union[str, List[str], None]) -> List[Optional[str]]:
+    """
+    Resolve the list of regions to scan
+
+    Args:
+        requested: List of region names, a comma-separated string, 'all' to
+            discover every enabled region, or empty for the Lambda's own region
+
+    Returns:
+        List of region names; [None] means the default region
+    """
+    if isinstance(requested, str):
+        requested = [r.strip() for r in requested.split(',') if r.strip()]
+
+    if not requested:
+        return [None]
+
+    if requested == ['all']:
+        response = get_client('ec2').describe_regions(
+            Filters=[{'Name': 'opt-in-status', 'Values': ['opt-in-not-required', 'opted-in']}]
+        )
+        return sorted(region['RegionName'] for region in response['Regions'])
+
+    # Preserve order but drop duplicates
+    return list(dict.fromkeys(requested))
+
+
+def resolve_accounts(requested: Union[str, List[str], None]) -> List[str]:
+    """
+    Resolve the member accounts to scan in organization mode
+
+    Args:
+        requested: Explicit account IDs (list or comma-separated string), or
+            empty to list every ACTIVE account in the organization
+
+    Returns:
+        List of account IDs
+    """
+    if isinstance(requested, str):
+        requested = [a.strip() for a in requested.split(',') if a.strip()]
+
+    if requested:
+        return list(dict.fromkeys(str(a) for a in requested))
+
+    paginator = get_client('organizations').get_paginator('list_accounts')
+    return [
+        account['Id']
+        for page in paginator.paginate()
+        for account in page['Accounts']
+        if account['Status'] == 'ACTIVE'
+    ]
+
+
+def merge_results(outcomes: List[Tuple[Optional[str], Any, Optional[Exception]]],
+                  label: str = 'region') -> Dict[str, Any]:
+    """
+    Merge per-region or per-account action results into one report
+
+    Args:
+        outcomes: (key, result, error) tuples from run_bounded, where each
+            result maps a section ('ec2', 'rds', 'ecs') to its result dict
+        label: Field name used to tag each merged resource with its key
+
+    Returns:
+        Dictionary with merged sections plus 'error' when any key failed
+    """
+    merged: Dict[str, Any] = {}
+    errors = []
+
+    for key, result, error in outcomes:
+        if error is not None:
+            errors.append(f"{key or 'default'}: {str(error)}")
+            continue
+
+        for e in result.get('error', []):
+            errors.append(f"{key}: {e}" if key else e)
+
+        for section in SECTIONS:
+            if section in result:
+                target = merged.setdefault(section, {})
+                _merge_section(target, result[section], key, label)
+
+    if errors:
+        merged['error'] = errors
+
+    return merged
+
+
+def _merge_section(target: Dict[str, Any], source: Dict[str, Any], key: Optional[str], label: str):
+    """Fold one region's or account's section result into the merged section"""
+    for field in COUNT_FIELDS:
+        if field in source:
+            target[field] = target.get(field, 0) + source[field]
+
+    for field in LIST_FIELDS:
+        if field in source:
+            items = source[field]
+            if key:
+                items = [
+                    {**item, label: key} if isinstance(item, dict) else item
+                    for item in items
+                ]
+            target.setdefault(field, []).extend(items)
+
+    if 'error' in source:
+        errors = source['error'] if isinstance(source['error'], list) else [source['error']]
+        prefix = f"{key}: " if key else ""
+        target.setdefault('error', []).extend(f"{prefix}{e}" for e in errors)
+
+    if 'message' in source:
+        target['message'] = source['message']
+
+
+def combine_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combine the partial reports of a run that spanned several invocations
+
+    Resources already carry their region/account fields, so sections are
+    concatenated without further labelling; per-account reports are
+    combined account by account.
+    """
+    if len(reports) == 1:
+        return reports[0]
+
+    combined = merge_results([(None, report, None) for report in reports])
+
+    accounts: Dict[str, List[Dict[str, Any]]] = {}
+    for report in reports:
+        for account_id, account_report in report.get('accounts', {}).items():
+            accounts.setdefault(account_id, []).append(account_report)
+    if accounts:
+        combined['accounts'] = {
+            account_id: merge_results([(None, r, None) for r in account_reports])
+            for account_id, account_reports in accounts.items()
+        }
+
+    return combined
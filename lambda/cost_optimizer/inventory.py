@@ -0,0 +1,508 @@
+"""
+Inventory Index Module
+Event-maintained index of EC2, RDS and ECS resources so scheduled runs skip full scans
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from discovery import (
+    iter_ec2_instances, iter_db_instances, iter_ecs_clusters, iter_ecs_services,
+    describe_ecs_services, db_instance_tags
+)
+from tag_policy import selector, policy_tag_keys
+
+# Read stop candidates from the index instead of scanning the account
+USE_INVENTORY = os.environ.get('USE_INVENTORY', 'false').lower() == 'true'
+# An index not reconciled within this window is ignored and the run scans instead
+INVENTORY_MAX_AGE_HOURS = int(os.environ.get('INVENTORY_MAX_AGE_HOURS', '26'))
+# DynamoDB table with partition key 'region', sort key 'resource' and a 'candidates'
+# index on 'candidate_region'; without it the index is kept in memory
+INVENTORY_TABLE = os.environ.get('INVENTORY_TABLE')
+# Regions whose state-change events reach apply_event; any other region's index
+# only changes at reconcile, so runs there scan instead. Empty means every region
+INVENTORY_REGIONS = [r.strip() for r in os.environ.get('INVENTORY_REGIONS', '').split(',') if r.strip()]
+
+CANDIDATES_INDEX = 'candidates'
+# Sort key of the item recording a region's last reconcile
+RECONCILED_RESOURCE = '#reconciled'
+# Most requests a BatchWriteItem call accepts
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_BACKOFF_SECONDS = 1.0
+# Conditional writes of one record before an event falls back to describing the resource
+UPDATE_MAX_ATTEMPTS = 3
+
+KINDS = ('ec2', 'rds', 'ecs')
+# Only the tags candidate selection looks at are kept in the index
+INDEXED_TAGS = ('Name',) + policy_tag_keys()
+
+
+def _indexed_tags(tags: Dict[str, str]) -> Dict[str, str]:
+    return {key: value for key, value in tags.items() if key in INDEXED_TAGS}
+
+
+def ec2_record(instance: Dict[str, Any]) -> Dict[str, Any]:
+    """Index record for a described EC2 instance"""
+    tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+    return {'state': instance['State']['Name'], 'tags': _indexed_tags(tags)}
+
+
+def rds_record(db_instance: Dict[str, Any], tags: Dict[str, str]) -> Dict[str, Any]:
+    """Index record for a described RDS DB instance"""
+    return {
+        'status': db_instance['DBInstanceStatus'],
+        'multi_az': db_instance.get('MultiAZ', False),
+        'tags': _indexed_tags(tags)
+    }
+
+
+def ecs_record(service: Dict[str, Any]) -> Dict[str, Any]:
+    """Index record for a described ECS service"""
+    tags = {tag['key']: tag['value'] for tag in service.get('tags', [])}
+    return {
+        'cluster_arn': service['clusterArn'],
+        'service': service['serviceName'],
+        'desired_count': service['desiredCount'],
+        'tags': _indexed_tags(tags)
+    }
+
+
+def ecs_key(service: Dict[str, Any]) -> str:
+    return f"{service['clusterArn']}/{service['serviceName']}"
+
+
+def is_candidate(kind: str, record: Dict[str, Any], environment: str) -> bool:
+    """
+    Apply the same tag policy and state rules as the stop/scale functions
+
+    The scheduled run re-describes every candidate before acting, so this
+    only has to avoid missing resources, not be exact.
+    """
+    if kind == 'ec2':
+        ready = record['state'] == 'running'
+    elif kind == 'rds':
+        ready = record['status'] == 'available'
+    else:
+        ready = record['desired_count'] > 1
+    return ready and selector(kind, environment).matches(record['tags'], record)
+
+
+class LocalInventoryStore:
+    """In-memory index, for local runs and tests"""
+
+    def __init__(self):
+        self._regions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _region(self, region: str) -> Dict[str, Any]:
+        return self._regions.setdefault(region, {'reconciled_at': None, 'items': {}})
+
+    def get(self, region: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._region(region)['items'].get((kind, key))
+        return None if item is None else json.loads(item[0])
+
+    def put(self, region: str, kind: str, key: str, record: Dict[str, Any], candidate: bool):
+        with self._lock:
+            self._region(region)['items'][(kind, key)] = (json.dumps(record, sort_keys=True), candidate)
+
+    def update(self, region: str, kind: str, key: str, changes: Dict[str, Any],
+               candidate_of: Callable[[Dict[str, Any]], bool]) -> bool:
+        with self._lock:
+            items = self._region(region)['items']
+            if (kind, key) not in items:
+                return False
+            record = {**json.loads(items[(kind, key)][0]), **changes}
+            items[(kind, key)] = (json.dumps(record, sort_keys=True), candidate_of(record))
+        return True
+
+    def delete(self, region: str, kind: str, key: str):
+        with self._lock:
+            self._region(region)['items'].pop((kind, key), None)
+
+    def candidates(self, region: str) -> Tuple[Optional[str], Dict[str, List[str]]]:
+        found = {kind: [] for kind in KINDS}
+        with self._lock:
+            state = self._region(region)
+            for (kind, key), (_, candidate) in state['items'].items():
+                if candidate:
+                    found[kind].append(key)
+            reconciled_at = state['reconciled_at']
+        return reconciled_at, {kind: sorted(keys) for kind, keys in found.items()}
+
+    def replace(self, region: str, entries: List[Tuple[str, str, Dict[str, Any], bool]], reconciled_at: str):
+        items = {(kind, key): (json.dumps(record, sort_keys=True), candidate)
+                 for kind, key, record, candidate in entries}
+        with self._lock:
+            self._regions[region] = {'reconciled_at': reconciled_at, 'items': items}
+
+
+class DynamoDBInventoryStore:
+    """
+    One DynamoDB item per resource
+
+    Items are keyed by region and '<kind>#<key>'. Candidates also carry
+    candidate_region, so the sparse candidates index holds them alone and
+    a scheduled run queries only those. Events put or delete their own
+    resource's item, and an event changing part of an indexed record writes
+    it back only if the record is still the one it read, so concurrent
+    events never overwrite each other.
+    """
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+
+    @staticmethod
+    def _key(region: str, resource: str) -> Dict[str, Dict[str, str]]:
+        return {'region': {'S': region}, 'resource': {'S': resource}}
+
+    @classmethod
+    def _item(cls, region: str, kind: str, key: str, record: Dict[str, Any], candidate: bool) -> Dict[str, Any]:
+        item = {**cls._key(region, f"{kind}#{key}"), 'record': {'S': json.dumps(record, sort_keys=True)}}
+        if candidate:
+            item['candidate_region'] = {'S': region}
+        return item
+
+    def get(self, region: str, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        item = get_client('dynamodb').get_item(
+            TableName=self.table_name,
+            Key=self._key(region, f"{kind}#{key}"),
+            ConsistentRead=True
+        ).get('Item')
+        return None if item is None else json.loads(item['record']['S'])
+
+    def put(self, region: str, kind: str, key: str, record: Dict[str, Any], candidate: bool):
+        get_client('dynamodb').put_item(
+            TableName=self.table_name,
+            Item=self._item(region, kind, key, record, candidate)
+        )
+
+    def update(self, region: str, kind: str, key: str, changes: Dict[str, Any],
+               candidate_of: Callable[[Dict[str, Any]], bool]) -> bool:
+        """
+        Merge changes into an indexed record with a conditional UpdateItem
+
+        The write is conditional on the stored record being the one read, and
+        is retried from a fresh read when another event got there first.
+
+        Returns:
+            False when the resource is not indexed or the record kept
+            changing under the update
+        """
+        dynamodb_client = get_client('dynamodb')
+        item_key = self._key(region, f"{kind}#{key}")
+        for _ in range(UPDATE_MAX_ATTEMPTS):
+            item = dynamodb_client.get_item(TableName=self.table_name, Key=item_key, ConsistentRead=True).get('Item')
+            if item is None:
+                return False
+            record = {**json.loads(item['record']['S']), **changes}
+            values = {':read': item['record'], ':record': {'S': json.dumps(record, sort_keys=True)}}
+            if candidate_of(record):
+                expression = 'SET #record = :record, candidate_region = :region'
+                values[':region'] = {'S': region}
+            else:
+                expression = 'SET #record = :record REMOVE candidate_region'
+            try:
+                dynamodb_client.update_item(
+                    TableName=self.table_name,
+                    Key=item_key,
+                    UpdateExpression=expression,
+                    ConditionExpression='#record = :read',
+                    ExpressionAttributeNames={'#record': 'record'},
+                    ExpressionAttributeValues=values
+                )
+                return True
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        return False
+
+    def delete(self, region: str, kind: str, key: str):
+        get_client('dynamodb').delete_item(
+            TableName=self.table_name,
+            Key=self._key(region, f"{kind}#{key}")
+        )
+
+    def candidates(self, region: str) -> Tuple[Optional[str], Dict[str, List[str]]]:
+        dynamodb_client = get_client('dynamodb')
+        marker = dynamodb_client.get_item(
+            TableName=self.table_name,
+            Key=self._key(region, RECONCILED_RESOURCE)
+        ).get('Item')
+        if marker is None:
+            return None, {}
+
+        found = {kind: [] for kind in KINDS}
+        pages = dynamodb_client.get_paginator('query').paginate(
+            TableName=self.table_name,
+            IndexName=CANDIDATES_INDEX,
+            KeyConditionExpression='candidate_region = :region',
+            ExpressionAttributeValues={':region': {'S': region}}
+        )
+        for page in pages:
+            for item in page['Items']:
+                kind, key = item['resource']['S'].split('#', 1)
+                found[kind].append(key)
+        return marker['reconciled_at']['S'], {kind: sorted(keys) for kind, keys in found.items()}
+
+    def replace(self, region: str, entries: List[Tuple[str, str, Dict[str, Any], bool]], reconciled_at: str):
+        """
+        Make the region's items match a full scan
+
+        Only items that are new or changed are written and only those no
+        longer scanned are deleted, so a reconcile of a quiet fleet costs
+        little beyond reading the region back.
+        """
+        dynamodb_client = get_client('dynamodb')
+        existing = {}
+        pages = dynamodb_client.get_paginator('query').paginate(
+            TableName=self.table_name,
+            KeyConditionExpression='#region = :region',
+            ExpressionAttributeNames={'#region': 'region'},
+            ExpressionAttributeValues={':region': {'S': region}}
+        )
+        for page in pages:
+            for item in page['Items']:
+                existing[item['resource']['S']] = item
+
+        requests = []
+        for kind, key, record, candidate in entries:
+            item = self._item(region, kind, key, record, candidate)
+            if existing.pop(item['resource']['S'], None) != item:
+                requests.append({'PutRequest': {'Item': item}})
+        existing.pop(RECONCILED_RESOURCE, None)
+        requests.extend({'DeleteRequest': {'Key': self._key(region, resource)}} for resource in existing)
+        self._batch_write(dynamodb_client, requests)
+
+        dynamodb_client.put_item(
+            TableName=self.table_name,
+            Item={**self._key(region, RECONCILED_RESOURCE), 'reconciled_at': {'S': reconciled_at}}
+        )
+
+    def _batch_write(self, dynamodb_client, requests: List[Dict[str, Any]]):
+        for start in range(0, len(requests), BATCH_WRITE_SIZE):
+            pending = {self.table_name: requests[start:start + BATCH_WRITE_SIZE]}
+            attempt = 0
+            while pending:
+                pending = dynamodb_client.batch_write_item(RequestItems=pending).get('UnprocessedItems') or {}
+                if pending:
+                    # Unprocessed items are the table's throttling signal; back off before resending
+                    attempt += 1
+                    time.sleep(min(BATCH_WRITE_MAX_BACKOFF_SECONDS, 0.05 * 2 ** attempt))
+
+
+class InventoryIndex:
+    """
+    Resource records of one region, written through to the inventory store
+
+    Each upsert recomputes whether the resource is a stop candidate, which
+    is all a scheduled run reads back.
+    """
+
+    def __init__(self, region: str, environment: str, store=None):
+        self.region = region
+        self.environment = environment
+        self.store = store or inventory_store
+
+    def get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(self.region, kind, key)
+
+    def upsert(self, kind: str, key: str, record: Dict[str, Any]):
+        self.store.put(self.region, kind, key, record, is_candidate(kind, record, self.environment))
+
+    def update(self, kind: str, key: str, changes: Dict[str, Any]) -> bool:
+        """Merge changes into an indexed record; False if the caller must describe the resource instead"""
+        return self.store.update(
+            self.region, kind, key, changes, lambda record: is_candidate(kind, record, self.environment)
+        )
+
+    def remove(self, kind: str, key: str):
+        self.store.delete(self.region, kind, key)
+
+
+def load_candidates(region: str, max_age_hours: int = INVENTORY_MAX_AGE_HOURS,
+                    store=None) -> Optional[Dict[str, List[str]]]:
+    """
+    Return candidate IDs per kind from the region's index
+
+    Returns:
+        Mapping of 'ec2' to instance IDs, 'rds' to DB instance identifiers and
+        'ecs' to '<cluster ARN>/<service name>' keys, or None when there is no
+        index, no event rules keep it current or it has not been reconciled
+        within max_age_hours
+    """
+    if INVENTORY_REGIONS and region not in INVENTORY_REGIONS:
+        print(f"No inventory event rules in {region}, scanning")
+        return None
+
+    reconciled_at, candidates = (store or inventory_store).candidates(region)
+    if not reconciled_at:
+        print(f"No inventory index for {region}, scanning")
+        return None
+
+    if datetime.now(timezone.utc) - datetime.fromisoformat(reconciled_at) > timedelta(hours=max_age_hours):
+        print(f"Inventory index for {region} last reconciled {reconciled_at}, scanning")
+        return None
+
+    return candidates
+
+
+def reconcile(clients: Callable[[str], Any], environment: str) -> Dict[str, Any]:
+    """
+    Rebuild a region's index from a full scan
+
+    Corrects any drift left by missed or out-of-order events.
+
+    Returns:
+        Resource and candidate counts per kind
+    """
+    ec2_client = clients('ec2')
+    rds_client = clients('rds')
+    ecs_client = clients('ecs')
+    region = ec2_client.meta.region_name
+    entries = []
+
+    def add(kind: str, key: str, record: Dict[str, Any]):
+        entries.append((kind, key, record, is_candidate(kind, record, environment)))
+
+    live_states = ['pending', 'running', 'stopping', 'stopped']
+    for instance in iter_ec2_instances(ec2_client, [{'Name': 'instance-state-name', 'Values': live_states}]):
+        add('ec2', instance['InstanceId'], ec2_record(instance))
+
+    for db_instance in iter_db_instances(rds_client):
+        add('rds', db_instance['DBInstanceIdentifier'],
+            rds_record(db_instance, db_instance_tags(rds_client, db_instance)))
+
+    for cluster_arn in iter_ecs_clusters(ecs_client):
+        for service in iter_ecs_services(ecs_client, cluster_arn):
+            add('ecs', ecs_key(service), ecs_record(service))
+
+    inventory_store.replace(region, entries, datetime.now(timezone.utc).isoformat())
+
+    summary = {kind: {'resources': 0, 'candidates': 0} for kind in KINDS}
+    for kind, _, _, candidate in entries:
+        summary[kind]['resources'] += 1
+        summary[kind]['candidates'] += candidate
+    print(f"Reconciled inventory for {region}: {summary}")
+    return summary
+
+
+def _refresh_ec2(index: InventoryIndex, ec2_client, instance_id: str):
+    instances = list(iter_ec2_instances(ec2_client, instance_ids=[instance_id]))
+    if not instances or instances[0]['State']['Name'] in ('shutting-down', 'terminated'):
+        index.remove('ec2', instance_id)
+    else:
+        index.upsert('ec2', instance_id, ec2_record(instances[0]))
+
+
+def _refresh_rds(index: InventoryIndex, rds_client, db_id: str):
+    db_instances = list(iter_db_instances(rds_client, db_instance_ids=[db_id]))
+    if not db_instances:
+        index.remove('rds', db_id)
+    else:
+        index.upsert('rds', db_id, rds_record(db_instances[0], db_instance_tags(rds_client, db_instances[0])))
+
+
+def _ecs_key_from_arn(service_arn: str, cluster: str) -> str:
+    """Index key for a service ARN, given its cluster name or ARN"""
+    prefix, resource = service_arn.split(':service/', 1)
+    return f"{prefix}:cluster/{cluster.split('/')[-1]}/{resource.split('/')[-1]}"
+
+
+def _refresh_ecs(index: InventoryIndex, ecs_client, service_arn: str, cluster: str):
+    services = list(describe_ecs_services(ecs_client, cluster, [service_arn]))
+    if not services or services[0]['status'] == 'INACTIVE':
+        index.remove('ecs', _ecs_key_from_arn(service_arn, cluster))
+    else:
+        index.upsert('ecs', ecs_key(services[0]), ecs_record(services[0]))
+
+
+def _ecs_service_arn(event: Dict[str, Any]) -> Optional[str]:
+    detail = event.get('detail', {})
+    if detail.get('eventName'):
+        # CloudTrail CreateService/UpdateService/DeleteService
+        return ((detail.get('responseElements') or {}).get('service') or {}).get('serviceArn')
+    return next((arn for arn in event.get('resources', []) if ':service/' in arn), None)
+
+
+def _ecs_cluster_name(service_arn: str) -> Optional[str]:
+    """Cluster named by a new-format service ARN (service/<cluster>/<service>); None for old-format ones"""
+    parts = service_arn.split(':', 5)[-1].split('/')
+    return parts[1] if len(parts) == 3 else None
+
+
+def apply_event(event: Dict[str, Any], clients: Callable[[str], Any], environment: str) -> Dict[str, Any]:
+    """
+    Update the index of the event's region from one EventBridge event
+
+    Handles EC2 state-change notifications, RDS DB instance events, ECS
+    service actions and CloudTrail service calls, and tag changes on EC2,
+    RDS and ECS resources. Each event costs at most one targeted Describe
+    call; EC2 state changes and tag changes of indexed resources cost none.
+    Only the touched resource's item is read and written, and partial
+    changes are written conditionally, so concurrent events cannot lose
+    each other's updates.
+
+    Returns:
+        Summary of the resource the event touched
+    """
+    source = event.get('source')
+    detail = event.get('detail', {})
+    region = event['region']
+    index = InventoryIndex(region, environment)
+
+    if source == 'aws.ec2':
+        kind, key = 'ec2', detail['instance-id']
+        if detail['state'] in ('shutting-down', 'terminated'):
+            index.remove(kind, key)
+        elif not index.update(kind, key, {'state': detail['state']}):
+            _refresh_ec2(index, clients('ec2'), key)
+
+    elif source == 'aws.rds':
+        kind, key = 'rds', detail['SourceIdentifier']
+        _refresh_rds(index, clients('rds'), key)
+
+    elif source == 'aws.ecs':
+        kind, key = 'ecs', _ecs_service_arn(event)
+        if key is None:
+            return {'ignored': event.get('detail-type')}
+        cluster = detail.get('clusterArn') or _ecs_cluster_name(key)
+        if cluster is None:
+            # Old-format service ARNs do not name the cluster; the next reconcile picks the change up
+            return {'ignored': event.get('detail-type')}
+        _refresh_ecs(index, clients('ecs'), key, cluster)
+
+    elif source == 'aws.tag':
+        arn = event['resources'][0]
+        tags = detail.get('tags', {})
+        if detail.get('service') == 'ec2' and detail.get('resource-type') == 'instance':
+            kind, key = 'ec2', arn.split('/')[-1]
+            if not index.update(kind, key, {'tags': _indexed_tags(tags)}):
+                _refresh_ec2(index, clients('ec2'), key)
+        elif detail.get('service') == 'rds' and detail.get('resource-type') == 'db':
+            kind, key = 'rds', arn.split(':')[-1]
+            if not index.update(kind, key, {'tags': _indexed_tags(tags)}):
+                _refresh_rds(index, clients('rds'), key)
+        elif detail.get('service') == 'ecs' and detail.get('resource-type') == 'service':
+            kind, key = 'ecs', arn
+            cluster = _ecs_cluster_name(arn)
+            if cluster is None:
+                return {'ignored': event.get('detail-type')}
+            _refresh_ecs(index, clients('ecs'), arn, cluster)
+        else:
+            return {'ignored': f"{detail.get('service')}/{detail.get('resource-type')}"}
+
+    else:
+        return {'ignored': source}
+
+    print(f"Inventory updated from {event.get('detail-type')}: {kind} {key}")
+    return {'region': region, 'kind': kind, 'resource': key}
+
+
+inventory_store = DynamoDBInventoryStore(INVENTORY_TABLE) if INVENTORY_TABLE else LocalInventoryStore()
@@ -0,0 +1,129 @@
+"""
+Execution Plan Module
+Serializes the resources a run would act on so a later apply skips discovery
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List
+
+from state_store import get_state_store
+from tag_policy import policy_tag_keys
+
+STATE_NAMESPACE = 'cost-optimizer'
+
+# Plans older than this are refused by apply
+PLAN_TTL_HOURS = int(os.environ.get('PLAN_TTL_HOURS', '24'))
+
+# Tags a stop decision depends on; changes to other tags do not invalidate a plan
+VERSION_TAGS = policy_tag_keys()
+
+# Result list holding each section's planned resources, and how to key them
+PLANNED_FIELDS = {
+    'ec2': 'instances',
+    'rds': 'instances',
+    'ecs': 'services'
+}
+
+
+def _key(plan_id: str) -> str:
+    return f"plans/{plan_id}.json"
+
+
+def state_version(*fields: Any) -> str:
+    """
+    Short fingerprint of the attributes a stop decision was based on
+
+    Apply skips a resource whose fingerprint no longer matches the plan.
+    Dict fields are taken to be tags and reduced to VERSION_TAGS.
+    """
+    fields = [
+        {key: value for key, value in field.items() if key in VERSION_TAGS} if isinstance(field, dict) else field
+        for field in fields
+    ]
+    digest = hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def ec2_version(instance: Dict[str, Any], tags: Dict[str, str]) -> str:
+    return state_version(instance['State']['Name'], instance['InstanceType'], tags)
+
+
+def rds_version(db_instance: Dict[str, Any], tags: Dict[str, str]) -> str:
+    return state_version(
+        db_instance['DBInstanceStatus'], db_instance['DBInstanceClass'], db_instance.get('MultiAZ', False), tags
+    )
+
+
+def ecs_version(service: Dict[str, Any], tags: Dict[str, str]) -> str:
+    return state_version(service['desiredCount'], service.get('taskDefinition'), tags)
+
+
+def planned_resources(section: str, result: Dict[str, Any]) -> Dict[str, str]:
+    """Map resource ID to state version for the resources a section result would act on"""
+    entries = result.get(PLANNED_FIELDS[section], [])
+    if section == 'ecs':
+        return {f"{entry['cluster_arn']}/{entry['service']}": entry['version'] for entry in entries}
+    return {entry['id']: entry['version'] for entry in entries}
+
+
+def missing_resources(expected_versions: Dict[str, str], seen: Iterable[str]) -> List[str]:
+    """
+    Planned resources a finished discovery did not return as candidates
+
+    They were terminated, already stopped or no longer match the tag
+    policy. seen holds every key discovery took or skipped as changed,
+    across all invocations of the run.
+    """
+    seen = set(seen)
+    return sorted(key for key in expected_versions if key not in seen)
+
+
+def new_plan(checkpoint: Dict[str, Any], environment: str) -> Dict[str, Any]:
+    """
+    Build the plan of a finished planning run
+
+    Resources are keyed by scope ('<account>/<region>') and section, the
+    same scopes the apply run walks, so each worker reads only its own.
+    """
+    return {
+        'plan_id': checkpoint['run_id'],
+        'action': checkpoint['action'],
+        'environment': environment,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'regions': checkpoint['regions'],
+        'accounts': checkpoint.get('accounts'),
+        'aggressive': checkpoint.get('aggressive', False),
+        'resources': checkpoint['plan']
+    }
+
+
+def plan_size(plan: Dict[str, Any]) -> int:
+    return sum(len(ids) for sections in plan['resources'].values() for ids in sections.values())
+
+
+def save_plan(plan: Dict[str, Any]):
+    """Persist a plan for a later apply"""
+    get_state_store(STATE_NAMESPACE).put(_key(plan['plan_id']), plan)
+
+
+def load_plan(plan_id: str, environment: str, ttl_hours: int = PLAN_TTL_HOURS) -> Dict[str, Any]:
+    """
+    Load a stored plan for apply
+
+    Raises:
+        ValueError: If the plan does not exist, was made for another
+            environment or is older than ttl_hours
+    """
+    plan = get_state_store(STATE_NAMESPACE).get(_key(plan_id))
+    if plan is None:
+        raise ValueError(f"Plan not found: {plan_id}")
+    if plan['environment'] != environment:
+        raise ValueError(f"Plan {plan_id} was made for environment {plan['environment']}")
+
+    created_at = datetime.fromisoformat(plan['created_at'])
+    if datetime.now(timezone.utc) - created_at > timedelta(hours=ttl_hours):
+        raise ValueError(f"Plan {plan_id} expired, it was created {plan['created_at']}")
+    return plan
+
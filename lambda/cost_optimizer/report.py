@@ -0,0 +1,113 @@
+"""
+Run Report Module
+Writes a run's per-resource results to the report sink and reduces the response and notification to a digest
+"""
+import os
+import uuid
+from typing import Any, Dict, Iterator, Optional
+
+from fanout import SECTIONS, LIST_FIELDS
+from report_sink import open_report_sink
+
+STATE_NAMESPACE = 'cost-optimizer'
+
+# Write the full report; when off, the digest is all that is kept
+REPORTS_ENABLED = os.environ.get('REPORTS_ENABLED', 'true').lower() == 'true'
+# Items kept per list, and accounts kept, in the digest
+DIGEST_MAX_ITEMS = int(os.environ.get('DIGEST_MAX_ITEMS', '20'))
+
+# Fields of a run result copied onto the report's header record
+HEADER_FIELDS = ('run_id', 'timestamp', 'environment', 'action', 'dry_run', 'aggressive', 'plan_id', 'regions')
+
+
+def _section_records(sections: Dict[str, Any], account: Optional[str]) -> Iterator[Dict[str, Any]]:
+    scope = {'account': account} if account else {}
+    for section in SECTIONS:
+        result = sections.get(section)
+        if not isinstance(result, dict):
+            continue
+        for field in LIST_FIELDS:
+            for item in result.get(field, []):
+                if isinstance(item, dict):
+                    yield {'section': section, 'field': field, **scope, **item}
+                else:
+                    yield {'section': section, 'field': field, **scope, 'id': item}
+        errors = result.get('error', [])
+        for error in errors if isinstance(errors, list) else [errors]:
+            yield {'section': section, 'field': 'error', **scope, 'message': error}
+
+
+def iter_records(results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    One record per resource, or error, in a run result
+
+    In organization mode the per-account results are written, since the
+    merged sections repeat them without the account of stopped IDs.
+    """
+    yield {'section': 'run', **{field: results[field] for field in HEADER_FIELDS if field in results}}
+    if results.get('accounts'):
+        for account_id, account in results['accounts'].items():
+            yield from _section_records(account, account_id)
+    else:
+        yield from _section_records(results, None)
+    if 'restore' in results:
+        for record in _section_records(results['restore'], None):
+            yield {**record, 'section': f"restore/{record['section']}"}
+    errors = results.get('error', [])
+    for error in errors if isinstance(errors, list) else [errors]:
+        yield {'section': 'run', 'field': 'error', 'message': error}
+
+
+def digest(value: Any, max_items: int = DIGEST_MAX_ITEMS) -> Any:
+    """
+    Copy of a run result with every list and the accounts map cut to max_items
+
+    Each cut list gets a '<field>_omitted' count next to it, so totals
+    can still be reported with item_count.
+    """
+    if not isinstance(value, dict):
+        return value
+    reduced = {}
+    for key, item in value.items():
+        if key == 'accounts' and isinstance(item, dict) and len(item) > max_items:
+            kept = list(item)[:max_items]
+            reduced[key] = {account_id: digest(item[account_id], max_items) for account_id in kept}
+            reduced['accounts_omitted'] = len(item) - max_items
+        elif isinstance(item, list) and len(item) > max_items:
+            reduced[key] = [digest(entry, max_items) for entry in item[:max_items]]
+            reduced[f"{key}_omitted"] = len(item) - max_items
+        elif isinstance(item, dict):
+            reduced[key] = digest(item, max_items)
+        else:
+            reduced[key] = item
+    return reduced
+
+
+def item_count(section: Dict[str, Any], field: str) -> int:
+    """Length of a list field, counting the items a digest left out"""
+    return len(section.get(field, [])) + section.get(f"{field}_omitted", 0)
+
+
+def publish_report(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Stream a run result to the report sink and return its digest
+
+    The digest gets a 'report' pointer ({'location', 'records', 'bytes'})
+    to the gzip JSON Lines file, or 'report_error' when it could not be
+    written; the detail beyond the digest is then lost.
+    """
+    reduced = digest(results)
+    if not REPORTS_ENABLED:
+        return reduced
+
+    run_id = results.get('run_id') or uuid.uuid4().hex
+    sink = open_report_sink(STATE_NAMESPACE, f"reports/{results['timestamp'][:10]}/{run_id}.jsonl.gz")
+    try:
+        sink.write_all(iter_records(results))
+        reduced['report'] = sink.close()
+        print(f"Wrote {reduced['report']['records']} report records to {reduced['report']['location']}")
+    except Exception as e:
+        print(f"Error writing run report: {e}")
+        sink.discard()
+        reduced['report_error'] = str(e)
+    return reduced
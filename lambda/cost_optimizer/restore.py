@@ -0,0 +1,345 @@
+"""
+Restore Module
+Records what the optimizer stopped and starts it back before working hours
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from deadline import Deadline
+from discovery import iter_db_instances, iter_ec2_instances
+from executor import run_bounded, run_batched, is_instance_error, MAX_CONCURRENCY
+from metrics import metrics
+from rate_limiter import THROTTLE_ERROR_CODES
+from scale_ecs_tasks import scale_ecs_services
+from state_store import get_state_store
+
+STATE_NAMESPACE = 'cost-optimizer'
+# One document per recording, so concurrent runs never overwrite each other
+RECORD_PREFIX = 'restore/records/'
+
+# How often restore polls started RDS instances before scaling ECS back up
+RESTORE_POLL_SECONDS = int(os.environ.get('RESTORE_POLL_SECONDS', '15'))
+# Upper bound on that wait within one invocation when no Lambda deadline applies
+RESTORE_MAX_WAIT_SECONDS = int(os.environ.get('RESTORE_MAX_WAIT_SECONDS', '900'))
+# Instance IDs per start_instances call; a chunk failed by one instance is bisected to isolate the bad IDs
+EC2_START_BATCH_SIZE = int(os.environ.get('EC2_START_BATCH_SIZE', '50'))
+# Start errors for resources that no longer exist; retrying those is pointless
+GONE_ERROR_CODES = ('DBInstanceNotFound', 'DBInstanceNotFoundFault', 'InvalidInstanceID.NotFound')
+# Start errors for resources that are not stopped; their current state tells what happened
+NOT_STOPPED_ERROR_CODES = ('InvalidDBInstanceState', 'IncorrectInstanceState')
+# States of a resource someone else already started, or is starting; it counts as restored
+STARTED_STATES = {
+    'ec2': ('pending', 'running'),
+    'rds': ('available', 'starting', 'backing-up', 'modifying', 'configuring-enhanced-monitoring')
+}
+# States of a resource on its way out; it is dropped like one that no longer exists
+GONE_STATES = {
+    'ec2': ('shutting-down', 'terminated'),
+    'rds': ('deleting',)
+}
+# How each section's resources are named in the logs
+LABELS = {'ec2': 'EC2 instance', 'rds': 'RDS instance'}
+# Failed starts, not counting throttling or service errors, after which a resource is given up on
+RESTORE_MAX_ATTEMPTS = int(os.environ.get('RESTORE_MAX_ATTEMPTS', '3'))
+
+
+def stopped_resources(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract what one scope's action result stopped or scaled down
+
+    Returns:
+        {'ec2': [instance IDs], 'rds': [DB identifiers],
+         'ecs': {'<cluster>/<service>': original desiredCount}}
+    """
+    return {
+        'ec2': list(result.get('ec2', {}).get('stopped', [])),
+        'rds': list(result.get('rds', {}).get('stopped', [])),
+        'ecs': {
+            f"{entry['cluster']}/{entry['service']}": entry['previous_count']
+            for entry in result.get('ecs', {}).get('services_scaled', [])
+        }
+    }
+
+
+def _is_empty(entry: Dict[str, Any]) -> bool:
+    return not (entry.get('ec2') or entry.get('rds') or entry.get('ecs'))
+
+
+def _merge_scopes(manifest: Dict[str, Any], scopes: Dict[str, Dict[str, Any]]):
+    """
+    Fold a record's scopes into the manifest
+
+    Records are merged oldest first, so an ECS service scaled down twice
+    keeps the count it had before the first scale-down, which is the one
+    worth restoring.
+    """
+    for scope, entry in scopes.items():
+        target = manifest['scopes'].setdefault(scope, {'ec2': [], 'rds': [], 'ecs': {}})
+        target['ec2'] = sorted(set(target['ec2']) | set(entry.get('ec2', [])))
+        target['rds'] = sorted(set(target['rds']) | set(entry.get('rds', [])))
+        target['ecs'] = {**entry.get('ecs', {}), **target['ecs']}
+        if entry.get('rds_waiting'):
+            target['rds_waiting'] = sorted(set(target.get('rds_waiting', [])) | set(entry['rds_waiting']))
+        for key, attempts in entry.get('failures', {}).items():
+            target.setdefault('failures', {})[key] = max(attempts, target.get('failures', {}).get(key, 0))
+
+
+def _put_record(scopes: Dict[str, Dict[str, Any]]):
+    now = datetime.now(timezone.utc)
+    # Timestamped keys list in recording order
+    key = f"{RECORD_PREFIX}{now.strftime('%Y%m%dT%H%M%S%fZ')}-{uuid.uuid4().hex[:8]}.json"
+    get_state_store(STATE_NAMESPACE).put(key, {'recorded_at': now.isoformat(), 'scopes': scopes})
+
+
+def load_manifest() -> Dict[str, Any]:
+    """
+    Load the restore manifest, keyed by scope ('<account>/<region>')
+
+    The manifest is the merge of every record written since the last
+    restore; 'keys' lists the documents it was read from.
+    """
+    store = get_state_store(STATE_NAMESPACE)
+    manifest = {'scopes': {}, 'keys': []}
+    for key in store.keys(RECORD_PREFIX):
+        document = store.get(key)
+        if document is not None:
+            _merge_scopes(manifest, document.get('scopes', {}))
+            manifest['keys'].append(key)
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any]):
+    """
+    Replace the records a manifest was loaded from with what is left of it
+
+    The remainder is written as a new record before the old ones are
+    deleted, so a failure in between only leaves duplicates, which merge
+    away. Records added by runs after the load are not touched.
+    """
+    scopes = {scope: entry for scope, entry in manifest['scopes'].items() if not _is_empty(entry)}
+    if scopes:
+        _put_record(scopes)
+    store = get_state_store(STATE_NAMESPACE)
+    for key in manifest.get('keys', []):
+        store.delete(key)
+
+
+def record_stopped(stopped: Dict[str, Dict[str, Any]]):
+    """Add resources stopped by a run to the restore manifest, as a record of their own"""
+    stopped = {scope: entry for scope, entry in stopped.items() if not _is_empty(entry)}
+    if stopped:
+        _put_record(stopped)
+
+
+def _error_code(error: Exception) -> str:
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') or ''
+
+
+def _is_transient(error: Exception) -> bool:
+    """True for throttling and service-side errors, which say nothing about the resource"""
+    status = getattr(error, 'response', {}).get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+    return _error_code(error) in THROTTLE_ERROR_CODES or status >= 500
+
+
+def _settle_start_errors(
+    kind: str,
+    outcomes: List[Tuple[str, Any, Optional[Exception]]],
+    states: Callable[[List[str]], Dict[str, str]],
+    entry: Dict[str, Any],
+    result: Dict[str, Any],
+    remaining: Dict[str, Any]
+) -> List[str]:
+    """
+    Sort one section's start outcomes into started, dropped and retried
+
+    A resource whose start was refused because it is not stopped is looked
+    up: one already running counts as started, one no longer there is
+    dropped, one still stopping is retried. Any other failed start is
+    retried too, until RESTORE_MAX_ATTEMPTS failures that were not
+    throttling or service errors, after which it is dropped and listed
+    under 'abandoned'. states maps IDs to their current state.
+
+    Returns:
+        IDs started, by this call or by someone else
+    """
+    not_stopped = [item for item, _, error in outcomes if error is not None
+                   and _error_code(error) in NOT_STOPPED_ERROR_CODES]
+    try:
+        current = states(not_stopped) if not_stopped else {}
+    except Exception as e:
+        print(f"Error describing {LABELS[kind]}s that were not stopped: {e}")
+        current, not_stopped = {}, []
+
+    started = []
+    for item, _, error in outcomes:
+        if error is None:
+            started.append(item)
+            continue
+
+        state = current.get(item)
+        if item in not_stopped and state in STARTED_STATES[kind]:
+            print(f"{LABELS[kind]} {item} is already {state}")
+            started.append(item)
+            continue
+
+        print(f"Error starting {LABELS[kind]} {item}: {error}")
+        result[kind].setdefault('error', []).append(f"{item}: {str(error)}")
+        gone = item in not_stopped and (state is None or state in GONE_STATES[kind])
+        if gone or _error_code(error) in GONE_ERROR_CODES:
+            continue
+
+        key = f"{kind}/{item}"
+        transient = _is_transient(error) or state == 'stopping'
+        attempts = entry.get('failures', {}).get(key, 0) + (0 if transient else 1)
+        if attempts >= RESTORE_MAX_ATTEMPTS:
+            print(f"Giving up on {LABELS[kind]} {item} after {attempts} failed starts")
+            result[kind].setdefault('abandoned', []).append(item)
+            continue
+        remaining[kind].append(item)
+        if attempts:
+            remaining['failures'][key] = attempts
+    return started
+
+
+def _wait_for_rds(rds_client, db_ids: List[str], deadline: Deadline) -> List[str]:
+    """
+    Poll started DB instances until they are available or time runs out
+
+    Returns:
+        Identifiers still not available
+    """
+    waiting = list(db_ids)
+    started_at = time.monotonic()
+    while waiting:
+        statuses = {
+            db['DBInstanceIdentifier']: db['DBInstanceStatus']
+            for db in iter_db_instances(rds_client, db_instance_ids=waiting)
+        }
+        # Instances that disappeared are not worth waiting for
+        waiting = [db_id for db_id in waiting if statuses.get(db_id, 'available') != 'available']
+        if not waiting:
+            break
+
+        remaining = deadline.remaining_ms()
+        out_of_time = (
+            remaining is not None and remaining - deadline.margin_ms < RESTORE_POLL_SECONDS * 1000
+        ) or time.monotonic() - started_at + RESTORE_POLL_SECONDS > RESTORE_MAX_WAIT_SECONDS
+        if out_of_time:
+            break
+        time.sleep(RESTORE_POLL_SECONDS)
+    return waiting
+
+
+def restore_scope(
+    entry: Dict[str, Any],
+    clients: Callable[[str], Any],
+    deadline: Optional[Deadline] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Start back one scope's stopped resources
+
+    RDS instances are started first since applications depend on them,
+    EC2 instances alongside. ECS services are scaled back to their
+    original desiredCount once the scope's RDS instances are available;
+    if they are not ready before the deadline the services, and the
+    databases they wait on, stay in the returned 'remaining' entry for the
+    next invocation. So does every resource whose start or scale-back
+    failed, unless it no longer exists or keeps failing, see
+    _settle_start_errors.
+
+    Returns:
+        Result sections plus 'remaining', the part of entry still to restore
+    """
+    deadline = deadline or Deadline()
+    result = {
+        'ec2': {'started': []},
+        'rds': {'started': []},
+        'ecs': {'services_restored': []}
+    }
+    remaining = {'ec2': [], 'rds': [], 'ecs': dict(entry.get('ecs', {})), 'failures': {}}
+
+    if dry_run:
+        result['ec2']['started'] = list(entry.get('ec2', []))
+        result['rds']['started'] = list(entry.get('rds', []))
+        result['ecs']['services_restored'] = sorted(entry.get('ecs', {}))
+        result['remaining'] = entry
+        return result
+
+    rds_client = clients('rds')
+    rds_started = []
+    if entry.get('rds'):
+        with metrics.span('start_calls'):
+            outcomes = run_bounded(
+                lambda db_id: rds_client.start_db_instance(DBInstanceIdentifier=db_id),
+                entry['rds'],
+                max_concurrency
+            )
+        rds_started = _settle_start_errors(
+            'rds', outcomes,
+            lambda db_ids: {
+                db['DBInstanceIdentifier']: db['DBInstanceStatus']
+                for db in iter_db_instances(rds_client, db_instance_ids=db_ids)
+            },
+            entry, result, remaining
+        )
+        for db_id in rds_started:
+            print(f"Started RDS instance: {db_id}")
+        result['rds']['started'] = rds_started
+
+    if entry.get('ec2'):
+        ec2_client = clients('ec2')
+        with metrics.span('start_calls'):
+            outcomes = run_batched(
+                lambda batch: ec2_client.start_instances(InstanceIds=batch),
+                entry['ec2'],
+                EC2_START_BATCH_SIZE,
+                max_concurrency,
+                should_split=is_instance_error
+            )
+        result['ec2']['started'] = _settle_start_errors(
+            'ec2', outcomes,
+            lambda instance_ids: {
+                instance['InstanceId']: instance['State']['Name']
+                for instance in iter_ec2_instances(ec2_client, instance_ids=instance_ids)
+            },
+            entry, result, remaining
+        )
+        if result['ec2']['started']:
+            print(f"Started {len(result['ec2']['started'])} EC2 instances: {result['ec2']['started']}")
+
+    if entry.get('ecs'):
+        # Databases a previous invocation started but did not see become available
+        waiting = rds_started + entry.get('rds_waiting', [])
+        with metrics.span('rds_wait'):
+            not_ready = _wait_for_rds(rds_client, waiting, deadline) if waiting else []
+        if not_ready:
+            print(f"RDS not yet available ({', '.join(not_ready)}), deferring ECS restore")
+            result['ecs']['deferred'] = len(entry['ecs'])
+            remaining['rds_waiting'] = not_ready
+            result['remaining'] = remaining
+            return result
+
+        plan = []
+        for key, desired_count in entry['ecs'].items():
+            cluster, service = key.rsplit('/', 1)
+            plan.append({'cluster': cluster, 'service': service, 'desired_count': desired_count})
+
+        for scaled in scale_ecs_services(plan, max_concurrency=max_concurrency, clients=clients):
+            key = f"{scaled['cluster']}/{scaled['service']}"
+            # A failed scale-back is retried next time, unless the service is gone
+            if scaled['success'] or scaled.get('missing'):
+                remaining['ecs'].pop(key, None)
+            if scaled['success']:
+                result['ecs']['services_restored'].append(scaled)
+                print(f"Restored {scaled['service']} from {scaled['previous_count']} to {scaled['new_count']} tasks")
+            else:
+                print(f"Error restoring service {scaled['service']}: {scaled.get('error')}")
+                result['ecs'].setdefault('error', []).append(f"{scaled['service']}: {scaled.get('error')}")
+
+    result['remaining'] = remaining
+    return result
@@ -0,0 +1,61 @@
+"""
+Run Context Module
+Per-invocation settings and resumable cursors shared by every region and account worker
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from deadline import Deadline
+from executor import MAX_CONCURRENCY
+from scheduler import CallBudget
+
+
+class RunContext:
+    """
+    Shared state for one optimizer invocation
+
+    Cursors are keyed by scope (account/region) and phase (ec2, rds, ecs).
+    Each cursor is only ever touched by the worker that owns its scope, so
+    only cursor creation needs the lock.
+    """
+
+    def __init__(self, dry_run: bool = False, max_concurrency: int = MAX_CONCURRENCY,
+                 deadline: Optional[Deadline] = None, cursors: Optional[Dict[str, Any]] = None,
+                 use_inventory: bool = False, plan: Optional[Dict[str, Any]] = None,
+                 planned: Optional[Dict[str, Any]] = None, aggressive: bool = False,
+                 budget: Optional[CallBudget] = None):
+        self.dry_run = dry_run
+        self.max_concurrency = max_concurrency
+        self.use_inventory = use_inventory
+        # Widen the candidate set: untagged environment resources and ECS services scaled to zero
+        self.aggressive = aggressive
+        # Stop and scale-down calls shared by every scope of the invocation
+        self.budget = budget or CallBudget()
+        # Resources of the plan being applied, keyed by scope then section
+        self.plan = plan
+        # Resources recorded by a planning run, same layout as plan
+        self.planned = planned
+        # Resources this invocation stopped or scaled down, for the restore manifest
+        self.stopped: Dict[str, Dict[str, Any]] = {}
+        self.deadline = deadline or Deadline()
+        self.cursors = cursors if cursors is not None else {}
+        self._lock = threading.Lock()
+
+    def cursor(self, scope: str, phase: str) -> Dict[str, Any]:
+        """Return the mutable cursor for a scope and phase"""
+        with self._lock:
+            return self.cursors.setdefault(f"{scope}:{phase}", {})
+
+    def record_plan(self, scope: str, section: str, resources: Dict[str, str]):
+        """Add resources a planning run would act on to its plan"""
+        with self._lock:
+            self.planned.setdefault(scope, {}).setdefault(section, {}).update(resources)
+
+    def record_stopped(self, scope: str, stopped: Dict[str, Any]):
+        """Remember what a scope's worker stopped so restore can start it back"""
+        with self._lock:
+            self.stopped[scope] = stopped
+
+    def is_complete(self) -> bool:
+        """True when every phase finished discovery and has no pending work"""
+        return all(cursor.get('complete') for cursor in self.cursors.values())
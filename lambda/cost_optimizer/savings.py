@@ -0,0 +1,141 @@
+"""
+Savings Module
+Estimates what stopping or scaling down a resource saves, from a bundled price index
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# On-demand hourly prices per region, bundled with the function; rebuild with scripts/build_price_index.py
+PRICE_INDEX_PATH = os.environ.get(
+    'PRICE_INDEX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_index.json')
+)
+DEFAULT_REGION = os.environ.get('AWS_REGION', os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+BUSINESS_HOURS_START = os.environ.get('BUSINESS_HOURS_START', '09:00')
+BUSINESS_HOURS_END = os.environ.get('BUSINESS_HOURS_END', '18:00')
+# Fargate task size assumed for ECS services, whose task definitions are not described
+ECS_TASK_VCPU = float(os.environ.get('ECS_TASK_VCPU', '0.25'))
+ECS_TASK_MEMORY_GB = float(os.environ.get('ECS_TASK_MEMORY_GB', '0.5'))
+
+WEEKS_PER_MONTH = 52 / 12
+
+
+def _hours(clock: str) -> float:
+    hours, minutes = clock.split(':')
+    return int(hours) + int(minutes) / 60
+
+
+def stopped_hours_per_month(start: str = BUSINESS_HOURS_START, end: str = BUSINESS_HOURS_END) -> float:
+    """Hours a month a resource stays stopped: weekday nights plus whole weekends"""
+    business_hours = (_hours(end) - _hours(start)) % 24
+    return round((5 * (24 - business_hours) + 48) * WEEKS_PER_MONTH, 1)
+
+
+STOPPED_HOURS_PER_MONTH = stopped_hours_per_month()
+
+
+class PriceIndex:
+    """
+    On-demand hourly prices keyed by (region, instance type or class, engine)
+
+    The bundled file stores one price per region for each type, in the
+    order of its 'regions' list; it is flattened into a dict once so every
+    lookup is a single hash probe. EC2 prices are Linux with engine
+    'linux', RDS prices single-AZ with the DB engine name.
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        regions = document.get('regions', [])
+        self.generated = document.get('generated')
+        self.engine_aliases = document.get('engine_aliases', {})
+        self.prices: Dict[Tuple[str, str, str], float] = {}
+        for instance_type, prices in document.get('ec2', {}).items():
+            self._add(regions, instance_type, 'linux', prices)
+        for engine, classes in document.get('rds', {}).items():
+            for db_class, prices in classes.items():
+                self._add(regions, db_class, engine, prices)
+        fargate = document.get('fargate', {})
+        self._add(regions, 'fargate-vcpu', 'fargate', fargate.get('vcpu', []))
+        self._add(regions, 'fargate-gb', 'fargate', fargate.get('gb', []))
+
+    def _add(self, regions, name: str, engine: str, prices):
+        for region, price in zip(regions, prices):
+            if price is not None:
+                self.prices[(region, name, engine)] = price
+
+    @classmethod
+    def load(cls, path: str = PRICE_INDEX_PATH) -> 'PriceIndex':
+        """Load the bundled index; a missing or unreadable file gives an empty index"""
+        try:
+            with open(path) as f:
+                return cls(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading price index {path}, savings will not be estimated: {e}")
+            return cls({})
+
+    def hourly(self, region: Optional[str], name: str, engine: str) -> Optional[float]:
+        return self.prices.get((region or DEFAULT_REGION, name, engine))
+
+    def ec2_hourly(self, region: Optional[str], instance_type: str) -> Optional[float]:
+        return self.hourly(region, instance_type, 'linux')
+
+    def rds_hourly(self, region: Optional[str], db_class: str, engine: str) -> Optional[float]:
+        engine = self.engine_aliases.get(engine, engine)
+        return self.hourly(region, db_class, engine)
+
+    def ecs_task_hourly(self, region: Optional[str], vcpu: float = ECS_TASK_VCPU,
+                        memory_gb: float = ECS_TASK_MEMORY_GB) -> Optional[float]:
+        vcpu_price = self.hourly(region, 'fargate-vcpu', 'fargate')
+        gb_price = self.hourly(region, 'fargate-gb', 'fargate')
+        if vcpu_price is None or gb_price is None:
+            return None
+        return round(vcpu * vcpu_price + memory_gb * gb_price, 6)
+
+
+# Loaded once per container
+price_index = PriceIndex.load()
+
+
+def resource_savings(hourly: Optional[float]) -> Dict[str, Optional[float]]:
+    """Per-resource savings fields for an hourly price, None when unpriced"""
+    if hourly is None:
+        return {'hourly_savings': None, 'monthly_savings': None}
+    return {'hourly_savings': hourly, 'monthly_savings': round(hourly * STOPPED_HOURS_PER_MONTH, 2)}
+
+
+def savings_summary(entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Total the 'hourly_savings' of resources stopped or scaled down
+
+    Returns:
+        {'hourly_savings', 'monthly_savings'} plus 'unpriced', the number of
+        resources with no price in the index, when there are any
+    """
+    hourly = 0.0
+    unpriced = 0
+    for entry in entries:
+        if entry.get('hourly_savings') is None:
+            unpriced += 1
+        else:
+            hourly += entry['hourly_savings']
+    summary = {
+        'hourly_savings': round(hourly, 4),
+        'monthly_savings': round(hourly * STOPPED_HOURS_PER_MONTH, 2)
+    }
+    if unpriced:
+        summary['unpriced'] = unpriced
+    return summary
+
+
+def total_savings(results: Dict[str, Any], sections: Iterable[str]) -> Dict[str, Any]:
+    """Sum the savings of every section of a report"""
+    hourly = sum(results[section].get('hourly_savings', 0) for section in sections if section in results)
+    unpriced = sum(results[section].get('unpriced', 0) for section in sections if section in results)
+    total = {
+        'hourly_savings': round(hourly, 4),
+        'monthly_savings': round(hourly * STOPPED_HOURS_PER_MONTH, 2),
+        'stopped_hours_per_month': STOPPED_HOURS_PER_MONTH
+    }
+    if unpriced:
+        total['unpriced'] = unpriced
+    return total
@@ -2,10 +2,12 @@
 ECS Task Scaling Module
 Scales ECS tasks based on cost optimization requirements
 """
-import boto3
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 
-ecs_client = boto3.client('ecs')
+from aws_clients import get_client
+from discovery import describe_ecs_services, iter_ecs_services, scan_ecs_clusters
+from executor import run_bounded
+from tag_policy import selector
 
 
 def scale_ecs_service(cluster_name: str, service_name: str, desired_count: int, dry_run: bool = False) -> Dict[str, Any]:
@@ -21,95 +23,141 @@ def scale_ecs_service(cluster_name: str, service_name: str, desired_count: int,
     Returns:
         Dictionary with scaling results
     """
-    result = {
-        'cluster': cluster_name,
-        'service': service_name,
-        'previous_count': 0,
-        'new_count': desired_count,
-        'success': False
-    }
+    plan = [{'cluster': cluster_name, 'service': service_name, 'desired_count': desired_count}]
+    return scale_ecs_services(plan, dry_run)[0]
+
+
+def scale_ecs_services(
+    plan: List[Dict[str, Any]],
+    dry_run: bool = False,
+    max_concurrency: Optional[int] = None,
+    clients: Optional[Callable[[str], Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Scale many ECS services, describing each cluster's services in batches
     
-    try:
-        # Get current service configuration
-        response = ecs_client.describe_services(
-            cluster=cluster_name,
-            services=[service_name]
-        )
-        
-        if not response['services']:
-            result['error'] = f"Service {service_name} not found"
-            return result
-        
-        service = response['services'][0]
-        result['previous_count'] = service['desiredCount']
+    Targets are grouped by cluster and their current counts read with one
+    describe_services call per 10 services. Services already at their
+    desired count are skipped and the remaining updates run concurrently.
+    
+    Args:
+        plan: Targets as dicts with 'cluster', 'service' and 'desired_count'
+        dry_run: If True, only simulate the action
+        max_concurrency: Concurrent update_service calls (defaults to MAX_CONCURRENCY)
+        clients: Client factory for another account or region (defaults to get_client)
         
-        # Check if scaling is needed
-        if result['previous_count'] == desired_count:
-            result['message'] = "No scaling needed"
-            result['success'] = True
-            return result
+    Returns:
+        One result per target, in plan order, shaped like scale_ecs_service's
+    """
+    results = [
+        {
+            'cluster': target['cluster'],
+            'service': target['service'],
+            'previous_count': 0,
+            'new_count': target['desired_count'],
+            'success': False
+        }
+        for target in plan
+    ]
+    
+    ecs_client = (clients or get_client)('ecs')
+    
+    by_cluster = {}
+    for result in results:
+        by_cluster.setdefault(result['cluster'], []).append(result)
+    
+    # Get current service configuration
+    updates = []
+    for cluster, cluster_results in by_cluster.items():
+        try:
+            described = {}
+            for service in describe_ecs_services(ecs_client, cluster, [r['service'] for r in cluster_results]):
+                described[service['serviceName']] = service
+                described[service['serviceArn']] = service
+        except Exception as e:
+            for result in cluster_results:
+                result['error'] = str(e)
+            continue
         
-        # Perform scaling
-        if not dry_run:
-            ecs_client.update_service(
-                cluster=cluster_name,
-                service=service_name,
-                desiredCount=desired_count
-            )
+        for result in cluster_results:
+            service = described.get(result['service'])
+            if service is None:
+                result['error'] = f"Service {result['service']} not found"
+                result['missing'] = True
+                continue
+            
+            result['previous_count'] = service['desiredCount']
+            
+            # Check if scaling is needed
+            if result['previous_count'] == result['new_count']:
+                result['message'] = "No scaling needed"
+                result['success'] = True
+            elif dry_run:
+                result['success'] = True
+                result['message'] = (
+                    f"DRY RUN: Would scale from {result['previous_count']} to {result['new_count']} tasks"
+                )
+            else:
+                updates.append(result)
+    
+    # Perform scaling
+    outcomes = run_bounded(
+        lambda result: ecs_client.update_service(
+            cluster=result['cluster'],
+            service=result['service'],
+            desiredCount=result['new_count']
+        ),
+        updates,
+        max_concurrency
+    )
+    for result, _, error in outcomes:
+        if error is None:
             result['success'] = True
-            result['message'] = f"Scaled from {result['previous_count']} to {desired_count} tasks"
+            result['message'] = f"Scaled from {result['previous_count']} to {result['new_count']} tasks"
         else:
-            result['success'] = True
-            result['message'] = f"DRY RUN: Would scale from {result['previous_count']} to {desired_count} tasks"
-        
-    except Exception as e:
-        result['error'] = str(e)
+            result['error'] = str(error)
     
-    return result
+    return results
 
 
-def get_scalable_services(environment: str) -> List[Dict[str, str]]:
+def get_scalable_services(environment: str, max_concurrency: Optional[int] = None) -> List[Dict[str, str]]:
     """
     Get list of ECS services that can be scaled for cost optimization
     
     Args:
         environment: Environment name (dev, staging, prod)
+        max_concurrency: Clusters scanned at once (defaults to MAX_CONCURRENCY)
         
     Returns:
         List of services with cluster and service names
     """
     services = []
+    ecs_client = get_client('ecs')
+    policy = selector('ecs', environment)
     
-    try:
-        # List all clusters
-        clusters_response = ecs_client.list_clusters()
+    def scan_cluster(cluster_arn: str) -> List[Dict[str, Any]]:
+        cluster_name = cluster_arn.split('/')[-1]
+        found = []
         
-        for cluster_arn in clusters_response['clusterArns']:
-            cluster_name = cluster_arn.split('/')[-1]
+        # Describe services page by page to get tags
+        for service in iter_ecs_services(ecs_client, cluster_arn):
+            tags = {tag['key']: tag['value'] for tag in service.get('tags', [])}
             
-            # List services in cluster
-            services_response = ecs_client.list_services(cluster=cluster_arn)
-            
-            if not services_response['serviceArns']:
+            # Check if the tag policy selects the service
+            if policy.matches(tags):
+                found.append({
+                    'cluster': cluster_name,
+                    'service': service['serviceName'],
+                    'current_count': service['desiredCount']
+                })
+        return found
+    
+    try:
+        for cluster_arn, found, error in scan_ecs_clusters(ecs_client, scan_cluster, max_workers=max_concurrency):
+            if error is not None:
+                print(f"Error scanning cluster {cluster_arn}: {error}")
                 continue
-            
-            # Describe services to get tags
-            services_detail = ecs_client.describe_services(
-                cluster=cluster_arn,
-                services=services_response['serviceArns']
-            )
-            
-            for service in services_detail['services']:
-                tags = {tag['key']: tag['value'] for tag in service.get('tags', [])}
-                
-                # Check if service is in the target environment and has AutoScale tag
-                if (tags.get('Environment', '').lower() == environment.lower() and
-                    tags.get('AutoScale', '').lower() == 'true'):
-                    services.append({
-                        'cluster': cluster_name,
-                        'service': service['serviceName'],
-                        'current_count': service['desiredCount']
-                    })
+            services.extend(found)
     
     except Exception as e:
         print(f"Error getting scalable services: {e}")
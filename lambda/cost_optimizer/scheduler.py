@@ -0,0 +1,181 @@
+"""
+Scheduler Module
+Runs stop and scale-down calls across services in order of estimated savings per API call
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from deadline import Deadline
+from executor import run_bounded, Deferred, MAX_CONCURRENCY
+from savings import savings_summary
+
+# Stop and scale-down calls one invocation may make; 0 is unlimited
+API_CALL_BUDGET = int(os.environ.get('API_CALL_BUDGET', '0'))
+
+
+class CallBudget:
+    """
+    API calls a run may still spend on actions
+
+    Checked before each action starts, so concurrent workers can overshoot
+    the limit by at most the number of actions already in flight. spent
+    starts from what earlier invocations of a resumed run used.
+    """
+
+    def __init__(self, limit: Optional[int] = None, spent: int = 0):
+        self.limit = limit or None
+        self.spent = spent
+        self._lock = threading.Lock()
+
+    def spend(self, calls: int = 1):
+        with self._lock:
+            self.spent += calls
+
+    def try_spend(self, calls: int = 1) -> bool:
+        """Spend calls unless the budget is already exhausted; False when refused"""
+        with self._lock:
+            if self.limit is not None and self.spent >= self.limit:
+                return False
+            self.spent += calls
+            return True
+
+    def exhausted(self) -> bool:
+        return self.limit is not None and self.spent >= self.limit
+
+
+def close_phase(cursor: Dict[str, Any], processed: set, pending: List[Dict[str, Any]]):
+    """Record the handled and still-pending resources of a phase in its cursor"""
+    cursor['processed'] = sorted(processed)
+    cursor['pending'] = pending
+    cursor['complete'] = bool(cursor.get('discovered')) and not pending
+
+
+class SectionWork:
+    """
+    One section's pending stop or scale-down work within a scope
+
+    Args:
+        section: 'ec2', 'rds' or 'ecs'
+        result: The section's result dict; errors are appended to it
+        cursor: The section's phase cursor, closed once the work has run
+        processed: Keys of resources already handled
+        candidates: Resources to act on, each with an 'hourly_savings' estimate
+        call: Acts on a list of resources and returns (resource, error) for each
+        key: Resource key recorded in processed
+        label: Resource name used in error messages
+        on_success: Records a resource the call went through for
+        batch_size: Resources handled by one call
+
+    budget is set by run_scheduled, so a call that makes extra API calls
+    (e.g. bisecting a failed batch) can charge them to the run.
+    """
+
+    def __init__(self, section: str, result: Dict[str, Any], cursor: Dict[str, Any], processed: set,
+                 candidates: List[Dict[str, Any]],
+                 call: Callable[[List[Dict[str, Any]]], List[Tuple[Dict[str, Any], Optional[Exception]]]],
+                 key: Callable[[Dict[str, Any]], str], label: Callable[[Dict[str, Any]], str],
+                 on_success: Callable[[Dict[str, Any]], None], batch_size: int = 1):
+        self.section = section
+        self.result = result
+        self.cursor = cursor
+        self.processed = processed
+        self.candidates = candidates
+        self.call = call
+        self.key = key
+        self.label = label
+        self.on_success = on_success
+        self.batch_size = batch_size
+        self.budget = CallBudget()
+        self.done: List[Dict[str, Any]] = []
+        self.remaining: List[Dict[str, Any]] = []
+
+    def record(self, entry: Dict[str, Any], error: Optional[Exception]):
+        self.processed.add(self.key(entry))
+        if error is None:
+            self.done.append(entry)
+            self.on_success(entry)
+            return
+        print(f"Error acting on {self.section} resource {self.label(entry)}: {error}")
+        if 'error' not in self.result:
+            self.result['error'] = []
+        self.result['error'].append(f"{self.label(entry)}: {str(error)}")
+
+
+class Action:
+    """One API call's worth of a section's work"""
+
+    __slots__ = ('work', 'entries', 'value')
+
+    def __init__(self, work: SectionWork, entries: List[Dict[str, Any]]):
+        self.work = work
+        self.entries = entries
+        # Hourly savings bought by the call; unpriced resources count as nothing
+        self.value = sum(entry.get('hourly_savings') or 0 for entry in entries)
+
+
+def build_actions(works: List[SectionWork]) -> List[Action]:
+    """
+    Split each section's candidates into one action per API call
+
+    Candidates are sorted by savings first, so batched sections put their
+    most valuable resources in the earliest batches.
+    """
+    actions = []
+    for work in works:
+        ranked = sorted(work.candidates, key=lambda entry: entry.get('hourly_savings') or 0, reverse=True)
+        for start in range(0, len(ranked), work.batch_size):
+            actions.append(Action(work, ranked[start:start + work.batch_size]))
+    return actions
+
+
+def prioritize(actions: List[Action]) -> List[Action]:
+    """Order actions by savings per API call, highest first; ties keep their order"""
+    return sorted(actions, key=lambda action: action.value, reverse=True)
+
+
+def run_scheduled(
+    works: List[SectionWork],
+    max_concurrency: int = MAX_CONCURRENCY,
+    deadline: Optional[Deadline] = None,
+    budget: Optional[CallBudget] = None
+):
+    """
+    Run every section's work, most savings per API call first
+
+    Actions start in priority order on the bounded executor; once the
+    deadline expires or the call budget is spent, the rest are left
+    pending in their cursors for the next invocation. So are entries a
+    call itself deferred. Every cursor is closed and each section's result
+    gets the savings of what went through.
+    """
+    deadline = deadline or Deadline()
+    budget = budget or CallBudget()
+    for work in works:
+        work.budget = budget
+
+    def run(action: Action):
+        budget.spend()
+        return action.work.call(action.entries)
+
+    outcomes = run_bounded(
+        run,
+        prioritize(build_actions(works)),
+        max_concurrency,
+        stop_when=lambda: deadline.expired() or budget.exhausted()
+    )
+    for action, entry_outcomes, error in outcomes:
+        if isinstance(error, Deferred):
+            action.work.remaining.extend(action.entries)
+            continue
+        if error is not None:
+            entry_outcomes = [(entry, error) for entry in action.entries]
+        for entry, entry_error in entry_outcomes:
+            if isinstance(entry_error, Deferred):
+                action.work.remaining.append(entry)
+            else:
+                action.work.record(entry, entry_error)
+
+    for work in works:
+        work.result.update(savings_summary(work.done))
+        close_phase(work.cursor, work.processed, work.remaining)
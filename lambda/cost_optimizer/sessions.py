@@ -0,0 +1,85 @@
+"""
+Assumed-Role Session Pool
+Caches STS credentials, boto3 sessions and clients per member account
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from aws_clients import ClientRegistry, get_client, new_session
+
+# Refresh credentials this long before STS says they expire
+REFRESH_MARGIN = timedelta(minutes=5)
+SESSION_DURATION_SECONDS = 3600
+ROLE_SESSION_NAME = 'cost-optimizer'
+
+
+class _PooledSession:
+    """Client registry for one set of assumed-role credentials"""
+
+    def __init__(self, registry: ClientRegistry, expiration: datetime):
+        self.registry = registry
+        self.expiration = expiration
+
+    def is_fresh(self) -> bool:
+        return datetime.now(timezone.utc) < self.expiration - REFRESH_MARGIN
+
+
+class SessionPool:
+    """
+    Pool of assumed-role sessions keyed by role ARN
+
+    Sessions live for the container lifetime and are only re-assumed when
+    their credentials are within REFRESH_MARGIN of expiry, so repeated runs
+    skip both the AssumeRole call and client construction.
+    """
+
+    def __init__(self, role_session_name: str = ROLE_SESSION_NAME,
+                 duration_seconds: int = SESSION_DURATION_SECONDS):
+        self.role_session_name = role_session_name
+        self.duration_seconds = duration_seconds
+        self._sessions: Dict[str, _PooledSession] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, role_arn: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(role_arn, threading.Lock())
+
+    def _session(self, role_arn: str) -> _PooledSession:
+        pooled = self._sessions.get(role_arn)
+        if pooled is not None and pooled.is_fresh():
+            return pooled
+
+        with self._lock_for(role_arn):
+            pooled = self._sessions.get(role_arn)
+            if pooled is None or not pooled.is_fresh():
+                pooled = self._assume(role_arn)
+                self._sessions[role_arn] = pooled
+        return pooled
+
+    def _assume(self, role_arn: str) -> _PooledSession:
+        response = get_client('sts').assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=self.role_session_name,
+            DurationSeconds=self.duration_seconds
+        )
+        credentials = response['Credentials']
+        session = new_session(
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken']
+        )
+        return _PooledSession(ClientRegistry(session), credentials['Expiration'])
+
+    def clear(self):
+        """Drop every pooled session, so the next use assumes its role again"""
+        with self._locks_guard:
+            self._sessions.clear()
+
+    def clients(self, role_arn: str, region: Optional[str] = None) -> Callable[[str], Any]:
+        """Return a client factory for the role, bound to the given region"""
+        return lambda service_name: self._session(role_arn).registry.client(service_name, region)
+
+
+session_pool = SessionPool()
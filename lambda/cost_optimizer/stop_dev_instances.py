@@ -4,26 +4,70 @@ Safely stops non-production EC2 and RDS instances to reduce costs
 """
 import json
 import os
-import boto3
 from datetime import datetime, timezone
-from typing import Dict, List, Any
+from functools import partial
+from operator import itemgetter
+from typing import Callable, Dict, List, Any, Optional
 
-ec2_client = boto3.client('ec2')
-rds_client = boto3.client('rds')
-ecs_client = boto3.client('ecs')
-sns_client = boto3.client('sns')
+from checkpoint import new_checkpoint, load_checkpoint, save_checkpoint, delete_checkpoint, resume_async, MAX_RESUMES
+from aws_clients import get_client, regional_clients
+from deadline import Deadline
+from discovery import (
+    iter_ec2_instances, iter_db_instances, iter_ecs_clusters, iter_ecs_services, scan_ecs_clusters, db_instance_tags
+)
+from executor import run_bounded, run_batched, split_concurrency, is_instance_error, Deferred, MAX_CONCURRENCY
+from fanout import resolve_regions, resolve_accounts, merge_results, combine_reports, SECTIONS
+from metrics import metrics
+from inventory import load_candidates, reconcile, apply_event, USE_INVENTORY
+from plan import (
+    new_plan, save_plan, load_plan, plan_size, planned_resources, missing_resources, ec2_version, rds_version,
+    ecs_version
+)
+from restore import stopped_resources, record_stopped, load_manifest, save_manifest, restore_scope
+from run_context import RunContext
+from savings import price_index, resource_savings, savings_summary, total_savings
+from scheduler import SectionWork, CallBudget, run_scheduled, close_phase, API_CALL_BUDGET
+from tag_policy import selector
+from rate_limiter import rate_limiters
+from report import publish_report, digest, item_count
+from report_sink import bounded_json
+from sessions import session_pool
 
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'dev')
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
 ENABLE_AUTOMATION = os.environ.get('ENABLE_COST_AUTOMATION', 'true').lower() == 'true'
+TARGET_REGIONS = os.environ.get('TARGET_REGIONS', '')
+ORGANIZATION_MODE = os.environ.get('ORGANIZATION_MODE', 'false').lower() == 'true'
+ORGANIZATION_ROLE_NAME = os.environ.get('ORGANIZATION_ROLE_NAME', 'CostOptimizerMemberRole')
+
+ACTIONS = ('stop_dev_instances', 'scale_ecs_tasks')
+
+# Instance IDs per stop_instances call; a failed chunk is bisected to isolate the bad IDs
+EC2_STOP_BATCH_SIZE = int(os.environ.get('EC2_STOP_BATCH_SIZE', '50'))
 
 
 def lambda_handler(event, context):
     """Main Lambda handler"""
-    print(f"Event received: {json.dumps(event)}")
+    print(f"Event received: {bounded_json(event)}")
+    
+    # Resource state and tag changes routed here by EventBridge rules
+    if 'detail-type' in event:
+        return handle_inventory_event(event)
+    
+    rate_limiters.reset_stats()
+    metrics.reset()
     
     action = event.get('action', 'stop_dev_instances')
-    dry_run = event.get('dry_run', False)
+    # 'plan' records what a run would do without acting; apply it later with action 'apply'
+    planning = event.get('mode') == 'plan'
+    dry_run = event.get('dry_run', False) or planning
+    max_concurrency = int(event.get('max_concurrency', MAX_CONCURRENCY))
+    requested_regions = event.get('regions', TARGET_REGIONS)
+    organization = event.get('organization', ORGANIZATION_MODE)
+    use_inventory = event.get('use_inventory', USE_INVENTORY)
+    resume_run_id = event.get('resume_run_id')
+    # Stop and scale-down calls this invocation may make, most savings first
+    api_call_budget = int(event.get('api_call_budget', API_CALL_BUDGET))
     
     results = {
         'timestamp': datetime.now(timezone.utc).isoformat(),
@@ -43,16 +87,122 @@ def lambda_handler(event, context):
         }
     
     try:
-        if action == 'stop_dev_instances':
-            results['ec2'] = stop_dev_ec2_instances(dry_run)
-            results['rds'] = stop_dev_rds_instances(dry_run)
-        elif action == 'scale_ecs_tasks':
-            results['ecs'] = scale_down_ecs_tasks(dry_run)
+        if action in ACTIONS or action == 'apply':
+            plan = None
+            if action == 'apply':
+                plan = load_plan(event.get('plan_id'), ENVIRONMENT)
+                results['plan_id'] = plan['plan_id']
+                results['planned_action'] = plan['action']
+                action = plan['action']
+            
+            if resume_run_id:
+                checkpoint = load_checkpoint(resume_run_id)
+                if checkpoint is None:
+                    raise ValueError(f"Checkpoint not found for run {resume_run_id}")
+            elif plan:
+                # Scopes come from the plan so every planned resource is revisited
+                checkpoint = new_checkpoint(action)
+                checkpoint['regions'] = plan['regions']
+                if plan['accounts'] is not None:
+                    checkpoint['accounts'] = plan['accounts']
+                checkpoint['aggressive'] = plan.get('aggressive', False)
+            else:
+                checkpoint = new_checkpoint(action)
+                checkpoint['regions'] = resolve_regions(requested_regions)
+                if organization:
+                    checkpoint['accounts'] = resolve_accounts(event.get('accounts'))
+                # Budget alerts at or over 100% ask for an aggressive run
+                checkpoint['aggressive'] = bool(event.get('aggressive', False))
+            organization = 'accounts' in checkpoint
+            aggressive = checkpoint.get('aggressive', False)
+            if aggressive:
+                results['aggressive'] = True
+            
+            checkpoint['invocation'] += 1
+            results['run_id'] = checkpoint['run_id']
+            results['invocations'] = checkpoint['invocation']
+            regions = checkpoint['regions']
+            if regions != [None]:
+                results['regions'] = regions
+            
+            run = RunContext(
+                dry_run, max_concurrency, Deadline(context), checkpoint['cursors'], use_inventory,
+                plan=plan['resources'] if plan else None,
+                planned=checkpoint.setdefault('plan', {}) if planning else None,
+                aggressive=aggressive,
+                # Calls spent by earlier invocations count against the same budget
+                budget=CallBudget(api_call_budget, checkpoint.get('budget_spent', 0))
+            )
+            if organization:
+                report = run_organization(action, regions, run, checkpoint['accounts'])
+            else:
+                report = run_regions(action, regions, run)
+            checkpoint['reports'].append(report)
+            checkpoint['budget_spent'] = run.budget.spent
+            record_stopped(run.stopped)
+            
+            if not run.is_complete() and run.budget.exhausted():
+                # A resumed invocation could only spend past the budget; finish with the rest pending
+                checkpoint['stop_reason'] = 'api_call_budget'
+                results['stop_reason'] = 'api_call_budget'
+                results['message'] = (
+                    f"API call budget of {api_call_budget} spent, remaining actions left pending"
+                )
+            elif not run.is_complete():
+                if continue_run(checkpoint, event, context):
+                    results['message'] = f"Deadline reached, continuing run {checkpoint['run_id']}"
+                    results['rate_limits'] = report_rate_limits()
+                    emit_metrics(action)
+                    return {
+                        'statusCode': 202,
+                        'body': json.dumps(results)
+                    }
+                results['message'] = f"Run incomplete after {checkpoint['invocation']} invocations"
+            
+            if resume_run_id:
+                delete_checkpoint(checkpoint['run_id'])
+            results.update(combine_reports(checkpoint['reports']))
+            if checkpoint.get('stop_reason') == 'api_call_budget':
+                for section, entries in pending_actions(checkpoint['cursors']).items():
+                    results.setdefault(section, {})['pending'] = entries
+            results['savings'] = total_savings(results, SECTIONS)
+            
+            if planning:
+                execution_plan = new_plan(checkpoint, ENVIRONMENT)
+                save_plan(execution_plan)
+                results['plan_id'] = execution_plan['plan_id']
+                results['planned_resources'] = plan_size(execution_plan)
+                print(f"Saved plan {execution_plan['plan_id']} with {results['planned_resources']} resources")
+        elif action == 'restore':
+            results['restore'] = restore_stopped(Deadline(context), max_concurrency, dry_run)
+            deferred = results['restore'].get('ecs', {}).get('deferred', 0)
+            if deferred and continue_restore(event, context):
+                results['message'] = f"{deferred} ECS services waiting on RDS, continuing restore"
+                results['rate_limits'] = report_rate_limits()
+                emit_metrics(action)
+                return {
+                    'statusCode': 202,
+                    'body': json.dumps(results)
+                }
+        elif action == 'reconcile_inventory':
+            # Housekeeping for the own account only; no report is sent
+            results['inventory'] = reconcile_inventory(resolve_regions(requested_regions))
+            emit_metrics(action)
+            return {
+                'statusCode': 200,
+                'body': json.dumps(results)
+            }
         else:
             results['error'] = f"Unknown action: {action}"
         
+        results['rate_limits'] = report_rate_limits()
+        
+        # Full per-resource detail goes to the report; notification and response carry its digest
+        results = publish_report(results)
+        
         # Send notification
         send_notification(results)
+        emit_metrics(action)
         
         return {
             'statusCode': 200,
@@ -63,7 +213,10 @@ def lambda_handler(event, context):
         error_msg = f"Error in cost optimizer: {str(e)}"
         print(error_msg)
         results['error'] = error_msg
+        results['rate_limits'] = report_rate_limits()
+        results = digest(results)
         send_notification(results, is_error=True)
+        emit_metrics(action)
         
         return {
             'statusCode': 500,
@@ -71,123 +224,628 @@ def lambda_handler(event, context):
         }
 
 
-def stop_dev_ec2_instances(dry_run: bool = False) -> Dict[str, Any]:
-    """Stop EC2 instances tagged for auto-stop"""
-    print("Checking EC2 instances for cost optimization...")
+def pending_actions(cursors: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Resources still pending in a run's cursors, per section and tagged with their scope"""
+    pending = {}
+    for cursor_key, cursor in sorted(cursors.items()):
+        scope, section = cursor_key.rsplit(':', 1)
+        for entry in cursor.get('pending', []):
+            pending.setdefault(section, []).append({**entry, 'scope': scope})
+    return pending
+
+
+def report_rate_limits() -> Dict[str, Any]:
+    """Log per service/region limiter counters and return the totals for this invocation"""
+    print(f"API rate limits: {json.dumps(rate_limiters.stats())}")
+    return rate_limiters.totals()
+
+
+def emit_metrics(action: str):
+    """Write this invocation's phase timings and per-service API counts as EMF records"""
+    metrics.emit({'Action': action}, rate_limiters.stats())
+
+
+def handle_inventory_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply an EventBridge resource event to the inventory index"""
+    try:
+        result = apply_event(event, regional_clients(event.get('region')), ENVIRONMENT)
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+    except Exception as e:
+        # The next reconcile corrects whatever this event would have changed
+        print(f"Error applying inventory event: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
+
+
+def reconcile_inventory(regions: List[Optional[str]]) -> Dict[str, Any]:
+    """Rebuild the inventory index of every region from a full scan"""
+    outcomes = run_bounded(
+        lambda region: reconcile(regional_clients(region), ENVIRONMENT),
+        regions
+    )
+    return {
+        region or 'default': summary if error is None else {'error': str(error)}
+        for region, summary, error in outcomes
+    }
+
+
+def continue_run(checkpoint: Dict[str, Any], event: Dict[str, Any], context) -> bool:
+    """
+    Persist the checkpoint and re-invoke this function to continue the run
+
+    Returns:
+        True if a continuation was scheduled, False if the run must end here
+        (no Lambda context to re-invoke, or MAX_RESUMES reached)
+    """
+    function_arn = getattr(context, 'invoked_function_arn', None)
+    if not function_arn or checkpoint['invocation'] >= MAX_RESUMES:
+        print(f"Run {checkpoint['run_id']} cannot be continued, reporting partial results")
+        return False
+    
+    save_checkpoint(checkpoint)
+    status = resume_async(function_arn, event, checkpoint['run_id'])
+    print(f"Checkpointed run {checkpoint['run_id']} and re-invoked optimizer: {status}")
+    return True
+
+
+def run_organization(
+    action: str,
+    regions: List[Optional[str]],
+    run: RunContext,
+    accounts: List[str]
+) -> Dict[str, Any]:
+    """
+    Run an action in every member account of the organization
+
+    Member accounts are reached by assuming ORGANIZATION_ROLE_NAME through the
+    shared session pool; the Lambda's own account uses its execution role.
+    run.max_concurrency is split between the accounts run at once and
+    each account's regions, so it bounds the calls in flight overall.
+    Returns the roll-up sections plus a per-account report under 'accounts'.
+    """
+    own_account = get_client('sts').get_caller_identity()['Account']
+    print(f"Organization mode: {len(accounts)} accounts")
+    account_workers, per_account = split_concurrency(run.max_concurrency, len(accounts))
+    
+    def run_account(account_id: str) -> Dict[str, Any]:
+        if account_id == own_account:
+            client_factory = regional_clients
+        else:
+            role_arn = f"arn:aws:iam::{account_id}:role/{ORGANIZATION_ROLE_NAME}"
+            client_factory = partial(session_pool.clients, role_arn)
+        return run_regions(action, regions, run, client_factory, account_id, per_account)
     
-    # Find instances with AutoStop=true tag and not in production
-    filters = [
-        {'Name': 'tag:AutoStop', 'Values': ['true']},
-        {'Name': 'instance-state-name', 'Values': ['running']}
-    ]
+    outcomes = run_bounded(run_account, accounts, account_workers)
     
-    # Additional safety: exclude production environment
-    if ENVIRONMENT != 'prod':
-        filters.append({'Name': 'tag:Environment', 'Values': [ENVIRONMENT]})
+    report = merge_results(outcomes, label='account')
+    report['accounts'] = {
+        account_id: account_result if error is None else {'error': [str(error)]}
+        for account_id, account_result, error in outcomes
+    }
+    return report
+
+
+def run_regions(
+    action: str,
+    regions: List[Optional[str]],
+    run: RunContext,
+    client_factory: Optional[Callable[[Optional[str]], Callable[[str], Any]]] = None,
+    account_id: Optional[str] = None,
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run an action in every region concurrently and merge the results
+
+    Regions run concurrently, so wall-clock time tracks the slowest region
+    rather than the sum. max_concurrency (defaults to run.max_concurrency)
+    is split between the regions run at once and the calls each region
+    makes concurrently. If every region fails the first error is re-raised
+    so a single-region run keeps the original error path.
+    """
+    client_factory = client_factory or regional_clients
+    # The inventory index is only maintained for the Lambda's own account
+    indexed = run.use_inventory and account_id is None
+    region_workers, per_region = split_concurrency(max_concurrency or run.max_concurrency, len(regions))
+    outcomes = run_bounded(
+        lambda region: run_action(
+            action, run, client_factory(region), f"{account_id or 'self'}/{region or 'default'}", indexed,
+            per_region
+        ),
+        regions,
+        region_workers
+    )
+    
+    failures = [error for _, _, error in outcomes if error is not None]
+    if failures and len(failures) == len(outcomes):
+        raise failures[0]
+    
+    return merge_results(outcomes)
+
+
+def run_action(
+    action: str,
+    run: RunContext,
+    clients: Callable[[str], Any],
+    scope: str,
+    indexed: bool = False,
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Run one action against a single account/region scope
+
+    When applying a plan, only the scope's planned resources are described
+    and any whose state version changed since planning is skipped. When
+    indexed, candidates come from the region's inventory index and only
+    they are described; a missing or stale index falls back to a scan.
+    
+    Discovery runs for every section first, then the scope's stop and
+    scale-down calls are scheduled together, most savings per API call
+    first, so a run cut short by the deadline or the call budget has
+    already saved the most it could. An aggressive run also scales ECS
+    services to zero and takes untagged resources of the environment,
+    which the inventory index does not track. Scans and stop calls run
+    at most max_concurrency (defaults to run.max_concurrency) at a time.
+    """
+    max_concurrency = max_concurrency or run.max_concurrency
+    candidates = {}
+    expected = {}
+    if run.plan is not None:
+        expected = run.plan.get(scope, {})
+        candidates = {section: sorted(expected.get(section, {})) for section in SECTIONS}
+    elif indexed and not run.aggressive:
+        service_name = 'ec2' if action == 'stop_dev_instances' else 'ecs'
+        candidates = load_candidates(clients(service_name).meta.region_name) or {}
+    
+    scheduled = []
+    result = {}
+    if action == 'stop_dev_instances':
+        for section, run_section in (('ec2', stop_dev_ec2_instances), ('rds', stop_dev_rds_instances)):
+            result[section] = run_section(
+                run.dry_run, max_concurrency=max_concurrency, clients=clients, cursor=run.cursor(scope, section),
+                deadline=run.deadline, candidate_ids=candidates.get(section),
+                expected_versions=expected.get(section), aggressive=run.aggressive, scheduled=scheduled
+            )
+    if action == 'scale_ecs_tasks' or run.aggressive:
+        result['ecs'] = scale_down_ecs_tasks(
+            run.dry_run, max_concurrency=max_concurrency, clients=clients, cursor=run.cursor(scope, 'ecs'),
+            deadline=run.deadline, candidate_ids=candidates.get('ecs'),
+            expected_versions=expected.get('ecs'), aggressive=run.aggressive, scheduled=scheduled
+        )
+    if scheduled:
+        with metrics.span('stop_calls'):
+            run_scheduled(scheduled, max_concurrency, run.deadline, run.budget)
+    
+    if run.planned is not None:
+        for section, section_result in result.items():
+            run.record_plan(scope, section, planned_resources(section, section_result))
+    if not run.dry_run:
+        run.record_stopped(scope, stopped_resources(result))
+    return result
+
+
+def scope_clients(scope: str, own_account: Optional[str] = None) -> Callable[[str], Any]:
+    """Client factory for an '<account>/<region>' scope"""
+    account_id, region = scope.split('/', 1)
+    region = None if region == 'default' else region
+    if account_id in ('self', own_account):
+        return regional_clients(region)
+    role_arn = f"arn:aws:iam::{account_id}:role/{ORGANIZATION_ROLE_NAME}"
+    return session_pool.clients(role_arn, region)
+
+
+def restore_stopped(deadline: Deadline, max_concurrency: int = MAX_CONCURRENCY, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Start back everything the optimizer stopped, as recorded in the restore manifest
+
+    Scopes are restored concurrently, max_concurrency split between the
+    scopes and each scope's start calls. Within a scope RDS instances are
+    started first and ECS services only scaled back once their databases
+    are available, so applications come up against a ready backend.
+    Whatever is not restored yet stays in the manifest.
+    """
+    manifest = load_manifest()
+    scopes = sorted(manifest['scopes'])
+    if not scopes:
+        print("Nothing to restore")
+        return {}
     
-    response = ec2_client.describe_instances(Filters=filters)
+    own_account = None
+    if any(not scope.startswith('self/') for scope in scopes):
+        own_account = get_client('sts').get_caller_identity()['Account']
+    print(f"Restoring {len(scopes)} scopes")
+    
+    scope_workers, per_scope = split_concurrency(max_concurrency, len(scopes))
+    outcomes = run_bounded(
+        lambda scope: restore_scope(
+            manifest['scopes'][scope], scope_clients(scope, own_account), deadline, per_scope, dry_run
+        ),
+        scopes,
+        scope_workers
+    )
+    for scope, result, error in outcomes:
+        if error is None:
+            remaining = result.pop('remaining')
+            if not dry_run:
+                manifest['scopes'][scope] = remaining
+    if not dry_run:
+        save_manifest(manifest)
+    
+    return merge_results(outcomes, label='scope')
+
+
+def continue_restore(event: Dict[str, Any], context) -> bool:
+    """
+    Re-invoke this function to finish a restore still waiting on RDS
+
+    Returns:
+        True if a continuation was scheduled
+    """
+    attempt = event.get('restore_attempt', 1)
+    function_arn = getattr(context, 'invoked_function_arn', None)
+    if not function_arn or attempt >= MAX_RESUMES:
+        print("Restore cannot be continued, services stay in the restore manifest")
+        return False
+    
+    response = get_client('lambda').invoke(
+        FunctionName=function_arn,
+        InvocationType='Event',
+        Payload=json.dumps({**event, 'restore_attempt': attempt + 1})
+    )
+    print(f"Re-invoked optimizer to continue restore: {response['StatusCode']}")
+    return True
+
+
+def _finish_section(
+    work: SectionWork,
+    dry_run: bool,
+    scheduled: Optional[List[SectionWork]],
+    max_concurrency: int,
+    deadline: Deadline
+) -> Dict[str, Any]:
+    """
+    Act on a section's candidates, or hand them to the caller's scheduler
+
+    A dry run only reports what acting on every candidate would save.
+    When scheduled is given the work is appended to it, to be run with
+    the scope's other sections; otherwise it runs here on its own.
+    """
+    if dry_run:
+        work.processed.update(work.key(entry) for entry in work.candidates)
+        work.result.update(savings_summary(work.candidates))
+        close_phase(work.cursor, work.processed, [])
+    elif scheduled is not None:
+        scheduled.append(work)
+    else:
+        with metrics.span('stop_calls'):
+            run_scheduled([work], max_concurrency, deadline)
+    return work.result
+
+
+def stop_dev_ec2_instances(
+    dry_run: bool = False,
+    *,
+    max_concurrency: int = MAX_CONCURRENCY,
+    clients: Optional[Callable[[str], Any]] = None,
+    cursor: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    candidate_ids: Optional[List[str]] = None,
+    expected_versions: Optional[Dict[str, str]] = None,
+    aggressive: bool = False,
+    scheduled: Optional[List[SectionWork]] = None
+) -> Dict[str, Any]:
+    """
+    Stop EC2 instances tagged for auto-stop
+
+    When a cursor is given, discovery resumes from its pagination token,
+    skips instances already handled, and stops taking new work once the
+    deadline expires; leftovers are kept in the cursor for the next run.
+    candidate_ids, from the inventory index or a plan, limits discovery to
+    those instances instead of a full scan; with expected_versions, an
+    instance whose state version differs from the plan is left alone and
+    reported under 'changed', and planned instances discovery no longer
+    returns are reported under 'missing'.
+
+    Instances are stopped in chunks of EC2_STOP_BATCH_SIZE, run
+    concurrently and most savings first. A chunk rejected because of one
+    instance (stop protection, wrong state, an unknown ID) is bisected so
+    only that instance fails; other errors fail the whole chunk. Each split
+    is charged to the run's call budget, and a chunk the budget cannot
+    split is left pending. Instances are selected by the tag policy, whose
+    required tags become describe filters; aggressive also takes
+    environment instances with no AutoStop tag at all. See _finish_section
+    for scheduled.
+    """
+    print("Checking EC2 instances for cost optimization...")
+    ec2_client = (clients or regional_clients())('ec2')
+    region = ec2_client.meta.region_name
+    cursor = cursor if cursor is not None else {}
+    deadline = deadline or Deadline()
+    
+    # Let EC2 drop what the policy's required tags rule out; the rest is checked per instance
+    policy = selector('ec2', ENVIRONMENT, aggressive)
+    filters = [{'Name': 'instance-state-name', 'Values': ['running']}] + policy.server_filters()
+    
+    processed = set(cursor.get('processed', []))
+    pending = cursor.get('pending', [])
+    known = processed | {inst['id'] for inst in pending}
     
     instances_to_stop = []
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
+    changed = []
+    missing = []
+    if not cursor.get('discovered'):
+        discovered = iter_ec2_instances(ec2_client, filters, cursor, candidate_ids)
+        for instance in metrics.timed('discovery', discovered, count_as='resources_processed'):
+            if deadline.expired():
+                break
+            
             instance_id = instance['InstanceId']
+            if instance_id in known:
+                continue
             tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
             
-            # Safety check: never stop production instances
-            if tags.get('Environment', '').lower() == 'prod':
-                print(f"Skipping production instance: {instance_id}")
+            # Safety check: the policy never lets production or opted-out instances through
+            if not policy.matches(tags):
+                continue
+            
+            version = ec2_version(instance, tags)
+            if expected_versions is not None and expected_versions.get(instance_id) != version:
+                print(f"Skipping EC2 instance changed since plan: {instance_id}")
+                changed.append(instance_id)
                 continue
             
             instances_to_stop.append({
                 'id': instance_id,
                 'name': tags.get('Name', 'N/A'),
                 'environment': tags.get('Environment', 'N/A'),
-                'type': instance['InstanceType']
+                'type': instance['InstanceType'],
+                'version': version,
+                **resource_savings(price_index.ec2_hourly(region, instance['InstanceType']))
             })
+        else:
+            cursor['discovered'] = True
+            if expected_versions is not None:
+                missing = missing_resources(
+                    expected_versions,
+                    known | {inst['id'] for inst in instances_to_stop} | set(changed) | set(cursor.get('changed', []))
+                )
+        if expected_versions is not None:
+            # Discovery may span invocations; later ones still need to know what was changed
+            cursor.setdefault('changed', []).extend(changed)
     
     result = {
         'instances_found': len(instances_to_stop),
         'instances': instances_to_stop,
         'stopped': []
     }
+    if changed:
+        result['changed'] = changed
+    if missing:
+        print(f"Planned EC2 instances no longer found: {', '.join(missing)}")
+        result['missing'] = missing
     
-    if instances_to_stop and not dry_run:
-        instance_ids = [inst['id'] for inst in instances_to_stop]
-        try:
-            ec2_client.stop_instances(InstanceIds=instance_ids)
-            result['stopped'] = instance_ids
-            print(f"Stopped {len(instance_ids)} EC2 instances: {instance_ids}")
-        except Exception as e:
-            result['error'] = str(e)
-            print(f"Error stopping instances: {e}")
+    def stop_batch(batch: List[Dict[str, Any]]):
+        outcomes = run_batched(
+            lambda chunk: ec2_client.stop_instances(InstanceIds=[inst['id'] for inst in chunk]),
+            batch,
+            len(batch),
+            1,
+            should_split=is_instance_error,
+            on_split=lambda: work.budget.try_spend(2)
+        )
+        return [(instance, error) for instance, _, error in outcomes]
     
-    return result
+    work = SectionWork(
+        'ec2', result, cursor, processed, pending + instances_to_stop, stop_batch,
+        key=itemgetter('id'), label=itemgetter('id'),
+        on_success=lambda instance: result['stopped'].append(instance['id']),
+        batch_size=EC2_STOP_BATCH_SIZE
+    )
+    return _finish_section(work, dry_run, scheduled, max_concurrency, deadline)
 
 
-def stop_dev_rds_instances(dry_run: bool = False) -> Dict[str, Any]:
-    """Stop RDS instances tagged for auto-stop"""
+def stop_dev_rds_instances(
+    dry_run: bool = False,
+    *,
+    max_concurrency: int = MAX_CONCURRENCY,
+    clients: Optional[Callable[[str], Any]] = None,
+    cursor: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    candidate_ids: Optional[List[str]] = None,
+    expected_versions: Optional[Dict[str, str]] = None,
+    aggressive: bool = False,
+    scheduled: Optional[List[SectionWork]] = None
+) -> Dict[str, Any]:
+    """
+    Stop RDS instances tagged for auto-stop
+
+    candidate_ids, from the inventory index or a plan, limits discovery to
+    those DB instances instead of a full scan; with expected_versions, a DB
+    instance whose state version differs from the plan is left alone and
+    reported under 'changed', and planned DB instances discovery no longer
+    returns are reported under 'missing'.
+    DB instances are selected by the tag policy; aggressive also takes
+    environment DB instances with no AutoStop tag at all. See
+    _finish_section for scheduled.
+    """
     print("Checking RDS instances for cost optimization...")
+    rds_client = (clients or regional_clients())('rds')
+    region = rds_client.meta.region_name
+    cursor = cursor if cursor is not None else {}
+    deadline = deadline or Deadline()
+    policy = selector('rds', ENVIRONMENT, aggressive)
     
-    response = rds_client.describe_db_instances()
+    processed = set(cursor.get('processed', []))
+    pending = cursor.get('pending', [])
+    known = processed | {inst['id'] for inst in pending}
     
     instances_to_stop = []
-    for db_instance in response['DBInstances']:
-        db_id = db_instance['DBInstanceIdentifier']
-        status = db_instance['DBInstanceStatus']
-        
-        # Only consider available instances
-        if status != 'available':
-            continue
-        
-        # Get tags
-        arn = db_instance['DBInstanceArn']
-        tags_response = rds_client.list_tags_for_resource(ResourceName=arn)
-        tags = {tag['Key']: tag['Value'] for tag in tags_response['TagList']}
-        
-        # Check if instance should be stopped
-        auto_stop = tags.get('AutoStop', '').lower() == 'true'
-        environment = tags.get('Environment', '').lower()
-        
-        # Safety check: never stop production or multi-AZ instances
-        if environment == 'prod' or db_instance.get('MultiAZ', False):
-            print(f"Skipping RDS instance: {db_id} (prod or multi-AZ)")
-            continue
-        
-        if auto_stop and environment == ENVIRONMENT.lower():
+    changed = []
+    missing = []
+    if not cursor.get('discovered'):
+        discovered = iter_db_instances(rds_client, cursor, candidate_ids)
+        for db_instance in metrics.timed('discovery', discovered, count_as='resources_processed'):
+            if deadline.expired():
+                break
+            
+            db_id = db_instance['DBInstanceIdentifier']
+            status = db_instance['DBInstanceStatus']
+            
+            # Only consider available instances not handled by an earlier invocation
+            if status != 'available' or db_id in known:
+                continue
+            
+            # Tags come back with the describe page, no per-instance lookup
+            with metrics.span('tag_resolution'):
+                tags = db_instance_tags(rds_client, db_instance)
+            
+            # Safety check: the policy never lets production, multi-AZ or opted-out instances through
+            if not policy.matches(tags, {'multi_az': db_instance.get('MultiAZ', False)}):
+                continue
+            
+            version = rds_version(db_instance, tags)
+            if expected_versions is not None and expected_versions.get(db_id) != version:
+                print(f"Skipping RDS instance changed since plan: {db_id}")
+                changed.append(db_id)
+                continue
+            
             instances_to_stop.append({
                 'id': db_id,
                 'engine': db_instance['Engine'],
-                'environment': environment,
-                'class': db_instance['DBInstanceClass']
+                'environment': tags.get('Environment', '').lower(),
+                'class': db_instance['DBInstanceClass'],
+                'version': version,
+                **resource_savings(
+                    price_index.rds_hourly(region, db_instance['DBInstanceClass'], db_instance['Engine'])
+                )
             })
+        else:
+            cursor['discovered'] = True
+            if expected_versions is not None:
+                missing = missing_resources(
+                    expected_versions,
+                    known | {inst['id'] for inst in instances_to_stop} | set(changed) | set(cursor.get('changed', []))
+                )
+        if expected_versions is not None:
+            cursor.setdefault('changed', []).extend(changed)
     
     result = {
         'instances_found': len(instances_to_stop),
         'instances': instances_to_stop,
         'stopped': []
     }
+    if changed:
+        result['changed'] = changed
+    if missing:
+        print(f"Planned RDS instances no longer found: {', '.join(missing)}")
+        result['missing'] = missing
     
-    if instances_to_stop and not dry_run:
-        for instance in instances_to_stop:
-            try:
-                rds_client.stop_db_instance(DBInstanceIdentifier=instance['id'])
-                result['stopped'].append(instance['id'])
-                print(f"Stopped RDS instance: {instance['id']}")
-            except Exception as e:
-                print(f"Error stopping RDS instance {instance['id']}: {e}")
-                if 'error' not in result:
-                    result['error'] = []
-                result['error'].append(f"{instance['id']}: {str(e)}")
+    def stop_instance(batch: List[Dict[str, Any]]):
+        rds_client.stop_db_instance(DBInstanceIdentifier=batch[0]['id'])
+        print(f"Stopped RDS instance: {batch[0]['id']}")
+        return [(batch[0], None)]
     
-    return result
+    work = SectionWork(
+        'rds', result, cursor, processed, pending + instances_to_stop, stop_instance,
+        key=itemgetter('id'), label=itemgetter('id'),
+        on_success=lambda instance: result['stopped'].append(instance['id'])
+    )
+    return _finish_section(work, dry_run, scheduled, max_concurrency, deadline)
+
+
+def _scan_ecs_cluster(ecs_client, cluster_arn: str, known: set, deadline: Deadline,
+                      services: Optional[List[str]] = None, task_hourly: Optional[float] = None,
+                      aggressive: bool = False):
+    """
+    Collect scale-down candidates from one ECS cluster
+
+    services limits the scan to the named services of the cluster;
+    task_hourly prices each task the scale-down removes. Services are
+    selected by the tag policy. aggressive scales selected services down to
+    zero tasks instead of one and also selects environment services that
+    carry no AutoScale tag at all.
+
+    Returns:
+        (services_found, candidates, finished) where finished is False if the
+        deadline expired before the whole cluster was scanned
+    """
+    services_found = 0
+    candidates = []
+    policy = selector('ecs', ENVIRONMENT, aggressive)
+    
+    # Describe services page by page
+    discovered = iter_ecs_services(ecs_client, cluster_arn, services)
+    for service in metrics.timed('discovery', discovered, count_as='resources_processed'):
+        if deadline.expired():
+            return services_found, candidates, False
+        
+        service_name = service['serviceName']
+        current_count = service['desiredCount']
+        
+        # Get service tags
+        tags = {tag['key']: tag['value'] for tag in service.get('tags', [])}
+        
+        # Only scale services the policy selects
+        if not policy.matches(tags):
+            continue
+        
+        services_found += 1
+        
+        # Scale down to minimum (1 task, none when aggressive) if currently running more
+        new_count = 0 if aggressive else 1
+        if current_count > new_count and f"{cluster_arn}/{service_name}" not in known:
+            candidates.append({
+                'cluster': cluster_arn.split('/')[-1],
+                'cluster_arn': cluster_arn,
+                'service': service_name,
+                'previous_count': current_count,
+                'new_count': new_count,
+                'version': ecs_version(service, tags),
+                **resource_savings(None if task_hourly is None else (current_count - new_count) * task_hourly)
+            })
+    
+    return services_found, candidates, True
+
 
+def scale_down_ecs_tasks(
+    dry_run: bool = False,
+    *,
+    max_concurrency: int = MAX_CONCURRENCY,
+    clients: Optional[Callable[[str], Any]] = None,
+    cursor: Optional[Dict[str, Any]] = None,
+    deadline: Optional[Deadline] = None,
+    candidate_ids: Optional[List[str]] = None,
+    expected_versions: Optional[Dict[str, str]] = None,
+    aggressive: bool = False,
+    scheduled: Optional[List[SectionWork]] = None
+) -> Dict[str, Any]:
+    """
+    Scale down ECS services in non-production environments
 
-def scale_down_ecs_tasks(dry_run: bool = False) -> Dict[str, Any]:
-    """Scale down ECS services in non-production environments"""
+    Clusters are scanned concurrently, up to max_concurrency at a time.
+    Resumable discovery works at cluster granularity: a cluster interrupted
+    by the deadline is rescanned from the start on the next invocation.
+    candidate_ids, '<cluster ARN>/<service name>' keys from the inventory
+    index or a plan, limits discovery to those services instead of a full
+    scan; with expected_versions, a service whose state version differs
+    from the plan is left alone and reported under 'changed', and planned
+    services discovery no longer returns are reported under 'missing',
+    except in clusters that failed to scan. aggressive scales services to
+    zero, see _scan_ecs_cluster; see _finish_section for scheduled.
+    """
     print("Checking ECS services for cost optimization...")
+    ecs_client = (clients or regional_clients())('ecs')
+    task_hourly = price_index.ecs_task_hourly(ecs_client.meta.region_name)
+    cursor = cursor if cursor is not None else {}
+    deadline = deadline or Deadline()
     
     # Safety check: never scale production
     if ENVIRONMENT == 'prod':
+        cursor['complete'] = True
         return {
             'message': 'Skipping ECS scaling for production environment',
             'services_scaled': []
@@ -198,61 +856,133 @@ def scale_down_ecs_tasks(dry_run: bool = False) -> Dict[str, Any]:
         'services_scaled': []
     }
     
-    try:
-        # List all clusters
-        clusters_response = ecs_client.list_clusters()
+    processed = set(cursor.get('processed', []))
+    pending = cursor.get('pending', [])
+    known = processed | {f"{entry['cluster_arn']}/{entry['service']}" for entry in pending}
+    clusters_done = set(cursor.get('clusters_done', []))
+    
+    indexed_services = None
+    if candidate_ids is not None:
+        indexed_services = {}
+        for key in candidate_ids:
+            cluster_arn, service_name = key.rsplit('/', 1)
+            indexed_services.setdefault(cluster_arn, []).append(service_name)
+    
+    services_to_scale = []
+    failed_clusters = set(cursor.get('failed_clusters', []))
+    discovery_finished = False
+    if not cursor.get('discovered'):
+        try:
+            clusters = indexed_services if indexed_services is not None else iter_ecs_clusters(ecs_client)
+            outcomes = scan_ecs_clusters(
+                ecs_client,
+                lambda cluster_arn: _scan_ecs_cluster(
+                    ecs_client, cluster_arn, known, deadline,
+                    indexed_services[cluster_arn] if indexed_services is not None else None,
+                    task_hourly, aggressive
+                ),
+                [cluster_arn for cluster_arn in clusters if cluster_arn not in clusters_done],
+                max_concurrency,
+                stop_when=deadline.expired
+            )
+        except Exception as e:
+            outcomes = None
+            result['error'] = [str(e)]
+            print(f"Error in ECS scaling: {e}")
         
-        for cluster_arn in clusters_response['clusterArns']:
-            # List services in cluster
-            services_response = ecs_client.list_services(cluster=cluster_arn)
-            
-            if not services_response['serviceArns']:
+        # Without a cluster list nothing can be told missing
+        complete = outcomes is not None
+        for cluster_arn, scan, error in outcomes or []:
+            # Clusters not started or cut short by the deadline are rescanned on resume
+            if isinstance(error, Deferred) or (error is None and not scan[2]):
+                complete = False
                 continue
             
-            # Describe services
-            services_detail = ecs_client.describe_services(
-                cluster=cluster_arn,
-                services=services_response['serviceArns']
-            )
-            
-            for service in services_detail['services']:
-                service_name = service['serviceName']
-                current_count = service['desiredCount']
-                
-                # Get service tags
-                tags = {tag['key']: tag['value'] for tag in service.get('tags', [])}
-                environment = tags.get('Environment', '').lower()
-                auto_scale = tags.get('AutoScale', '').lower() == 'true'
-                
-                # Only scale services in current environment with AutoScale tag
-                if environment != ENVIRONMENT.lower() or not auto_scale:
-                    continue
-                
-                result['services_found'] += 1
-                
-                # Scale down to minimum (1 task) if currently running more
-                if current_count > 1 and not dry_run:
-                    try:
-                        ecs_client.update_service(
-                            cluster=cluster_arn,
-                            service=service_name,
-                            desiredCount=1
-                        )
-                        result['services_scaled'].append({
-                            'cluster': cluster_arn.split('/')[-1],
-                            'service': service_name,
-                            'previous_count': current_count,
-                            'new_count': 1
-                        })
-                        print(f"Scaled down {service_name} from {current_count} to 1 task")
-                    except Exception as e:
-                        print(f"Error scaling service {service_name}: {e}")
+            if error is None:
+                found, candidates, _ = scan
+                result['services_found'] += found
+                services_to_scale.extend(candidates)
+            else:
+                print(f"Error scanning ECS cluster {cluster_arn}: {error}")
+                if 'error' not in result:
+                    result['error'] = []
+                result['error'].append(f"{cluster_arn.split('/')[-1]}: {str(error)}")
+                failed_clusters.add(cluster_arn)
+            # Do not retry a failed discovery on resume
+            clusters_done.add(cluster_arn)
+        
+        if complete or outcomes is None:
+            cursor['discovered'] = True
+        discovery_finished = complete
     
-    except Exception as e:
-        result['error'] = str(e)
-        print(f"Error in ECS scaling: {e}")
+    cursor['clusters_done'] = sorted(clusters_done)
+    cursor['failed_clusters'] = sorted(failed_clusters)
     
-    return result
+    if expected_versions is not None:
+        changed = [
+            entry for entry in services_to_scale
+            if expected_versions.get(f"{entry['cluster_arn']}/{entry['service']}") != entry['version']
+        ]
+        for entry in changed:
+            print(f"Skipping ECS service changed since plan: {entry['service']}")
+            services_to_scale.remove(entry)
+        if changed:
+            result['changed'] = [f"{entry['cluster']}/{entry['service']}" for entry in changed]
+        
+        cursor.setdefault('changed', []).extend(f"{entry['cluster_arn']}/{entry['service']}" for entry in changed)
+        if discovery_finished:
+            seen = known | set(cursor['changed']) | {
+                f"{entry['cluster_arn']}/{entry['service']}" for entry in services_to_scale
+            }
+            missing = [
+                key.rsplit('/', 1) for key in missing_resources(expected_versions, seen)
+                if key.rsplit('/', 1)[0] not in failed_clusters
+            ]
+            if missing:
+                result['missing'] = [f"{cluster_arn.split('/')[-1]}/{service}" for cluster_arn, service in missing]
+                print(f"Planned ECS services no longer found: {', '.join(result['missing'])}")
+    result['services'] = services_to_scale
+    
+    def scale_service(batch: List[Dict[str, Any]]):
+        entry = batch[0]
+        ecs_client.update_service(
+            cluster=entry['cluster_arn'],
+            service=entry['service'],
+            desiredCount=entry['new_count']
+        )
+        return [(entry, None)]
+    
+    def record_scaled(entry: Dict[str, Any]):
+        result['services_scaled'].append({
+            'cluster': entry['cluster'],
+            'service': entry['service'],
+            'previous_count': entry['previous_count'],
+            'new_count': entry['new_count'],
+            'hourly_savings': entry.get('hourly_savings'),
+            'monthly_savings': entry.get('monthly_savings')
+        })
+        print(f"Scaled down {entry['service']} from {entry['previous_count']} to {entry['new_count']} tasks")
+    
+    work = SectionWork(
+        'ecs', result, cursor, processed, pending + services_to_scale, scale_service,
+        key=lambda entry: f"{entry['cluster_arn']}/{entry['service']}", label=itemgetter('service'),
+        on_success=record_scaled
+    )
+    return _finish_section(work, dry_run, scheduled, max_concurrency, deadline)
+
+
+def format_savings(section: Dict[str, Any]) -> str:
+    """Render a section's estimated savings for the report"""
+    if 'hourly_savings' not in section:
+        return ""
+    return f"- Savings: ${section['hourly_savings']:.2f}/hour, ${section['monthly_savings']:.2f}/month\n"
+
+
+def format_ids(section: Dict[str, Any], field: str) -> str:
+    """List a section's IDs, noting how many a digest left out"""
+    ids = ', '.join(section[field])
+    omitted = section.get(f"{field}_omitted")
+    return f"{ids} and {omitted} more" if omitted else ids
 
 
 def send_notification(results: Dict[str, Any], is_error: bool = False):
@@ -273,43 +1003,111 @@ Dry Run: {results.get('dry_run')}
 
 """
     
+    if results.get('aggressive'):
+        message += "Mode: Aggressive (untagged resources included, ECS scaled to zero)\n"
+    
+    if results.get('plan_id'):
+        message += f"Plan ID: {results['plan_id']}\n"
+        if 'planned_resources' in results:
+            message += f"Planned Resources: {results['planned_resources']} (apply with action 'apply')\n"
+    
     if 'ec2' in results:
         ec2 = results['ec2']
         message += f"""
 EC2 Instances:
 - Found: {ec2.get('instances_found', 0)}
-- Stopped: {len(ec2.get('stopped', []))}
+- Stopped: {item_count(ec2, 'stopped')}
 """
         if ec2.get('stopped'):
-            message += f"- Instance IDs: {', '.join(ec2['stopped'])}\n"
+            message += f"- Instance IDs: {format_ids(ec2, 'stopped')}\n"
+        message += format_savings(ec2)
     
     if 'rds' in results:
         rds = results['rds']
         message += f"""
 RDS Instances:
 - Found: {rds.get('instances_found', 0)}
-- Stopped: {len(rds.get('stopped', []))}
+- Stopped: {item_count(rds, 'stopped')}
 """
         if rds.get('stopped'):
-            message += f"- Instance IDs: {', '.join(rds['stopped'])}\n"
+            message += f"- Instance IDs: {format_ids(rds, 'stopped')}\n"
+        message += format_savings(rds)
     
     if 'ecs' in results:
         ecs = results['ecs']
         message += f"""
 ECS Services:
 - Found: {ecs.get('services_found', 0)}
-- Scaled: {len(ecs.get('services_scaled', []))}
+- Scaled: {item_count(ecs, 'services_scaled')}
 """
+        message += format_savings(ecs)
+    
+    if 'savings' in results:
+        savings = results['savings']
+        label = "Estimated Savings If Applied" if results.get('dry_run') else "Estimated Savings"
+        message += f"""
+{label}:
+- Hourly: ${savings['hourly_savings']:.2f}
+- Monthly: ${savings['monthly_savings']:.2f} (stopped {savings['stopped_hours_per_month']} hours a month)
+"""
+        if savings.get('unpriced'):
+            message += f"- Resources Without a Price: {savings['unpriced']}\n"
+    
+    if 'restore' in results:
+        restore = results['restore']
+        message += f"""
+Restore:
+- RDS Started: {item_count(restore.get('rds', {}), 'started')}
+- EC2 Started: {item_count(restore.get('ec2', {}), 'started')}
+- ECS Restored: {item_count(restore.get('ecs', {}), 'services_restored')}
+"""
+        if restore.get('ecs', {}).get('deferred'):
+            message += f"- ECS Waiting on RDS: {restore['ecs']['deferred']}\n"
+        for section in SECTIONS:
+            for error in restore.get(section, {}).get('error', []):
+                message += f"- Error ({section}): {error}\n"
+        for error in restore.get('error', []):
+            message += f"- Error: {error}\n"
+    
+    if results.get('accounts'):
+        message += "\nAccounts:\n"
+        for account_id, account in results['accounts'].items():
+            if account.get('error') and len(account) == 1:
+                message += f"- {account_id}: failed\n"
+                continue
+            message += (
+                f"- {account_id}: "
+                f"EC2 stopped {item_count(account.get('ec2', {}), 'stopped')}, "
+                f"RDS stopped {item_count(account.get('rds', {}), 'stopped')}, "
+                f"ECS scaled {item_count(account.get('ecs', {}), 'services_scaled')}\n"
+            )
+        if results.get('accounts_omitted'):
+            message += f"- ... and {results['accounts_omitted']} more accounts\n"
+    
+    if results.get('rate_limits'):
+        limits = results['rate_limits']
+        message += (
+            f"\nAWS API calls: {limits['calls']} "
+            f"({limits['throttles']} throttled, {limits['retries']} retried, "
+            f"{limits['wait_seconds']}s rate-limited)\n"
+        )
     
     if results.get('error'):
         message += f"\nERROR: {results['error']}\n"
     
+    if results.get('report'):
+        report = results['report']
+        message += f"\nFull Report: {report['location']} ({report['records']} records, gzip JSON Lines)\n"
+    elif results.get('report_error'):
+        message += f"\nFull report could not be written: {results['report_error']}\n"
+    
     try:
-        sns_client.publish(
-            TopicArn=SNS_TOPIC_ARN,
-            Subject=subject,
-            Message=message
-        )
+        with metrics.span('notification'):
+            get_client('sns').publish(
+                TopicArn=SNS_TOPIC_ARN,
+                Subject=subject,
+                Message=message
+            )
         print("Notification sent successfully")
     except Exception as e:
         print(f"Error sending notification: {e}")
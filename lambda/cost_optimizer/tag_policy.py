@@ -0,0 +1,203 @@
+"""
+Tag Policy Module
+Compiles the declarative tag policy deciding which resources may be stopped or scaled down
+
+A policy is a list of rules. Each rule names a tag (or a resource
+attribute such as 'multi_az'), the values it matches, the kinds it
+applies to (ec2, rds, ecs; all by default) and an effect:
+
+- require: the tag must be present with one of the values. With
+  "aggressive": "allow_missing", aggressive runs also accept resources
+  that lack the tag entirely; an explicit other value still fails.
+- exclude: a resource whose tag has one of the values never matches.
+
+Tag values match case-insensitively unless the rule sets
+"case_sensitive": true, and "${environment}" stands for the
+optimizer's ENVIRONMENT. The policy comes from TAG_POLICY (inline JSON)
+or TAG_POLICY_PATH, defaulting to the bundled tag_policy.json.
+"""
+import json
+import os
+from functools import lru_cache
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+TAG_POLICY = os.environ.get('TAG_POLICY', '')
+TAG_POLICY_PATH = os.environ.get(
+    'TAG_POLICY_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_policy.json')
+)
+
+KINDS = ('ec2', 'rds', 'ecs')
+EFFECTS = ('require', 'exclude')
+# Describe operations whose Filters can match tags server-side
+SERVER_FILTER_KINDS = ('ec2',)
+# Most values a case-insensitive rule sends to a server-side filter; EC2 filters
+# match exactly, so every casing is listed and longer values are left to matches()
+MAX_FILTER_SPELLINGS = 64
+
+
+def _normalize(value: Any, case_sensitive: bool) -> Any:
+    return value.lower() if isinstance(value, str) and not case_sensitive else value
+
+
+def _spellings(values: List[Any], case_sensitive: bool) -> List[str]:
+    """
+    Every spelling a server-side filter needs to match what matches() accepts
+
+    Empty when a value is not a string or a case-insensitive rule would
+    need more than MAX_FILTER_SPELLINGS casings.
+    """
+    if not all(isinstance(value, str) for value in values):
+        return []
+    if case_sensitive:
+        return sorted(set(values))
+    count = sum(2 ** sum(char.lower() != char.upper() for char in value) for value in values)
+    if count > MAX_FILTER_SPELLINGS:
+        return []
+    return sorted({
+        ''.join(chars)
+        for value in values
+        for chars in product(*({char.lower(), char.upper()} for char in value))
+    })
+
+
+class CompiledRule:
+    """One rule bound to an environment, with its values pre-normalized into a set"""
+
+    __slots__ = ('name', 'effect', 'key', 'values', 'spellings', 'case_sensitive', 'allow_missing')
+
+    def __init__(self, rule: Dict[str, Any], environment: str, aggressive: bool):
+        self.name = rule.get('name', rule.get('tag') or rule.get('attribute'))
+        self.effect = rule['effect']
+        self.key = rule.get('tag') or rule['attribute']
+        self.case_sensitive = rule.get('case_sensitive', False)
+        raw = [environment if value == '${environment}' else value for value in rule['values']]
+        self.values = frozenset(_normalize(value, self.case_sensitive) for value in raw)
+        self.spellings = _spellings(raw, self.case_sensitive)
+        self.allow_missing = aggressive and rule.get('aggressive') == 'allow_missing'
+
+    def matches(self, value: Any) -> bool:
+        return _normalize(value, self.case_sensitive) in self.values
+
+
+class Selector:
+    """
+    A policy compiled for one kind, environment and mode
+
+    Tag rules are indexed by tag key, so checking a resource costs one
+    dict lookup per tag it carries, however many rules the policy has.
+    A resource matches when no exclude rule hits and every require rule
+    is met; require rules that allow a missing tag only fail on a
+    present tag with another value.
+    """
+
+    def __init__(self, rules: List[CompiledRule], attribute_rules: List[CompiledRule], kind: str):
+        self.kind = kind
+        self.by_tag: Dict[str, Tuple[CompiledRule, ...]] = {}
+        for rule in rules:
+            self.by_tag[rule.key] = self.by_tag.get(rule.key, ()) + (rule,)
+        self.attribute_rules = attribute_rules
+        self.strict_required = sum(1 for rule in rules if rule.effect == 'require' and not rule.allow_missing)
+        self.tag_keys = tuple(self.by_tag)
+
+    def matches(self, tags: Dict[str, str], attributes: Optional[Dict[str, Any]] = None) -> bool:
+        """True when a resource with these tags and attributes may be acted on"""
+        for rule in self.attribute_rules:
+            hit = rule.matches((attributes or {}).get(rule.key))
+            if hit == (rule.effect == 'exclude'):
+                return False
+
+        satisfied = 0
+        by_tag = self.by_tag
+        for key, value in tags.items():
+            for rule in by_tag.get(key, ()):
+                hit = rule.matches(value)
+                if rule.effect == 'exclude':
+                    if hit:
+                        return False
+                elif not hit:
+                    return False
+                elif not rule.allow_missing:
+                    satisfied += 1
+        return satisfied == self.strict_required
+
+    def server_filters(self) -> List[Dict[str, Any]]:
+        """
+        Describe Filters that pre-select what matches() would accept
+
+        Only require rules that demand the tag can be expressed, each as a
+        tag filter over every casing of its values, so the filters never drop
+        a resource matches() would take; everything else, including values
+        with too many casings, is left to matches(), which callers still
+        apply to what the filters return.
+        """
+        if self.kind not in SERVER_FILTER_KINDS:
+            return []
+        return [
+            {'Name': f"tag:{rule.key}", 'Values': rule.spellings}
+            for rules in self.by_tag.values()
+            for rule in rules
+            if rule.effect == 'require' and not rule.allow_missing and rule.spellings
+        ]
+
+
+class TagPolicy:
+    """
+    Validated policy rules, compiled into a Selector per kind on first use
+
+    Args:
+        document: {'rules': [...]} as described in the module docstring
+        environment: Value substituted for "${environment}"
+
+    Raises:
+        ValueError: when a rule is malformed, so a broken policy fails the
+            invocation instead of selecting the wrong resources
+    """
+
+    def __init__(self, document: Dict[str, Any], environment: str):
+        self.environment = environment
+        self.rules = document.get('rules', [])
+        for rule in self.rules:
+            if rule.get('effect') not in EFFECTS:
+                raise ValueError(f"Tag policy rule {rule.get('name')}: effect must be one of {EFFECTS}")
+            if not (rule.get('tag') or rule.get('attribute')) or not isinstance(rule.get('values'), list):
+                raise ValueError(f"Tag policy rule {rule.get('name')}: needs a tag or attribute and a values list")
+            unknown = set(rule.get('kinds', KINDS)) - set(KINDS)
+            if unknown:
+                raise ValueError(f"Tag policy rule {rule.get('name')}: unknown kinds {sorted(unknown)}")
+        self._selectors: Dict[Tuple[str, bool], Selector] = {}
+
+    def selector(self, kind: str, aggressive: bool = False) -> Selector:
+        key = (kind, aggressive)
+        if key not in self._selectors:
+            rules = [rule for rule in self.rules if kind in rule.get('kinds', KINDS)]
+            self._selectors[key] = Selector(
+                [CompiledRule(rule, self.environment, aggressive) for rule in rules if 'tag' in rule],
+                [CompiledRule(rule, self.environment, aggressive) for rule in rules if 'tag' not in rule],
+                kind
+            )
+        return self._selectors[key]
+
+
+@lru_cache(maxsize=None)
+def load_policy_document() -> Dict[str, Any]:
+    if TAG_POLICY:
+        return json.loads(TAG_POLICY)
+    with open(TAG_POLICY_PATH) as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def tag_policy(environment: str) -> TagPolicy:
+    """The configured policy for an environment, loaded and validated once per container"""
+    return TagPolicy(load_policy_document(), environment)
+
+
+def selector(kind: str, environment: str, aggressive: bool = False) -> Selector:
+    """Compiled selector for a resource kind"""
+    return tag_policy(environment).selector(kind, aggressive)
+
+
+def policy_tag_keys() -> Tuple[str, ...]:
+    """Every tag key the configured policy looks at, in rule order"""
+    return tuple(dict.fromkeys(rule['tag'] for rule in load_policy_document().get('rules', []) if 'tag' in rule))
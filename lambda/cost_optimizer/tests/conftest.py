@@ -0,0 +1,46 @@
+"""
+Shared fixtures for the cost optimizer tests
+
+Modules are imported the way the Lambda runtime sees them: the function
+package and the shared layer on sys.path. AWS is fake_aws, the
+in-process fake the fleet benchmark also drives, backed by a small
+synthetic fleet, and state lives in a temporary directory.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.pop('STATE_BUCKET', None)
+os.environ['ENVIRONMENT'] = 'dev'
+sys.path.insert(0, os.path.join(ROOT, 'lambda', 'shared', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'lambda', 'cost_optimizer'))
+
+import aws_clients  # noqa: E402
+import sessions  # noqa: E402
+import state_store  # noqa: E402
+from fake_aws import FakeAWS, build_fleet  # noqa: E402
+from rate_limiter import rate_limiters  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Keep every state store document under the test's temporary directory"""
+    monkeypatch.setattr(state_store, 'STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(state_store, '_stores', {})
+    return tmp_path
+
+
+@pytest.fixture
+def fake_aws(monkeypatch):
+    """A fake AWS with a 600-resource fleet (three ECS clusters), installed below the client registries"""
+    fake = FakeAWS(build_fleet(600))
+    monkeypatch.setattr(aws_clients, 'default_registry', aws_clients.default_registry)
+    monkeypatch.setattr(sessions, 'new_session', sessions.new_session)
+    fake.install()
+    yield fake
+    sessions.session_pool.clear()
+    rate_limiters.clear()
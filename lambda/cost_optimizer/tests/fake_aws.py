@@ -0,0 +1,625 @@
+"""
+Fake AWS
+In-process stand-in for the EC2, RDS, ECS, DynamoDB, Cost Explorer, SNS, Lambda and STS
+operations the Lambda packages call, backed by a synthetic fleet
+
+Pagination follows each API's page limits and understands the starting
+tokens discovery resumes from. Every attempt can be delayed by a fixed
+latency and throttled at random; throttled attempts are retried with
+jittered exponential backoff as botocore's standard retry mode would,
+and raise ThrottlingException once AWS_MAX_ATTEMPTS is used up.
+
+Fake clients stand in for botocore clients below the client registry:
+each carries the real service model and an event emitter, and every
+attempt emits before-send, needs-retry and after-call the way botocore
+does, so the rate limiter the registry attaches paces them.
+
+Usage:
+    fake = FakeAWS(build_fleet(10000), latency_ms=5, throttle_rate=0.01)
+    fake.install()  # build every registry and session pool client as a fake
+"""
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import botocore.session
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter
+from botocore.paginate import TokenDecoder
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+
+# Largest page each paginated operation returns
+PAGE_LIMITS = {
+    'describe_instances': 1000,
+    'describe_db_instances': 100,
+    'list_clusters': 100,
+    'list_services': 100,
+    # DynamoDB pages by size (1 MB); inventory items are around 1 KB
+    'query': 1000
+}
+TOKEN_KEYS = {
+    'describe_instances': 'NextToken',
+    'describe_db_instances': 'Marker',
+    'list_clusters': 'nextToken',
+    'list_services': 'nextToken',
+    'query': 'LastEvaluatedKey'
+}
+REQUEST_PAGE_SIZE_KEYS = ('MaxResults', 'MaxRecords', 'maxResults')
+CE_PAGE_SIZE = 500
+
+INSTANCE_TYPES = ('t3.micro', 't3.small', 't3.medium', 'm5.large', 'm5.xlarge', 'c5.large')
+DB_CLASSES = ('db.t3.micro', 'db.t3.small', 'db.t3.medium', 'db.m5.large')
+ENGINES = ('postgres', 'mysql')
+SERVICES_PER_CLUSTER = 100
+
+# Key attributes of the fake DynamoDB tables and their indexes
+TABLE_KEYS = {'inventory': ('region', 'resource')}
+INDEX_KEYS = {'candidates': ('candidate_region', 'resource')}
+
+
+def build_fleet(size: int, candidate_ratio: float = 0.25, environment: str = 'dev',
+                seed: int = 0) -> Dict[str, Any]:
+    """
+    Build a synthetic fleet of size resources
+
+    Half are EC2 instances, a tenth RDS DB instances and the rest ECS
+    services spread over clusters of SERVICES_PER_CLUSTER. About
+    candidate_ratio of each kind carries the AutoStop/AutoScale tag set to
+    true and a fifth carries none at all, for aggressive runs to widen to;
+    a few resources are tagged prod so the safety checks have something
+    to skip.
+    """
+    rng = random.Random(seed)
+    ec2_count = size // 2
+    rds_count = size // 10
+    ecs_count = size - ec2_count - rds_count
+
+    def environment_tag(i: int) -> str:
+        return 'prod' if i % 50 == 49 else environment
+
+    def opt_in_tag(key: str, draw: float, fields=('Key', 'Value')) -> List[Dict[str, str]]:
+        if draw >= 0.8:
+            return []
+        return [{fields[0]: key, fields[1]: 'true' if draw < candidate_ratio else 'false'}]
+
+    instances = {}
+    for i in range(ec2_count):
+        instance_id = f"i-{i:017x}"
+        instances[instance_id] = {
+            'InstanceId': instance_id,
+            'InstanceType': rng.choice(INSTANCE_TYPES),
+            'State': {'Name': 'running'},
+            'Tags': [
+                {'Key': 'Name', 'Value': f"app-{i}"},
+                {'Key': 'Environment', 'Value': environment_tag(i)},
+                *opt_in_tag('AutoStop', rng.random()),
+                {'Key': 'Owner', 'Value': f"team-{i % 17}"}
+            ]
+        }
+
+    db_instances = {}
+    for i in range(rds_count):
+        db_id = f"db-{i}"
+        db_instances[db_id] = {
+            'DBInstanceIdentifier': db_id,
+            'DBInstanceArn': f"arn:aws:rds:{REGION}:{ACCOUNT_ID}:db:{db_id}",
+            'DBInstanceClass': rng.choice(DB_CLASSES),
+            'Engine': rng.choice(ENGINES),
+            'DBInstanceStatus': 'available',
+            'MultiAZ': i % 10 == 9,
+            'TagList': [
+                {'Key': 'Environment', 'Value': environment_tag(i)},
+                *opt_in_tag('AutoStop', rng.random())
+            ]
+        }
+
+    clusters: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for i in range(ecs_count):
+        cluster_name = f"cluster-{i // SERVICES_PER_CLUSTER}"
+        cluster_arn = f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:cluster/{cluster_name}"
+        service_name = f"svc-{i}"
+        clusters.setdefault(cluster_name, {})[service_name] = {
+            'serviceName': service_name,
+            'serviceArn': f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:service/{cluster_name}/{service_name}",
+            'clusterArn': cluster_arn,
+            'status': 'ACTIVE',
+            'desiredCount': rng.randint(1, 6),
+            'taskDefinition': f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:task-definition/{service_name}:1",
+            'tags': [
+                {'key': 'Environment', 'value': environment_tag(i)},
+                *opt_in_tag('AutoScale', rng.random(), ('key', 'value'))
+            ]
+        }
+
+    return {'instances': instances, 'db_instances': db_instances, 'clusters': clusters}
+
+
+def daily_cost_group(group: Dict[str, Any], ordinal: int) -> Dict[str, Any]:
+    """One day's share of a monthly cost group, with a weekly cycle"""
+    amount = float(group['Metrics']['UnblendedCost']['Amount']) / 30 * (0.8 + (ordinal % 7) * 0.05)
+    return {'Keys': group['Keys'], 'Metrics': {'UnblendedCost': {'Amount': f"{amount:.4f}"}}}
+
+
+def _name(name_or_arn: str) -> str:
+    return name_or_arn.split('/')[-1]
+
+
+class FakePaginator:
+    """Pages a fake operation, honouring page size limits and StartingToken"""
+
+    def __init__(self, client: 'FakeClient', operation_name: str):
+        self.client = client
+        self.operation_name = operation_name
+
+    def paginate(self, PaginationConfig: Optional[Dict[str, Any]] = None, **kwargs):
+        token_key = TOKEN_KEYS[self.operation_name]
+        offset = 0
+        starting_token = (PaginationConfig or {}).get('StartingToken')
+        if starting_token:
+            offset = int(TokenDecoder().decode(starting_token)[token_key])
+
+        limit = PAGE_LIMITS[self.operation_name]
+        for key in REQUEST_PAGE_SIZE_KEYS:
+            if key in kwargs:
+                limit = min(limit, kwargs.pop(key))
+
+        items = None
+        while True:
+            self.client._call(self.operation_name)
+            if items is None:
+                items = self.client.list_items(self.operation_name, **kwargs)
+            page = self.client.page(self.operation_name, items[offset:offset + limit])
+            offset += limit
+            if offset < len(items):
+                page[token_key] = str(offset)
+            yield page
+            if offset >= len(items):
+                return
+
+
+class FakeClient:
+    """One service's operations against the shared fleet"""
+
+    def __init__(self, fake: 'FakeAWS', service_name: str, region: Optional[str]):
+        self.fake = fake
+        self.service_name = service_name
+        self.meta = SimpleNamespace(
+            region_name=region or REGION,
+            service_model=fake.service_model(service_name),
+            events=HierarchicalEmitter()
+        )
+        self.fleet = fake.fleet
+        self._event_suffix = self.meta.service_model.service_id.hyphenize()
+
+    def _call(self, operation_name: str):
+        """
+        Make one call's attempts, emitting botocore's request lifecycle events
+
+        Throttled attempts are retried with full jitter over an exponential
+        base, capped at 20s, as botocore's standard mode does; the last one
+        raises ThrottlingException.
+        """
+        events = self.meta.events
+        for attempt in range(1, self.fake.max_attempts + 1):
+            request = SimpleNamespace(context={'retries': {'attempt': attempt}})
+            events.emit(f"before-send.{self._event_suffix}.{operation_name}", request=request)
+            throttled, jitter = self.fake.attempt(self.service_name, operation_name)
+            if not throttled:
+                events.emit(f"after-call.{self._event_suffix}.{operation_name}",
+                            http_response=SimpleNamespace(status_code=200), parsed={})
+                return
+            parsed = {'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}
+            http_response = SimpleNamespace(status_code=400)
+            events.emit(f"needs-retry.{self._event_suffix}.{operation_name}",
+                        response=(http_response, parsed), attempts=attempt)
+            if attempt == self.fake.max_attempts:
+                events.emit(f"after-call.{self._event_suffix}.{operation_name}",
+                            http_response=http_response, parsed=parsed)
+                raise ClientError(parsed, operation_name)
+            time.sleep(min(20.0, jitter * 2 ** attempt * max(self.fake.latency, 0.001)))
+
+    def get_paginator(self, operation_name: str) -> FakePaginator:
+        return FakePaginator(self, operation_name)
+
+    def list_items(self, operation_name: str, **kwargs) -> List[Any]:
+        if operation_name == 'describe_instances':
+            return self._filter_instances(kwargs.get('Filters', []))
+        if operation_name == 'describe_db_instances':
+            ids = next((f['Values'] for f in kwargs.get('Filters', []) if f['Name'] == 'db-instance-id'), None)
+            if ids is not None:
+                return [self.fleet['db_instances'][i] for i in ids if i in self.fleet['db_instances']]
+            return list(self.fleet['db_instances'].values())
+        if operation_name == 'list_clusters':
+            return [f"arn:aws:ecs:{REGION}:{ACCOUNT_ID}:cluster/{name}" for name in self.fleet['clusters']]
+        if operation_name == 'list_services':
+            services = self.fleet['clusters'].get(_name(kwargs['cluster']), {})
+            return [service['serviceArn'] for service in services.values()]
+        if operation_name == 'query':
+            return self._query(**kwargs)
+        raise ClientError(
+            {'Error': {'Code': 'InvalidAction', 'Message': f"The fake does not paginate {operation_name}"}},
+            operation_name
+        )
+
+    @staticmethod
+    def page(operation_name: str, items: List[Any]) -> Dict[str, Any]:
+        if operation_name == 'describe_instances':
+            return {'Reservations': [{'Instances': items}] if items else []}
+        if operation_name == 'describe_db_instances':
+            return {'DBInstances': items}
+        if operation_name == 'list_clusters':
+            return {'clusterArns': items}
+        if operation_name == 'query':
+            return {'Items': items, 'Count': len(items)}
+        return {'serviceArns': items}
+
+    def _filter_instances(self, filters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        instances = self.fleet['instances']
+        ids = next((f['Values'] for f in filters if f['Name'] == 'instance-id'), None)
+        candidates = [instances[i] for i in ids if i in instances] if ids is not None else instances.values()
+
+        matched = []
+        for instance in candidates:
+            tags = None
+            for f in filters:
+                name = f['Name']
+                if name == 'instance-state-name':
+                    if instance['State']['Name'] not in f['Values']:
+                        break
+                elif name.startswith('tag:'):
+                    if tags is None:
+                        tags = {tag['Key']: tag['Value'] for tag in instance['Tags']}
+                    if tags.get(name[4:]) not in f['Values']:
+                        break
+            else:
+                matched.append(instance)
+        return matched
+
+    # EC2
+
+    def _set_instance_state(self, instance_ids: List[str], state: str):
+        for instance_id in instance_ids:
+            if instance_id not in self.fleet['instances']:
+                raise ClientError(
+                    {'Error': {'Code': 'InvalidInstanceID.NotFound', 'Message': instance_id}}, 'StopInstances'
+                )
+            if self.fleet['instances'][instance_id]['State']['Name'] in ('shutting-down', 'terminated'):
+                raise ClientError(
+                    {'Error': {'Code': 'IncorrectInstanceState', 'Message': instance_id}}, 'StopInstances'
+                )
+        for instance_id in instance_ids:
+            self.fleet['instances'][instance_id]['State']['Name'] = state
+
+    def stop_instances(self, InstanceIds: List[str]):
+        self._call('stop_instances')
+        self._set_instance_state(InstanceIds, 'stopped')
+        return {'StoppingInstances': [{'InstanceId': i} for i in InstanceIds]}
+
+    def start_instances(self, InstanceIds: List[str]):
+        self._call('start_instances')
+        self._set_instance_state(InstanceIds, 'running')
+        return {'StartingInstances': [{'InstanceId': i} for i in InstanceIds]}
+
+    def describe_regions(self, **kwargs):
+        self._call('describe_regions')
+        return {'Regions': [{'RegionName': REGION}]}
+
+    # RDS
+
+    def _db_instance(self, db_id: str, operation_name: str) -> Dict[str, Any]:
+        if db_id not in self.fleet['db_instances']:
+            raise ClientError({'Error': {'Code': 'DBInstanceNotFound', 'Message': db_id}}, operation_name)
+        return self.fleet['db_instances'][db_id]
+
+    def stop_db_instance(self, DBInstanceIdentifier: str):
+        self._call('stop_db_instance')
+        db_instance = self._db_instance(DBInstanceIdentifier, 'StopDBInstance')
+        db_instance['DBInstanceStatus'] = 'stopped'
+        return {'DBInstance': db_instance}
+
+    def start_db_instance(self, DBInstanceIdentifier: str):
+        self._call('start_db_instance')
+        db_instance = self._db_instance(DBInstanceIdentifier, 'StartDBInstance')
+        if db_instance['DBInstanceStatus'] != 'stopped':
+            raise ClientError(
+                {'Error': {'Code': 'InvalidDBInstanceState', 'Message': DBInstanceIdentifier}}, 'StartDBInstance'
+            )
+        # Started instances come up immediately; restore's availability poll sees them at once
+        db_instance['DBInstanceStatus'] = 'available'
+        return {'DBInstance': db_instance}
+
+    def list_tags_for_resource(self, ResourceName: str):
+        self._call('list_tags_for_resource')
+        return {'TagList': self._db_instance(ResourceName.split(':')[-1], 'ListTagsForResource')['TagList']}
+
+    # ECS
+
+    def describe_services(self, cluster: str, services: List[str], include: Optional[List[str]] = None):
+        self._call('describe_services')
+        if len(services) > 10:
+            raise ClientError(
+                {'Error': {'Code': 'InvalidParameterException', 'Message': 'At most 10 services'}},
+                'DescribeServices'
+            )
+        cluster_services = self.fleet['clusters'].get(_name(cluster), {})
+        found, failures = [], []
+        for service in services:
+            described = cluster_services.get(_name(service))
+            if described is None:
+                failures.append({'arn': service, 'reason': 'MISSING'})
+            elif include and 'TAGS' in include:
+                found.append(dict(described))
+            else:
+                found.append({k: v for k, v in described.items() if k != 'tags'})
+        return {'services': found, 'failures': failures}
+
+    def update_service(self, cluster: str, service: str, desiredCount: int):
+        self._call('update_service')
+        described = self.fleet['clusters'].get(_name(cluster), {}).get(_name(service))
+        if described is None:
+            raise ClientError({'Error': {'Code': 'ServiceNotFoundException', 'Message': service}}, 'UpdateService')
+        described['desiredCount'] = desiredCount
+        return {'service': described}
+
+    # DynamoDB
+
+    def _table(self, table_name: str) -> Dict[Any, Dict[str, Any]]:
+        return self.fake.tables.setdefault(table_name, {})
+
+    @staticmethod
+    def _item_key(table_name: str, key: Dict[str, Any]) -> tuple:
+        return tuple(key[name]['S'] for name in TABLE_KEYS[table_name])
+
+    def get_item(self, TableName: str, Key: Dict[str, Any], ConsistentRead: bool = False):
+        self._call('get_item')
+        item = self._table(TableName).get(self._item_key(TableName, Key))
+        return {'Item': dict(item)} if item is not None else {}
+
+    def put_item(self, TableName: str, Item: Dict[str, Any]):
+        self._call('put_item')
+        self._table(TableName)[self._item_key(TableName, Item)] = dict(Item)
+        return {}
+
+    def update_item(self, TableName: str, Key: Dict[str, Any], UpdateExpression: str,
+                    ConditionExpression: Optional[str] = None,
+                    ExpressionAttributeNames: Optional[Dict[str, str]] = None,
+                    ExpressionAttributeValues: Optional[Dict[str, Any]] = None):
+        # Only 'SET a = :v, ...' then 'REMOVE a, ...' updates and a single equality condition are supported
+        self._call('update_item')
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        table = self._table(TableName)
+        item_key = self._item_key(TableName, Key)
+        item = table.get(item_key)
+        if ConditionExpression:
+            name, value = (part.strip() for part in ConditionExpression.split('='))
+            if item is None or item.get(names.get(name, name)) != values[value]:
+                raise ClientError(
+                    {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'The conditional request failed'}},
+                    'UpdateItem'
+                )
+        item = dict(item) if item is not None else dict(Key)
+        set_clause, _, remove_clause = UpdateExpression.partition('REMOVE')
+        for assignment in set_clause.replace('SET', '', 1).split(','):
+            if assignment.strip():
+                name, value = (part.strip() for part in assignment.split('='))
+                item[names.get(name, name)] = values[value]
+        for name in remove_clause.split(','):
+            if name.strip():
+                item.pop(names.get(name.strip(), name.strip()), None)
+        table[item_key] = item
+        return {}
+
+    def delete_item(self, TableName: str, Key: Dict[str, Any]):
+        self._call('delete_item')
+        self._table(TableName).pop(self._item_key(TableName, Key), None)
+        return {}
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]]):
+        self._call('batch_write_item')
+        for table_name, requests in RequestItems.items():
+            if len(requests) > 25:
+                raise ClientError(
+                    {'Error': {'Code': 'ValidationException', 'Message': 'At most 25 requests'}},
+                    'BatchWriteItem'
+                )
+            table = self._table(table_name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    item = request['PutRequest']['Item']
+                    table[self._item_key(table_name, item)] = dict(item)
+                else:
+                    table.pop(self._item_key(table_name, request['DeleteRequest']['Key']), None)
+        return {'UnprocessedItems': {}}
+
+    def _query(self, TableName: str, ExpressionAttributeValues: Dict[str, Any], IndexName: Optional[str] = None,
+               **kwargs) -> List[Dict[str, Any]]:
+        # Only equality on the partition key is supported
+        hash_key, range_key = INDEX_KEYS[IndexName] if IndexName else TABLE_KEYS[TableName]
+        value = next(iter(ExpressionAttributeValues.values()))['S']
+        items = [item for item in self._table(TableName).values() if item.get(hash_key, {}).get('S') == value]
+        items.sort(key=lambda item: item[range_key]['S'])
+        if IndexName:
+            # KEYS_ONLY projection
+            keys = set(TABLE_KEYS[TableName]) | {hash_key, range_key}
+            items = [{name: item[name] for name in keys} for item in items]
+        return [dict(item) for item in items]
+
+    # Cost Explorer
+
+    def get_cost_and_usage(self, TimePeriod, Granularity, Metrics, GroupBy, NextPageToken=None):
+        self._call('get_cost_and_usage')
+        groups = self.fake.cost_groups(GroupBy)
+        offset = int(NextPageToken or 0)
+        if Granularity != 'DAILY':
+            response = {'ResultsByTime': [{
+                'TimePeriod': TimePeriod,
+                'Groups': groups[offset:offset + CE_PAGE_SIZE]
+            }]}
+            total = len(groups)
+        else:
+            # Pages run through every group of one day before the next day
+            first = date.fromisoformat(TimePeriod['Start'])
+            total = (date.fromisoformat(TimePeriod['End']) - first).days * len(groups)
+            results = []
+            for position in range(offset, min(offset + CE_PAGE_SIZE, total)):
+                day, index = divmod(position, len(groups))
+                if not results or index == 0:
+                    start = first + timedelta(days=day)
+                    results.append({
+                        'TimePeriod': {'Start': start.isoformat(), 'End': (start + timedelta(days=1)).isoformat()},
+                        'Groups': []
+                    })
+                results[-1]['Groups'].append(daily_cost_group(groups[index], first.toordinal() + day))
+            response = {'ResultsByTime': results}
+        if offset + CE_PAGE_SIZE < total:
+            response['NextPageToken'] = str(offset + CE_PAGE_SIZE)
+        return response
+
+    # SNS, Lambda and STS
+
+    def publish(self, **kwargs):
+        self._call('publish')
+        return {'MessageId': 'fake'}
+
+    def invoke(self, **kwargs):
+        self._call('invoke')
+        self.fake.invocations.append(kwargs)
+        return {'StatusCode': 202 if kwargs.get('InvocationType') == 'Event' else 200}
+
+    def assume_role(self, RoleArn: str, RoleSessionName: str, DurationSeconds: int = 3600):
+        self._call('assume_role')
+        return {'Credentials': {
+            'AccessKeyId': 'fake',
+            'SecretAccessKey': 'fake',
+            'SessionToken': 'fake',
+            'Expiration': datetime.now(timezone.utc) + timedelta(seconds=DurationSeconds)
+        }}
+
+    def get_caller_identity(self):
+        self._call('get_caller_identity')
+        return {'Account': ACCOUNT_ID}
+
+
+class FakeSession:
+    """Stand-in for a boto3 session whose clients are the fake's"""
+
+    def __init__(self, fake: 'FakeAWS'):
+        self.fake = fake
+
+    def client(self, service_name: str, region_name: Optional[str] = None, config=None) -> FakeClient:
+        # A new client per call, as boto3 builds, so each registry instruments its own
+        return FakeClient(self.fake, service_name, region_name)
+
+
+class FakeAWS:
+    """
+    Shared state and call accounting for every fake client
+
+    Args:
+        fleet: Output of build_fleet
+        latency_ms: Delay added to every attempt, retries included
+        throttle_rate: Probability that an attempt is throttled
+        max_attempts: Attempts per call before ThrottlingException surfaces
+        cost_groups_count: Cost Explorer groups returned per query
+        seed: Seed for throttling and backoff jitter
+    """
+
+    def __init__(self, fleet: Dict[str, Any], latency_ms: float = 0.0, throttle_rate: float = 0.0,
+                 max_attempts: int = 5, cost_groups_count: int = 1000, seed: int = 0):
+        self.fleet = fleet
+        self.latency = latency_ms / 1000
+        self.throttle_rate = throttle_rate
+        self.max_attempts = max_attempts
+        self.cost_groups_count = cost_groups_count
+        self.calls = Counter()
+        self.throttles = Counter()
+        self.invocations: List[Dict[str, Any]] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._clients: Dict[Any, FakeClient] = {}
+        self._cost_groups: Dict[Any, List[Dict[str, Any]]] = {}
+        self.tables: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self._botocore = botocore.session.get_session()
+        self._service_models: Dict[str, Any] = {}
+        self._models_lock = threading.Lock()
+
+    def attempt(self, service_name: str, operation_name: str) -> Tuple[bool, float]:
+        """
+        Account for one attempt of an API call, applying latency
+
+        Returns:
+            (throttled, jitter): whether the attempt was throttled, and a
+            draw in [0, 1) for its backoff
+        """
+        key = f"{service_name}:{operation_name}"
+        with self._lock:
+            self.calls[key] += 1
+            throttled = bool(self.throttle_rate) and self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttles[key] += 1
+            jitter = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        return throttled, jitter
+
+    def service_model(self, service_name: str):
+        """The real botocore service model, loaded once per service"""
+        with self._models_lock:
+            if service_name not in self._service_models:
+                self._service_models[service_name] = self._botocore.get_service_model(service_name)
+            return self._service_models[service_name]
+
+    def cost_groups(self, group_by: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Deterministic Cost Explorer groups for the requested GroupBy keys"""
+        key = tuple((spec['Type'], spec['Key']) for spec in group_by)
+        with self._lock:
+            if key in self._cost_groups:
+                return self._cost_groups[key]
+        groups = []
+        for i in range(self.cost_groups_count):
+            keys = []
+            for spec in group_by:
+                if spec['Type'] == 'TAG':
+                    keys.append(f"{spec['Key']}${('dev', 'staging', 'prod', '')[i % 4]}")
+                elif spec['Key'] == 'SERVICE':
+                    keys.append(f"Service {i % 60}")
+                elif spec['Key'] == 'LINKED_ACCOUNT':
+                    keys.append(f"{100000000000 + i % 25}")
+                else:
+                    keys.append(f"region-{i % 12}")
+            groups.append({'Keys': keys, 'Metrics': {'UnblendedCost': {'Amount': f"{(i % 97) * 1.37:.2f}"}}})
+        with self._lock:
+            self._cost_groups[key] = groups
+        return groups
+
+    def client(self, service_name: str, region: Optional[str] = None) -> FakeClient:
+        key = (service_name, region)
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = FakeClient(self, service_name, region)
+            return self._clients[key]
+
+    def install(self):
+        """
+        Build the default registry's and every pooled session's clients from this fake
+
+        The fake is swapped in below the registries, which still memoize
+        clients and attach the rate limiter to each; assumed roles go
+        through the fake STS.
+        """
+        import aws_clients
+        import sessions
+
+        aws_clients.default_registry = aws_clients.ClientRegistry(FakeSession(self))
+        sessions.new_session = lambda **credentials: FakeSession(self)
+        sessions.session_pool.clear()
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
@@ -0,0 +1,81 @@
+"""Tests for paging through describe calls"""
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from discovery import iter_db_instances, iter_ec2_instances, iter_ecs_services, iter_pages
+
+
+@pytest.fixture
+def ec2():
+    client = boto3.client('ec2', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test')
+    with Stubber(client) as stubber:
+        yield client, stubber
+
+
+def instances_page(instance_ids, next_token=None):
+    page = {'Reservations': [{'Instances': [{'InstanceId': instance_id} for instance_id in instance_ids]}]}
+    if next_token:
+        page['NextToken'] = next_token
+    return page
+
+
+def test_ec2_instances_are_read_across_pages(ec2):
+    client, stubber = ec2
+    stubber.add_response('describe_instances', instances_page(['i-1', 'i-2'], 'page-2'), {'Filters': []})
+    stubber.add_response('describe_instances', instances_page(['i-3']), {'Filters': [], 'NextToken': 'page-2'})
+
+    assert [instance['InstanceId'] for instance in iter_ec2_instances(client)] == ['i-1', 'i-2', 'i-3']
+    stubber.assert_no_pending_responses()
+
+
+def test_pages_are_fetched_only_as_they_are_consumed(ec2):
+    client, stubber = ec2
+    stubber.add_response('describe_instances', instances_page(['i-1'], 'page-2'), {'Filters': []})
+
+    pages = iter_pages(client, 'describe_instances', Filters=[])
+    assert next(pages)['Reservations'][0]['Instances'] == [{'InstanceId': 'i-1'}]
+    stubber.assert_no_pending_responses()
+
+
+def test_db_instances_are_read_across_marker_pages():
+    client = boto3.client('rds', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test')
+    with Stubber(client) as stubber:
+        stubber.add_response('describe_db_instances',
+                             {'DBInstances': [{'DBInstanceIdentifier': 'db-1'}], 'Marker': 'm'}, {})
+        stubber.add_response('describe_db_instances', {'DBInstances': [{'DBInstanceIdentifier': 'db-2'}]},
+                             {'Marker': 'm'})
+
+        assert [db['DBInstanceIdentifier'] for db in iter_db_instances(client)] == ['db-1', 'db-2']
+
+
+def test_ecs_services_are_described_in_batches_of_ten():
+    client = boto3.client('ecs', region_name='us-east-1', aws_access_key_id='test', aws_secret_access_key='test')
+    arns = [f"arn:aws:ecs:us-east-1:123456789012:service/c/s{n}" for n in range(12)]
+    with Stubber(client) as stubber:
+        stubber.add_response('list_services', {'serviceArns': arns}, {'cluster': 'c', 'maxResults': 100})
+        for chunk in (arns[:10], arns[10:]):
+            stubber.add_response('describe_services', {'services': [{'serviceArn': arn} for arn in chunk]},
+                                 {'cluster': 'c', 'services': chunk, 'include': ['TAGS']})
+
+        assert [service['serviceArn'] for service in iter_ecs_services(client, 'c')] == arns
+        stubber.assert_no_pending_responses()
+
+
+def test_cursor_resumes_from_the_last_finished_page(ec2):
+    client, stubber = ec2
+    stubber.add_response('describe_instances', instances_page(['i-1'], 'page-2'), {'Filters': []})
+    stubber.add_response('describe_instances', instances_page(['i-2'], 'page-3'),
+                         {'Filters': [], 'NextToken': 'page-2'})
+    cursor = {}
+
+    instances = iter_ec2_instances(client, cursor=cursor)
+    assert next(instances)['InstanceId'] == 'i-1'
+    assert next(instances)['InstanceId'] == 'i-2'
+    # Interrupted while page-2 was being read: the cursor still points at it
+    assert cursor['token'] == 'page-2'
+
+    stubber.add_response('describe_instances', instances_page(['i-2']), {'Filters': [], 'NextToken': 'page-2'})
+    assert [instance['InstanceId'] for instance in iter_ec2_instances(client, cursor=cursor)] == ['i-2']
+    assert cursor['token'] is None
+    stubber.assert_no_pending_responses()
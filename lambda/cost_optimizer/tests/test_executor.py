@@ -0,0 +1,81 @@
+"""Tests for run_batched bisection and the EC2 instance error check"""
+from botocore.exceptions import ClientError
+
+from executor import Deferred, is_instance_error, run_batched
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'StopInstances')
+
+
+class BatchCall:
+    """Fails any batch holding a bad item with error, recording every batch it is given"""
+
+    def __init__(self, bad=(), error=None):
+        self.bad = set(bad)
+        self.error = error or client_error('IncorrectInstanceState')
+        self.batches = []
+
+    def __call__(self, batch):
+        self.batches.append(list(batch))
+        if self.bad & set(batch):
+            raise self.error
+        return len(batch)
+
+
+def errors_by_item(outcomes):
+    return {item: error for item, _, error in outcomes}
+
+
+def test_run_batched_isolates_bad_items():
+    call = BatchCall(bad={5})
+    outcomes = run_batched(call, range(8), batch_size=8, max_workers=1)
+
+    errors = errors_by_item(outcomes)
+    assert [item for item, _, _ in outcomes] == list(range(8))
+    assert isinstance(errors.pop(5), ClientError)
+    assert all(error is None for error in errors.values())
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1
+    assert len(call.batches) == 7
+
+
+def test_run_batched_keeps_healthy_batches_whole():
+    call = BatchCall()
+    outcomes = run_batched(call, range(10), batch_size=4, max_workers=2)
+
+    assert sorted(len(batch) for batch in call.batches) == [2, 4, 4]
+    assert all(error is None for _, _, error in outcomes)
+
+
+def test_run_batched_fails_whole_batch_when_should_split_rejects():
+    call = BatchCall(bad={0}, error=client_error('Throttling'))
+    outcomes = run_batched(call, range(8), batch_size=4, max_workers=1, should_split=is_instance_error)
+
+    errors = errors_by_item(outcomes)
+    assert all(isinstance(errors[item], ClientError) for item in range(4))
+    assert all(errors[item] is None for item in range(4, 8))
+    assert len(call.batches) == 2
+
+
+def test_run_batched_defers_batch_when_on_split_refuses():
+    call = BatchCall(bad={1})
+    outcomes = run_batched(call, range(4), batch_size=4, max_workers=1, on_split=lambda: False)
+
+    assert all(isinstance(error, Deferred) for _, _, error in outcomes)
+    assert len(call.batches) == 1
+
+
+def test_run_batched_defers_batches_not_started():
+    call = BatchCall()
+    outcomes = run_batched(call, range(6), batch_size=2, max_workers=1, stop_when=lambda: bool(call.batches))
+
+    assert [error is None for _, _, error in outcomes] == [True, True, False, False, False, False]
+    assert all(isinstance(error, Deferred) for _, _, error in outcomes[2:])
+
+
+def test_is_instance_error():
+    assert is_instance_error(client_error('IncorrectInstanceState'))
+    assert is_instance_error(client_error('InvalidInstanceID.NotFound'))
+    assert not is_instance_error(client_error('Throttling'))
+    assert not is_instance_error(client_error('UnauthorizedOperation'))
+    assert not is_instance_error(RuntimeError('boom'))
@@ -0,0 +1,75 @@
+"""Tests for region and account resolution and merging their results"""
+from botocore.exceptions import ClientError
+
+import fanout
+from fanout import combine_reports, merge_results, resolve_accounts, resolve_regions
+
+
+class FakeEC2:
+    def describe_regions(self, Filters):
+        return {'Regions': [{'RegionName': 'us-west-2'}, {'RegionName': 'eu-west-1'}]}
+
+
+def test_regions_come_from_a_list_or_comma_separated_string():
+    assert resolve_regions(None) == [None]
+    assert resolve_regions('') == [None]
+    assert resolve_regions('us-east-1, eu-west-1,us-east-1') == ['us-east-1', 'eu-west-1']
+    assert resolve_regions(['eu-west-1', 'eu-west-1']) == ['eu-west-1']
+
+
+def test_all_regions_are_the_enabled_ones(monkeypatch):
+    monkeypatch.setattr(fanout, 'get_client', lambda service_name: FakeEC2())
+    assert resolve_regions('all') == ['eu-west-1', 'us-west-2']
+
+
+def test_merge_sums_counts_and_labels_items_with_their_region():
+    outcomes = [
+        ('us-east-1', {'ec2': {'instances_found': 2, 'stopped': ['i-1'], 'instances': [{'id': 'i-1'}]}}, None),
+        ('eu-west-1', {'ec2': {'instances_found': 1, 'error': 'boom'}, 'rds': {'stopped': []}}, None),
+        ('ap-south-1', None, ClientError({'Error': {'Code': 'UnauthorizedOperation', 'Message': 'no'}},
+                                         'DescribeInstances'))
+    ]
+    merged = merge_results(outcomes)
+
+    assert merged['ec2']['instances_found'] == 3
+    # Bare IDs stay as they are; dict items gain the region they came from
+    assert merged['ec2']['stopped'] == ['i-1']
+    assert merged['ec2']['instances'] == [{'id': 'i-1', 'region': 'us-east-1'}]
+    assert merged['ec2']['error'] == ['eu-west-1: boom']
+    assert merged['rds'] == {'stopped': []}
+    assert len(merged['error']) == 1 and merged['error'][0].startswith('ap-south-1: ')
+
+
+def test_merge_of_the_default_region_adds_no_label():
+    merged = merge_results([(None, {'ecs': {'services_found': 1, 'services': [{'name': 'web'}]}}, None)])
+    assert merged == {'ecs': {'services_found': 1, 'services': [{'name': 'web'}]}}
+
+
+class FakeOrganizations:
+    def get_paginator(self, operation_name):
+        return self
+
+    def paginate(self):
+        yield {'Accounts': [{'Id': '111111111111', 'Status': 'ACTIVE'}, {'Id': '222222222222', 'Status': 'SUSPENDED'}]}
+        yield {'Accounts': [{'Id': '333333333333', 'Status': 'ACTIVE'}]}
+
+
+def test_accounts_default_to_every_active_member(monkeypatch):
+    monkeypatch.setattr(fanout, 'get_client', lambda service_name: FakeOrganizations())
+    assert resolve_accounts(None) == ['111111111111', '333333333333']
+    assert resolve_accounts('444444444444, 444444444444') == ['444444444444']
+
+
+def test_partial_reports_combine_section_by_section_and_account_by_account():
+    first = {'ec2': {'stopped': ['i-1'], 'instances_found': 1},
+             'accounts': {'111111111111': {'ec2': {'stopped': ['i-1']}}}}
+    second = {'ec2': {'stopped': ['i-2'], 'instances_found': 1}, 'error': ['eu-west-1: boom'],
+              'accounts': {'111111111111': {'ec2': {'stopped': ['i-2']}}, '222222222222': {'rds': {'stopped': []}}}}
+
+    combined = combine_reports([first, second])
+
+    assert combined['ec2'] == {'instances_found': 2, 'stopped': ['i-1', 'i-2']}
+    assert combined['error'] == ['eu-west-1: boom']
+    assert combined['accounts']['111111111111'] == {'ec2': {'stopped': ['i-1', 'i-2']}}
+    assert combined['accounts']['222222222222'] == {'rds': {'stopped': []}}
+    assert combine_reports([first]) is first
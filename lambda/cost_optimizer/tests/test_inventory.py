@@ -0,0 +1,115 @@
+"""Tests for the event-maintained inventory index"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import inventory
+from inventory import DynamoDBInventoryStore, LocalInventoryStore, apply_event, load_candidates, reconcile
+
+REGION = 'us-east-1'
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = LocalInventoryStore()
+    monkeypatch.setattr(inventory, 'inventory_store', store)
+    return store
+
+
+def state_event(instance_id, state):
+    return {'source': 'aws.ec2', 'detail-type': 'EC2 Instance State-change Notification', 'region': REGION,
+            'detail': {'instance-id': instance_id, 'state': state}}
+
+
+def tag_event(instance_id, tags):
+    return {'source': 'aws.tag', 'detail-type': 'Tag Change on Resource', 'region': REGION,
+            'resources': [f"arn:aws:ec2:{REGION}:123456789012:instance/{instance_id}"],
+            'detail': {'service': 'ec2', 'resource-type': 'instance', 'tags': tags}}
+
+
+def test_reconcile_indexes_the_candidates_a_scan_selects(fake_aws, store):
+    reconcile(fake_aws.client, 'dev')
+    candidates = load_candidates(REGION, store=store)
+
+    assert candidates['ec2'] and candidates['rds'] and candidates['ecs']
+    for instance_id in candidates['ec2']:
+        tags = {tag['Key']: tag['Value'] for tag in fake_aws.fleet['instances'][instance_id]['Tags']}
+        assert tags['Environment'] == 'dev' and tags['AutoStop'] == 'true'
+
+
+def test_stale_or_missing_index_is_not_used(store):
+    assert load_candidates(REGION, store=store) is None
+    stale = (datetime.now(timezone.utc) - timedelta(hours=48)).isoformat()
+    store.replace(REGION, [], stale)
+    assert load_candidates(REGION, max_age_hours=26, store=store) is None
+
+
+def test_state_change_of_indexed_instance_needs_no_describe(fake_aws, store):
+    reconcile(fake_aws.client, 'dev')
+    instance_id = load_candidates(REGION, store=store)['ec2'][0]
+    describes = fake_aws.calls['ec2:describe_instances']
+
+    apply_event(state_event(instance_id, 'stopped'), fake_aws.client, 'dev')
+
+    assert fake_aws.calls['ec2:describe_instances'] == describes
+    assert instance_id not in load_candidates(REGION, store=store)['ec2']
+    apply_event(state_event(instance_id, 'terminated'), fake_aws.client, 'dev')
+    assert store.get(REGION, 'ec2', instance_id) is None
+
+
+def test_event_for_unindexed_instance_describes_it(fake_aws, store):
+    store.replace(REGION, [], datetime.now(timezone.utc).isoformat())
+    instance_id = next(iter(fake_aws.fleet['instances']))
+
+    apply_event(tag_event(instance_id, {'Environment': 'dev', 'AutoStop': 'true', 'Owner': 'x'}), fake_aws.client,
+                'dev')
+
+    assert fake_aws.calls['ec2:describe_instances'] == 1
+    # Tags are read back from the instance, and only the ones selection looks at are kept
+    assert 'Owner' not in store.get(REGION, 'ec2', instance_id)['tags']
+
+
+def test_old_format_ecs_service_arn_is_ignored(fake_aws, store):
+    event = {'source': 'aws.ecs', 'detail-type': 'ECS Service Action', 'region': REGION, 'detail': {},
+             'resources': [f"arn:aws:ecs:{REGION}:123456789012:service/web"]}
+    assert apply_event(event, fake_aws.client, 'dev') == {'ignored': 'ECS Service Action'}
+
+
+def test_concurrent_events_for_one_instance_keep_both_changes(fake_aws, monkeypatch):
+    store = DynamoDBInventoryStore('inventory')
+    monkeypatch.setattr(inventory, 'inventory_store', store)
+    monkeypatch.setattr(inventory, 'get_client', fake_aws.client)
+    instance_id = 'i-1'
+    store.put(REGION, 'ec2', instance_id, {'state': 'running', 'tags': {'Environment': 'dev'}}, False)
+
+    dynamodb = fake_aws.client('dynamodb')
+    get_item = dynamodb.get_item
+    interleaved = []
+
+    def racing_get_item(**kwargs):
+        item = get_item(**kwargs)
+        if not interleaved:
+            # Another event lands between this event's read and its write
+            interleaved.append(True)
+            apply_event(tag_event(instance_id, {'Environment': 'dev', 'AutoStop': 'true'}), fake_aws.client, 'dev')
+        return item
+
+    monkeypatch.setattr(dynamodb, 'get_item', racing_get_item)
+    apply_event(state_event(instance_id, 'stopping'), fake_aws.client, 'dev')
+
+    assert store.get(REGION, 'ec2', instance_id) == {
+        'state': 'stopping', 'tags': {'Environment': 'dev', 'AutoStop': 'true'}
+    }
+    assert fake_aws.calls['ec2:describe_instances'] == 0
+
+
+def test_update_keeps_the_candidate_index_in_step(fake_aws, monkeypatch):
+    store = DynamoDBInventoryStore('inventory')
+    monkeypatch.setattr(inventory, 'get_client', fake_aws.client)
+    store.put(REGION, 'ec2', 'i-1', {'state': 'running', 'tags': {'Environment': 'dev', 'AutoStop': 'true'}}, True)
+    store.replace(REGION, [('ec2', 'i-1', store.get(REGION, 'ec2', 'i-1'), True)],
+                  datetime.now(timezone.utc).isoformat())
+
+    assert store.update(REGION, 'ec2', 'i-1', {'state': 'stopped'}, lambda record: record['state'] == 'running')
+    assert store.candidates(REGION)[1]['ec2'] == []
+    assert not store.update(REGION, 'ec2', 'i-2', {'state': 'stopped'}, lambda record: True)
@@ -0,0 +1,103 @@
+"""Tests for applying a plan: resources changed or gone since planning"""
+from deadline import Deadline
+from plan import missing_resources, planned_resources
+from stop_dev_instances import scale_down_ecs_tasks, stop_dev_ec2_instances, stop_dev_rds_instances
+
+
+def test_missing_resources():
+    expected = {'i-1': 'a', 'i-2': 'b', 'i-3': 'c'}
+    assert missing_resources(expected, ['i-2']) == ['i-1', 'i-3']
+    assert missing_resources(expected, iter(expected)) == []
+
+
+def plan_section(section, run, fake):
+    """Plan one section as a dry run; returns the planned versions"""
+    versions = planned_resources(section, run(dry_run=True, clients=fake.client))
+    assert versions
+    return versions
+
+
+def apply_section(run, fake, versions, **kwargs):
+    return run(dry_run=True, clients=fake.client, candidate_ids=list(versions), expected_versions=versions, **kwargs)
+
+
+def test_ec2_apply_reports_changed_and_missing(fake_aws):
+    versions = plan_section('ec2', stop_dev_ec2_instances, fake_aws)
+    gone, resized, kept = sorted(versions)[:3]
+    del fake_aws.fleet['instances'][gone]
+    fake_aws.fleet['instances'][resized]['InstanceType'] = 'x1.32xlarge'
+
+    result = apply_section(stop_dev_ec2_instances, fake_aws, versions)
+
+    assert result['missing'] == [gone]
+    assert result['changed'] == [resized]
+    ids = [instance['id'] for instance in result['instances']]
+    assert kept in ids and gone not in ids and resized not in ids
+
+
+def test_ec2_apply_reports_instances_no_longer_selected_as_missing(fake_aws):
+    versions = plan_section('ec2', stop_dev_ec2_instances, fake_aws)
+    stopped, opted_out = sorted(versions)[:2]
+    fake_aws.fleet['instances'][stopped]['State']['Name'] = 'stopped'
+    for tag in fake_aws.fleet['instances'][opted_out]['Tags']:
+        if tag['Key'] == 'AutoStop':
+            tag['Value'] = 'false'
+
+    result = apply_section(stop_dev_ec2_instances, fake_aws, versions)
+
+    assert result['missing'] == sorted([stopped, opted_out])
+    assert 'changed' not in result
+
+
+def test_unchanged_apply_reports_nothing(fake_aws):
+    versions = plan_section('rds', stop_dev_rds_instances, fake_aws)
+
+    result = apply_section(stop_dev_rds_instances, fake_aws, versions)
+
+    assert 'missing' not in result and 'changed' not in result
+    assert sorted(instance['id'] for instance in result['instances']) == sorted(versions)
+
+
+def test_resumed_discovery_does_not_report_changed_as_missing(fake_aws):
+    versions = plan_section('rds', stop_dev_rds_instances, fake_aws)
+    resized = sorted(versions)[0]
+    fake_aws.fleet['db_instances'][resized]['DBInstanceClass'] = 'db.x1.32xlarge'
+
+    cursor = {}
+    checks = iter([False, True])
+    expiring = Deadline()
+    # Expire right after the first instance, which is the one that changed
+    expiring.expired = lambda: next(checks, True)
+    first = apply_section(stop_dev_rds_instances, fake_aws, versions, cursor=cursor, deadline=expiring)
+    second = apply_section(stop_dev_rds_instances, fake_aws, versions, cursor=cursor)
+
+    assert first['changed'] == [resized]
+    assert 'missing' not in first
+    assert resized not in second.get('missing', [])
+    assert 'missing' not in second
+
+
+def test_ecs_apply_reports_missing_except_in_failed_clusters(fake_aws, monkeypatch):
+    versions = plan_section('ecs', scale_down_ecs_tasks, fake_aws)
+    by_cluster = {}
+    for key in sorted(versions):
+        cluster_arn, service = key.rsplit('/', 1)
+        by_cluster.setdefault(cluster_arn, []).append(service)
+    assert len(by_cluster) >= 2
+    (healthy_arn, healthy), (failing_arn, failing) = list(by_cluster.items())[:2]
+    for cluster_arn, service in ((healthy_arn, healthy[0]), (failing_arn, failing[0])):
+        del fake_aws.fleet['clusters'][cluster_arn.split('/')[-1]][service]
+
+    ecs = fake_aws.client('ecs')
+    describe_services = ecs.describe_services
+
+    def flaky_describe(cluster, services, include=None):
+        if cluster == failing_arn:
+            raise RuntimeError('cluster unavailable')
+        return describe_services(cluster=cluster, services=services, include=include)
+
+    monkeypatch.setattr(ecs, 'describe_services', flaky_describe)
+    result = apply_section(scale_down_ecs_tasks, fake_aws, versions)
+
+    assert result['missing'] == [f"{healthy_arn.split('/')[-1]}/{healthy[0]}"]
+    assert any('cluster unavailable' in error for error in result['error'])
@@ -0,0 +1,77 @@
+"""Tests for the adaptive rate limiters shared by every client"""
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+from fake_aws import FakeAWS, build_fleet
+from rate_limiter import RATE_INCREASE, RateLimiterRegistry, TokenBucket, _error_code
+
+
+def test_rate_grows_additively_and_shrinks_multiplicatively():
+    bucket = TokenBucket(rate=10, max_rate=11, min_rate=2)
+
+    bucket.on_success()
+    assert bucket.rate == 10 + RATE_INCREASE
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.rate == 11
+    for _ in range(5):
+        bucket.on_throttle()
+    assert bucket.rate == 2
+    assert bucket.stats['throttles'] == 5
+
+
+def test_acquire_waits_once_a_second_of_tokens_is_spent():
+    bucket = TokenBucket(rate=20)
+    for _ in range(21):
+        bucket.acquire()
+
+    assert bucket.stats['calls'] == 21
+    assert bucket.stats['wait_seconds'] > 0
+
+
+def test_http_429_counts_as_a_throttle():
+    assert _error_code((SimpleNamespace(status_code=429), {})) == 'TooManyRequestsException'
+    assert _error_code((SimpleNamespace(status_code=400), {'Error': {'Code': 'Throttling'}})) == 'Throttling'
+    assert _error_code(None) is None
+
+
+def test_instrumented_client_paces_every_attempt():
+    registry = RateLimiterRegistry()
+    client = registry.instrument(FakeAWS(build_fleet(10)).client('ec2'))
+
+    client.describe_regions()
+    client.describe_regions()
+
+    stats = registry.stats()['ec2:us-east-1']
+    assert stats['calls'] == 2 and stats['throttles'] == 0
+    assert stats['rate'] == 20 + 2 * RATE_INCREASE
+
+
+def test_throttled_attempts_shrink_the_rate_and_count_as_retries():
+    registry = RateLimiterRegistry()
+    client = registry.instrument(FakeAWS(build_fleet(10), throttle_rate=1.0, max_attempts=3).client('ec2'))
+
+    with pytest.raises(ClientError):
+        client.describe_regions()
+
+    assert registry.totals() == {'calls': 3, 'throttles': 3, 'retries': 2, 'wait_seconds': 0.0}
+    assert registry.stats()['ec2:us-east-1']['rate'] == 2.5
+
+
+def test_clients_of_one_service_and_region_share_a_bucket():
+    registry = RateLimiterRegistry()
+    fake = FakeAWS(build_fleet(10))
+    registry.instrument(fake.client('ec2')).describe_regions()
+    registry.instrument(fake.client('ec2', 'eu-west-1')).describe_regions()
+    registry.instrument(FakeAWS(build_fleet(10)).client('ec2')).describe_regions()
+
+    assert {key: stats['calls'] for key, stats in registry.stats().items()} == {
+        'ec2:us-east-1': 2, 'ec2:eu-west-1': 1
+    }
+    registry.reset_stats()
+    assert registry.totals()['calls'] == 0
+    assert registry.stats()['ec2:us-east-1']['rate'] == 20 + 2 * RATE_INCREASE
+    registry.clear()
+    assert registry.stats() == {}
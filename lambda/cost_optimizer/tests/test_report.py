@@ -0,0 +1,90 @@
+"""Tests for run reports and the digest sent in their place"""
+import pytest
+
+import report
+import report_sink
+from report import digest, item_count, iter_records, publish_report
+from report_sink import bounded_json, read_report
+
+RESULTS = {
+    'run_id': 'run-1',
+    'timestamp': '2026-10-17T18:00:00+00:00',
+    'environment': 'dev',
+    'action': 'stop',
+    'ec2': {'instances_found': 3, 'stopped': ['i-1', 'i-2', 'i-3'], 'error': ['i-4: IncorrectInstanceState']},
+    'ecs': {'services_scaled': [{'cluster': 'c', 'service': 'web'}]}
+}
+
+
+@pytest.fixture
+def report_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_sink, 'STATE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_digest_cuts_long_lists_and_keeps_their_count():
+    reduced = digest(RESULTS, max_items=2)
+
+    assert reduced['ec2']['stopped'] == ['i-1', 'i-2']
+    assert reduced['ec2']['stopped_omitted'] == 1
+    assert item_count(reduced['ec2'], 'stopped') == 3
+    assert reduced['ecs'] == RESULTS['ecs']
+
+
+def test_digest_cuts_the_accounts_map():
+    accounts = {f"{n:012d}": {'ec2': {'stopped': []}} for n in range(5)}
+    reduced = digest({'accounts': accounts}, max_items=2)
+
+    assert list(reduced['accounts']) == ['000000000000', '000000000001']
+    assert reduced['accounts_omitted'] == 3
+
+
+def test_records_cover_every_resource_and_error():
+    records = list(iter_records(RESULTS))
+
+    assert records[0] == {'section': 'run', 'run_id': 'run-1', 'timestamp': RESULTS['timestamp'],
+                          'environment': 'dev', 'action': 'stop'}
+    assert {'section': 'ec2', 'field': 'stopped', 'id': 'i-3'} in records
+    assert {'section': 'ec2', 'field': 'error', 'message': 'i-4: IncorrectInstanceState'} in records
+    assert {'section': 'ecs', 'field': 'services_scaled', 'cluster': 'c', 'service': 'web'} in records
+
+
+def test_organization_records_carry_their_account():
+    results = {'timestamp': RESULTS['timestamp'], 'ec2': {'stopped': ['i-1']},
+               'accounts': {'111111111111': {'ec2': {'stopped': ['i-1']}}}}
+
+    assert list(iter_records(results))[1:] == [
+        {'section': 'ec2', 'field': 'stopped', 'account': '111111111111', 'id': 'i-1'}
+    ]
+
+
+def test_published_report_is_read_back_in_full(report_dir):
+    reduced = publish_report(RESULTS)
+
+    location = reduced['report']['location']
+    assert location.startswith(str(report_dir)) and location.endswith('2026-10-17/run-1.jsonl.gz')
+    assert list(read_report(location)) == list(iter_records(RESULTS))
+    assert reduced['report']['records'] == 6
+
+
+def test_failed_report_is_discarded_and_reported(report_dir, monkeypatch):
+    def fail(self, path):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(report_sink.LocalReportSink, '_store', fail)
+    reduced = publish_report(RESULTS)
+
+    assert reduced['report_error'] == 'disk full'
+    assert 'report' not in reduced
+    assert not list(report_dir.rglob('*.jsonl.gz'))
+
+
+def test_reports_can_be_turned_off(report_dir, monkeypatch):
+    monkeypatch.setattr(report, 'REPORTS_ENABLED', False)
+    assert publish_report(RESULTS) == digest(RESULTS)
+    assert not list(report_dir.rglob('*'))
+
+
+def test_log_lines_are_bounded():
+    assert bounded_json({'a': 1}) == '{"a": 1}'
+    assert bounded_json('x' * 50, limit=10) == '"xxxxxxxxx... (42 more characters)'
@@ -0,0 +1,141 @@
+"""Tests for the restore manifest and for starting resources back"""
+from botocore.exceptions import ClientError
+
+import restore
+from restore import load_manifest, record_stopped, restore_scope, save_manifest
+
+SCOPE = 'self/us-east-1'
+
+
+def test_manifest_merges_records_oldest_first():
+    record_stopped({SCOPE: {'ec2': ['i-1'], 'rds': [], 'ecs': {'cluster/web': 4}}})
+    record_stopped({SCOPE: {'ec2': ['i-2', 'i-1'], 'rds': ['db-1'], 'ecs': {'cluster/web': 1, 'cluster/api': 2}}})
+    record_stopped({'123456789012/eu-west-1': {'ec2': [], 'rds': [], 'ecs': {}}})
+
+    manifest = load_manifest()
+
+    assert manifest['scopes'] == {SCOPE: {
+        'ec2': ['i-1', 'i-2'],
+        'rds': ['db-1'],
+        # A service scaled down twice is restored to its count before the first scale-down
+        'ecs': {'cluster/web': 4, 'cluster/api': 2}
+    }}
+    assert len(manifest['keys']) == 2
+
+
+def test_save_manifest_replaces_loaded_records_only():
+    record_stopped({SCOPE: {'ec2': ['i-1', 'i-2'], 'rds': [], 'ecs': {}}})
+    manifest = load_manifest()
+    # A run that records while the restore is in progress
+    record_stopped({SCOPE: {'ec2': ['i-3'], 'rds': [], 'ecs': {}}})
+
+    manifest['scopes'][SCOPE]['ec2'] = ['i-2']
+    save_manifest(manifest)
+
+    assert load_manifest()['scopes'][SCOPE]['ec2'] == ['i-2', 'i-3']
+
+
+def test_save_manifest_drops_empty_scopes():
+    record_stopped({SCOPE: {'ec2': ['i-1'], 'rds': [], 'ecs': {}}})
+    manifest = load_manifest()
+    manifest['scopes'][SCOPE] = {'ec2': [], 'rds': [], 'ecs': {}, 'failures': {}}
+    save_manifest(manifest)
+
+    assert load_manifest() == {'scopes': {}, 'keys': []}
+
+
+def test_manifest_keeps_highest_failure_count():
+    record_stopped({SCOPE: {'ec2': ['i-1'], 'rds': [], 'ecs': {}, 'failures': {'ec2/i-1': 2}}})
+    record_stopped({SCOPE: {'ec2': ['i-1'], 'rds': [], 'ecs': {}, 'failures': {'ec2/i-1': 1}}})
+
+    assert load_manifest()['scopes'][SCOPE]['failures'] == {'ec2/i-1': 2}
+
+
+def fleet_ids(fake, count=3):
+    return list(fake.fleet['instances'])[:count], list(fake.fleet['db_instances'])[:count]
+
+
+def test_restore_starts_stopped_resources(fake_aws):
+    ec2_ids, db_ids = fleet_ids(fake_aws)
+    for instance_id in ec2_ids:
+        fake_aws.fleet['instances'][instance_id]['State']['Name'] = 'stopped'
+    for db_id in db_ids:
+        fake_aws.fleet['db_instances'][db_id]['DBInstanceStatus'] = 'stopped'
+
+    result = restore_scope({'ec2': ec2_ids, 'rds': db_ids, 'ecs': {}}, fake_aws.client)
+
+    assert result['ec2']['started'] == ec2_ids
+    assert result['rds']['started'] == db_ids
+    assert result['remaining'] == {'ec2': [], 'rds': [], 'ecs': {}, 'failures': {}}
+    assert all(fake_aws.fleet['instances'][i]['State']['Name'] == 'running' for i in ec2_ids)
+
+
+def test_restore_counts_already_started_as_restored_and_drops_gone(fake_aws):
+    ec2_ids, db_ids = fleet_ids(fake_aws, 2)
+    terminated = ec2_ids[1]
+    fake_aws.fleet['instances'][ec2_ids[0]]['State']['Name'] = 'stopped'
+    fake_aws.fleet['instances'][terminated]['State']['Name'] = 'terminated'
+    # db_ids[0] is already available: someone started it before the restore
+    fake_aws.fleet['db_instances'][db_ids[1]]['DBInstanceStatus'] = 'stopped'
+
+    result = restore_scope({'ec2': ec2_ids, 'rds': db_ids + ['db-deleted'], 'ecs': {}}, fake_aws.client)
+
+    assert result['rds']['started'] == db_ids
+    assert result['ec2']['started'] == [ec2_ids[0]]
+    assert result['remaining'] == {'ec2': [], 'rds': [], 'ecs': {}, 'failures': {}}
+    assert len(result['rds']['error']) == 1 and len(result['ec2']['error']) == 1
+
+
+def test_restore_retries_stopping_instances_without_counting_a_failure(fake_aws):
+    ec2_ids, _ = fleet_ids(fake_aws, 1)
+    fake_aws.fleet['instances'][ec2_ids[0]]['State']['Name'] = 'stopping'
+
+    def refuse(InstanceIds):
+        raise ClientError({'Error': {'Code': 'IncorrectInstanceState', 'Message': ''}}, 'StartInstances')
+
+    ec2 = fake_aws.client('ec2')
+    ec2.start_instances = refuse
+    result = restore_scope({'ec2': ec2_ids, 'rds': [], 'ecs': {}, 'failures': {f"ec2/{ec2_ids[0]}": 2}},
+                           fake_aws.client)
+
+    assert result['remaining']['ec2'] == ec2_ids
+    assert result['remaining']['failures'] == {f"ec2/{ec2_ids[0]}": 2}
+
+
+def test_restore_gives_up_after_repeated_failures(fake_aws, monkeypatch):
+    monkeypatch.setattr(restore, 'RESTORE_MAX_ATTEMPTS', 2)
+    _, db_ids = fleet_ids(fake_aws, 1)
+    fake_aws.fleet['db_instances'][db_ids[0]]['DBInstanceStatus'] = 'stopped'
+
+    def refuse(DBInstanceIdentifier):
+        raise ClientError({'Error': {'Code': 'InsufficientDBInstanceCapacity', 'Message': ''}}, 'StartDBInstance')
+
+    fake_aws.client('rds').start_db_instance = refuse
+    entry = {'ec2': [], 'rds': db_ids, 'ecs': {}}
+
+    first = restore_scope(entry, fake_aws.client)
+    assert first['remaining']['rds'] == db_ids
+    assert first['remaining']['failures'] == {f"rds/{db_ids[0]}": 1}
+
+    second = restore_scope(first['remaining'], fake_aws.client)
+    assert second['remaining']['rds'] == []
+    assert second['rds']['abandoned'] == db_ids
+
+
+def test_restore_does_not_count_throttling_as_a_failure(fake_aws, monkeypatch):
+    monkeypatch.setattr(restore, 'RESTORE_MAX_ATTEMPTS', 1)
+    monkeypatch.setattr(restore, 'EC2_START_BATCH_SIZE', 4)
+    ec2_ids, _ = fleet_ids(fake_aws, 8)
+    calls = []
+
+    def throttled(InstanceIds):
+        calls.append(InstanceIds)
+        raise ClientError({'Error': {'Code': 'RequestLimitExceeded', 'Message': ''}}, 'StartInstances')
+
+    fake_aws.client('ec2').start_instances = throttled
+    result = restore_scope({'ec2': ec2_ids, 'rds': [], 'ecs': {}}, fake_aws.client)
+
+    # Throttled chunks are not bisected, and the instances stay for the next restore
+    assert len(calls) == 2
+    assert result['remaining']['ec2'] == ec2_ids
+    assert result['remaining']['failures'] == {}
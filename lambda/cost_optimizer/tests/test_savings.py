@@ -0,0 +1,50 @@
+"""Tests for savings estimates from the price index"""
+from savings import (STOPPED_HOURS_PER_MONTH, PriceIndex, resource_savings, savings_summary,
+                     stopped_hours_per_month, total_savings)
+
+DOCUMENT = {
+    'regions': ['us-east-1', 'eu-west-1'],
+    'engine_aliases': {'mariadb': 'mysql'},
+    'ec2': {'t3.micro': [0.0104, None]},
+    'rds': {'mysql': {'db.t3.micro': [0.017, 0.018]}},
+    'fargate': {'vcpu': [0.04, 0.045], 'gb': [0.004, 0.005]}
+}
+
+
+def test_prices_are_looked_up_per_region():
+    index = PriceIndex(DOCUMENT)
+
+    assert index.ec2_hourly('us-east-1', 't3.micro') == 0.0104
+    assert index.ec2_hourly('eu-west-1', 't3.micro') is None
+    assert index.ec2_hourly('us-east-1', 'm5.large') is None
+    assert index.rds_hourly('eu-west-1', 'db.t3.micro', 'mariadb') == 0.018
+    assert index.ecs_task_hourly('us-east-1', vcpu=0.5, memory_gb=1) == 0.024
+
+
+def test_bundled_index_loads():
+    index = PriceIndex.load()
+    assert index.generated
+    assert index.ec2_hourly('us-east-1', 't3.micro') == 0.0104
+
+
+def test_missing_index_prices_nothing(tmp_path):
+    assert PriceIndex.load(str(tmp_path / 'missing.json')).prices == {}
+
+
+def test_stopped_hours_cover_weekday_nights_and_weekends():
+    # 15 hours on each of 5 weeknights plus 48 weekend hours, over 52/12 weeks
+    assert stopped_hours_per_month('09:00', '18:00') == 533.0
+    assert stopped_hours_per_month('22:00', '06:00') == round((5 * 16 + 48) * 52 / 12, 1)
+
+
+def test_summaries_count_unpriced_resources():
+    entries = [resource_savings(0.1), resource_savings(None), resource_savings(0.05)]
+    summary = savings_summary(entries)
+
+    assert entries[1] == {'hourly_savings': None, 'monthly_savings': None}
+    assert summary == {'hourly_savings': 0.15, 'monthly_savings': round(0.15 * STOPPED_HOURS_PER_MONTH, 2),
+                       'unpriced': 1}
+
+    total = total_savings({'ec2': summary, 'rds': savings_summary([resource_savings(0.05)])}, ('ec2', 'rds', 'ecs'))
+    assert total['hourly_savings'] == 0.2 and total['unpriced'] == 1
+    assert total['stopped_hours_per_month'] == STOPPED_HOURS_PER_MONTH
@@ -0,0 +1,38 @@
+"""Tests for bulk ECS service scaling"""
+from scale_ecs_tasks import scale_ecs_services
+
+
+def cluster_plan(fake_aws, count):
+    cluster, services = next(iter(fake_aws.fleet['clusters'].items()))
+    names = list(services)[:count]
+    return cluster, services, [
+        {'cluster': cluster, 'service': name, 'desired_count': services[name]['desiredCount'] + 1} for name in names
+    ]
+
+
+def test_services_are_described_in_batches_and_updated_once(fake_aws):
+    cluster, services, plan = cluster_plan(fake_aws, 12)
+    unchanged = plan[0]['service']
+    plan[0]['desired_count'] -= 1
+    plan.append({'cluster': cluster, 'service': 'missing-service', 'desired_count': 0})
+
+    results = scale_ecs_services(plan)
+
+    assert fake_aws.calls['ecs:describe_services'] == 2
+    assert fake_aws.calls['ecs:update_service'] == 11
+    assert [result['service'] for result in results] == [target['service'] for target in plan]
+    assert results[0] == {'cluster': cluster, 'service': unchanged, 'previous_count': plan[0]['desired_count'],
+                          'new_count': plan[0]['desired_count'], 'success': True, 'message': 'No scaling needed'}
+    assert all(result['success'] for result in results[:-1])
+    assert results[-1]['missing'] and not results[-1]['success']
+    assert all(services[target['service']]['desiredCount'] == target['desired_count'] for target in plan[:-1])
+
+
+def test_dry_run_only_describes(fake_aws):
+    _, services, plan = cluster_plan(fake_aws, 3)
+
+    results = scale_ecs_services(plan, dry_run=True)
+
+    assert fake_aws.calls['ecs:update_service'] == 0
+    assert all(result['success'] and result['message'].startswith('DRY RUN') for result in results)
+    assert all(services[target['service']]['desiredCount'] == target['desired_count'] - 1 for target in plan)
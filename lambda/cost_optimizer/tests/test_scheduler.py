@@ -0,0 +1,90 @@
+"""Tests for the API call budget and the savings-prioritized scheduler"""
+from executor import Deferred
+from scheduler import CallBudget, SectionWork, run_scheduled
+
+
+def test_call_budget_without_limit_never_refuses():
+    budget = CallBudget()
+    assert all(budget.try_spend() for _ in range(100))
+    assert not budget.exhausted()
+    assert budget.spent == 100
+
+
+def test_call_budget_refuses_once_spent():
+    budget = CallBudget(limit=3)
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+    assert budget.exhausted()
+    assert budget.spent == 3
+
+
+def test_call_budget_counts_earlier_invocations():
+    budget = CallBudget(limit=5, spent=4)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_call_budget_zero_limit_means_unlimited():
+    assert CallBudget(limit=0).try_spend()
+
+
+def section(name, savings, calls, batch_size=1, call=None):
+    """SectionWork over resources with the given hourly savings, recording each call's batch"""
+    result, cursor = {}, {'discovered': True}
+
+    def default_call(batch):
+        calls.append((name, [entry['id'] for entry in batch]))
+        return [(entry, None) for entry in batch]
+
+    candidates = [{'id': f"{name}-{i}", 'hourly_savings': value} for i, value in enumerate(savings)]
+    return SectionWork(
+        name, result, cursor, set(), candidates, call or default_call,
+        key=lambda entry: entry['id'], label=lambda entry: entry['id'],
+        on_success=lambda entry: result.setdefault('stopped', []).append(entry['id']),
+        batch_size=batch_size
+    )
+
+
+def test_run_scheduled_orders_calls_by_savings():
+    calls = []
+    ec2 = section('ec2', [0.1, 0.5], calls)
+    rds = section('rds', [0.3], calls)
+    run_scheduled([ec2, rds], max_concurrency=1)
+
+    assert calls == [('ec2', ['ec2-1']), ('rds', ['rds-0']), ('ec2', ['ec2-0'])]
+    assert ec2.cursor['complete'] and rds.cursor['complete']
+    assert ec2.result['hourly_savings'] == 0.6
+
+
+def test_run_scheduled_leaves_work_pending_once_budget_is_spent():
+    calls = []
+    ec2 = section('ec2', [0.1, 0.2, 0.3, 0.4], calls)
+    run_scheduled([ec2], max_concurrency=1, budget=CallBudget(limit=2))
+
+    assert [ids for _, ids in calls] == [['ec2-3'], ['ec2-2']]
+    assert [entry['id'] for entry in ec2.cursor['pending']] == ['ec2-1', 'ec2-0']
+    assert sorted(ec2.cursor['processed']) == ['ec2-2', 'ec2-3']
+    assert not ec2.cursor['complete']
+
+
+def test_run_scheduled_keeps_entries_a_call_deferred():
+    calls = []
+    ec2 = section('ec2', [0.1, 0.2], calls, batch_size=2,
+                  call=lambda batch: [(batch[0], None), (batch[1], Deferred())])
+    run_scheduled([ec2], max_concurrency=1)
+
+    assert ec2.result['stopped'] == ['ec2-1']
+    assert [entry['id'] for entry in ec2.cursor['pending']] == ['ec2-0']
+
+
+def test_run_scheduled_records_errors_as_processed():
+    calls = []
+
+    def fail(batch):
+        raise RuntimeError('denied')
+
+    ec2 = section('ec2', [0.1], calls, call=fail)
+    run_scheduled([ec2], max_concurrency=1)
+
+    assert ec2.result['error'] == ['ec2-0: denied']
+    assert ec2.cursor['processed'] == ['ec2-0']
+    assert ec2.cursor['complete']
@@ -0,0 +1,102 @@
+"""Tests for the compiled tag policy"""
+import json
+
+import pytest
+
+from stop_dev_instances import stop_dev_ec2_instances
+from tag_policy import TAG_POLICY_PATH, TagPolicy
+
+
+@pytest.fixture
+def policy():
+    """The bundled policy, compiled for dev"""
+    with open(TAG_POLICY_PATH) as f:
+        return TagPolicy(json.load(f), 'dev')
+
+
+def test_bundled_policy_requires_environment_and_opt_in(policy):
+    ec2 = policy.selector('ec2')
+    assert ec2.matches({'Environment': 'dev', 'AutoStop': 'true', 'Name': 'app'})
+    assert not ec2.matches({'Environment': 'dev'})
+    assert not ec2.matches({'Environment': 'dev', 'AutoStop': 'false'})
+    assert not ec2.matches({'Environment': 'staging', 'AutoStop': 'true'})
+    assert not ec2.matches({})
+
+
+def test_bundled_policy_never_selects_prod(policy):
+    for aggressive in (False, True):
+        assert not policy.selector('ec2', aggressive).matches({'Environment': 'prod', 'AutoStop': 'true'})
+
+
+def test_values_match_case_insensitively(policy):
+    assert policy.selector('ec2').matches({'Environment': 'DEV', 'AutoStop': 'True'})
+
+
+def test_aggressive_accepts_missing_opt_in_but_not_opt_out(policy):
+    ec2 = policy.selector('ec2', aggressive=True)
+    assert ec2.matches({'Environment': 'dev'})
+    assert not ec2.matches({'Environment': 'dev', 'AutoStop': 'false'})
+    # The environment is still required
+    assert not ec2.matches({'AutoStop': 'true'})
+
+
+def test_rules_apply_to_their_kinds_only(policy):
+    assert policy.selector('ecs').matches({'Environment': 'dev', 'AutoScale': 'true'})
+    assert not policy.selector('ecs').matches({'Environment': 'dev', 'AutoStop': 'true'})
+    assert not policy.selector('ec2').matches({'Environment': 'dev', 'AutoScale': 'true'})
+
+
+def test_attribute_rules(policy):
+    rds = policy.selector('rds')
+    tags = {'Environment': 'dev', 'AutoStop': 'true'}
+    assert rds.matches(tags, {'multi_az': False})
+    assert not rds.matches(tags, {'multi_az': True})
+
+
+def test_case_sensitive_rule():
+    policy = TagPolicy({'rules': [
+        {'effect': 'require', 'tag': 'Team', 'values': ['Core'], 'case_sensitive': True}
+    ]}, 'dev')
+    assert policy.selector('ec2').matches({'Team': 'Core'})
+    assert not policy.selector('ec2').matches({'Team': 'core'})
+    assert policy.selector('ec2').server_filters() == [{'Name': 'tag:Team', 'Values': ['Core']}]
+
+
+def test_server_filters_only_for_ec2_required_tags(policy):
+    filters = policy.selector('ec2').server_filters()
+    assert {f['Name'] for f in filters} == {'tag:Environment', 'tag:AutoStop'}
+    environment = next(f for f in filters if f['Name'] == 'tag:Environment')
+    # EC2 filters match exactly, so every casing matches() accepts is listed
+    assert len(environment['Values']) == 8 and 'dEv' in environment['Values']
+    # A tag aggressive runs may lack cannot be required server-side
+    assert [f['Name'] for f in policy.selector('ec2', aggressive=True).server_filters()] == ['tag:Environment']
+    assert policy.selector('rds').server_filters() == []
+
+
+def test_values_with_too_many_casings_are_not_filtered_server_side():
+    policy = TagPolicy({'rules': [
+        {'effect': 'require', 'tag': 'Environment', 'values': ['development']},
+        {'effect': 'require', 'tag': 'AutoStop', 'values': ['true']}
+    ]}, 'dev')
+    assert [f['Name'] for f in policy.selector('ec2').server_filters()] == ['tag:AutoStop']
+
+
+def test_any_casing_of_a_tag_is_selected(fake_aws):
+    instance_id = next(iter(fake_aws.fleet['instances']))
+    fake_aws.fleet['instances'][instance_id]['Tags'] = [
+        {'Key': 'Environment', 'Value': 'DeV'}, {'Key': 'AutoStop', 'Value': 'tRuE'}
+    ]
+    result = stop_dev_ec2_instances(dry_run=True, clients=fake_aws.client)
+    assert instance_id in [instance['id'] for instance in result['instances']]
+
+
+@pytest.mark.parametrize('rule', [
+    {'effect': 'allow', 'tag': 'Environment', 'values': ['dev']},
+    {'effect': 'require', 'values': ['dev']},
+    {'effect': 'require', 'tag': 'Environment', 'values': 'dev'},
+    {'effect': 'require', 'tag': 'Environment', 'values': ['dev'], 'kinds': ['lambda']},
+])
+def test_malformed_rules_are_rejected(rule):
+    with pytest.raises(ValueError):
+        TagPolicy({'rules': [rule]}, 'dev')
+
@@ -0,0 +1,143 @@
+"""
+Budget Alert Deduplication
+Claims each (budget, threshold, period) once so SNS redeliveries are skipped
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from aws_clients import get_client
+
+ALERT_DEDUP_ENABLED = os.environ.get('ALERT_DEDUP_ENABLED', 'true').lower() == 'true'
+# DynamoDB table with partition key 'alert_key' and TTL on 'expires_at';
+# without it claims are kept in memory for the container lifetime
+ALERT_DEDUP_TABLE = os.environ.get('ALERT_DEDUP_TABLE')
+# How long a processed alert suppresses redeliveries of itself
+ALERT_DEDUP_TTL_SECONDS = int(os.environ.get('ALERT_DEDUP_TTL_SECONDS', '86400'))
+
+
+class LocalClaimStore:
+    """In-memory claims with expiry, for local runs and tests"""
+
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: str, ttl_seconds: int) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._expires.get(key, 0) > now:
+                return False
+            self._expires[key] = now + ttl_seconds
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._expires.pop(key, None)
+
+
+class DynamoDBClaimStore:
+    """
+    Claims stored as DynamoDB items
+
+    A claim is a conditional put that only succeeds when no unexpired item
+    exists for the key. DynamoDB's TTL sweep deletes expired items lazily,
+    so the condition also accepts items whose expires_at has passed.
+    """
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+
+    def claim(self, key: str, ttl_seconds: int) -> bool:
+        dynamodb_client = get_client('dynamodb')
+        now = int(time.time())
+        try:
+            dynamodb_client.put_item(
+                TableName=self.table_name,
+                Item={
+                    'alert_key': {'S': key},
+                    'expires_at': {'N': str(now + ttl_seconds)}
+                },
+                ConditionExpression='attribute_not_exists(alert_key) OR expires_at < :now',
+                ExpressionAttributeValues={':now': {'N': str(now)}}
+            )
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def release(self, key: str):
+        get_client('dynamodb').delete_item(
+            TableName=self.table_name,
+            Key={'alert_key': {'S': key}}
+        )
+
+
+def alert_key(message: Dict[str, Any]) -> str:
+    """
+    Build the idempotency key for a budget alert
+
+    The period comes from the message when present and otherwise defaults to
+    the current month, matching the monthly budgets this platform creates.
+    """
+    period = message.get('period') or datetime.now(timezone.utc).strftime('%Y-%m')
+    return f"{message.get('budgetName', 'Unknown')}|{message.get('threshold', 0)}|{period}"
+
+
+class AlertDeduplicator:
+    """
+    Lets each budget alert through once per TTL window
+
+    Args:
+        store: Claim store; defaults to DynamoDB when ALERT_DEDUP_TABLE is
+            set and to an in-memory store otherwise
+        ttl_seconds: How long a claim suppresses duplicates
+        enabled: When False every alert is let through
+    """
+
+    def __init__(self, store=None, ttl_seconds: int = ALERT_DEDUP_TTL_SECONDS,
+                 enabled: bool = ALERT_DEDUP_ENABLED):
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.stats = {'accepted': 0, 'duplicates': 0}
+
+    def reset_stats(self):
+        """Zero the counters, e.g. at the start of an invocation"""
+        self.stats = {'accepted': 0, 'duplicates': 0}
+
+    def claim(self, message: Dict[str, Any]) -> Optional[str]:
+        """
+        Claim an alert for processing
+
+        Returns:
+            The alert key if this is the first delivery, None for a duplicate.
+            Store errors fail open so an outage never swallows an alert.
+        """
+        key = alert_key(message)
+        if not self.enabled:
+            return key
+
+        try:
+            claimed = self.store.claim(key, self.ttl_seconds)
+        except Exception as e:
+            print(f"Error claiming budget alert {key}, processing anyway: {e}")
+            claimed = True
+
+        self.stats['accepted' if claimed else 'duplicates'] += 1
+        return key if claimed else None
+
+    def release(self, key: str):
+        """Drop a claim so a redelivery of a failed alert is processed again"""
+        if not self.enabled:
+            return
+        try:
+            self.store.release(key)
+        except Exception as e:
+            print(f"Error releasing budget alert {key}: {e}")
+
+
+alert_deduplicator = AlertDeduplicator(
+    store=DynamoDBClaimStore(ALERT_DEDUP_TABLE) if ALERT_DEDUP_TABLE else LocalClaimStore()
+)
@@ -4,43 +4,116 @@ Processes AWS Budget alerts and triggers appropriate cost optimization actions
 """
 import json
 import os
-import boto3
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-lambda_client = boto3.client('lambda')
-sns_client = boto3.client('sns')
-ce_client = boto3.client('ce')
+from alert_dedup import alert_deduplicator
+from aws_clients import get_client
+from cost_cache import cost_cache
+from cost_query import query_costs, MAX_GROUP_BY
+from metrics import metrics
+from rate_limiter import rate_limiters
+from report_sink import bounded_json
 
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'dev')
 COST_OPTIMIZER_LAMBDA_ARN = os.environ.get('COST_OPTIMIZER_LAMBDA_ARN')
 OPERATIONS_SNS_TOPIC_ARN = os.environ.get('OPERATIONS_SNS_TOPIC_ARN')
+# Cost breakdowns in the alert, fetched in one Cost Explorer query. SERVICE is
+# always included and reported first, which leaves room for one more dimension
+# or 'TAG:<key>'; further entries are dropped so a lookup stays one query
+COST_BREAKDOWNS = ['SERVICE'] + [
+    b.strip() for b in os.environ.get('COST_BREAKDOWNS', 'LINKED_ACCOUNT').split(',')
+    if b.strip() and b.strip() != 'SERVICE'
+]
+if len(COST_BREAKDOWNS) > MAX_GROUP_BY:
+    print(f"COST_BREAKDOWNS: Cost Explorer groups by at most {MAX_GROUP_BY} keys, "
+          f"ignoring {COST_BREAKDOWNS[MAX_GROUP_BY:]}")
+    COST_BREAKDOWNS = COST_BREAKDOWNS[:MAX_GROUP_BY]
+COST_TOP_N = int(os.environ.get('COST_TOP_N', '10'))
+# Coalesce every record in an invocation into one cost lookup, optimizer run and notification
+BATCH_ALERTS = os.environ.get('BATCH_ALERTS', 'true').lower() == 'true'
+# Monthly budget the spend forecast is checked against; 0 disables the forecast trigger
+MONTHLY_BUDGET_LIMIT = float(os.environ.get('MONTHLY_BUDGET_LIMIT', '0'))
+# Trigger the optimizer once the projected month-end spend reaches this share of the budget
+FORECAST_TRIGGER_RATIO = float(os.environ.get('FORECAST_TRIGGER_RATIO', '1.0'))
+
+# Outbound calls made by the current invocation, reported in the response
+api_calls = Counter()
 
 
 def lambda_handler(event, context):
     """Main Lambda handler for budget alerts"""
-    print(f"Budget alert received: {json.dumps(event)}")
+    print(f"Budget alert received: {bounded_json(event)}")
     
     try:
-        # Parse SNS message
+        if event.get('invalidate_cost_cache'):
+            cost_cache.invalidate()
+            print("Cost Explorer cache invalidated")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'message': 'Cost Explorer cache invalidated'})
+            }
+        
+        api_calls.clear()
+        cost_cache.reset_stats()
+        alert_deduplicator.reset_stats()
+        rate_limiters.reset_stats()
+        metrics.reset()
+        
+        if event.get('action') == 'forecast':
+            forecast = run_spend_forecast()
+            metrics.emit({'Action': 'spend_forecast'}, rate_limiters.stats())
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'message': 'Spend forecast completed',
+                    'forecast': forecast,
+                    'api_calls': api_calls,
+                    'rate_limits': rate_limiters.totals()
+                })
+            }
+        
+        # Parse SNS messages
         if 'Records' in event:
-            for record in event['Records']:
-                if record.get('EventSource') == 'aws:sns':
-                    message = json.loads(record['Sns']['Message'])
-                    process_budget_alert(message)
+            messages = [
+                json.loads(record['Sns']['Message'])
+                for record in event['Records']
+                if record.get('EventSource') == 'aws:sns'
+            ]
         else:
             # Direct invocation for testing
-            process_budget_alert(event)
+            messages = [event]
+        
+        metrics.count('alerts_received', len(messages))
+        process_budget_alerts(messages)
+        
+        cost_cache.wait_for_refresh()
+        print(f"Cost Explorer cache stats: {json.dumps(cost_cache.stats)}")
+        print(f"API calls for {len(messages)} alert(s): {json.dumps(api_calls)}")
+        print(f"Alert deduplication stats: {json.dumps(alert_deduplicator.stats)}")
+        print(f"API rate limits: {json.dumps(rate_limiters.stats())}")
+        metrics.emit({'Action': 'budget_alert'}, rate_limiters.stats())
         
         return {
             'statusCode': 200,
-            'body': json.dumps({'message': 'Budget alert processed successfully'})
+            'body': json.dumps({
+                'message': 'Budget alert processed successfully',
+                'alerts': len(messages),
+                'deduplication': alert_deduplicator.stats,
+                'api_calls': api_calls,
+                'rate_limits': rate_limiters.totals()
+            })
         }
     
     except Exception as e:
         error_msg = f"Error processing budget alert: {str(e)}"
         print(error_msg)
         send_error_notification(error_msg)
+        metrics.emit({'Action': 'budget_alert'}, rate_limiters.stats())
+        if 'Records' in event:
+            # Fail the invocation so Lambda retries the SNS delivery; unprocessed alerts were released
+            raise
         
         return {
             'statusCode': 500,
@@ -48,90 +121,156 @@ def lambda_handler(event, context):
         }
 
 
+def process_budget_alerts(messages: List[Dict[str, Any]]):
+    """
+    Process every budget alert delivered in one invocation
+
+    Redelivered alerts are dropped first, before any Cost Explorer query or
+    optimizer invocation. In batch mode the remaining alerts share one cost
+    lookup, at most one optimizer invocation (at the strongest severity
+    seen) and one combined notification. Otherwise each alert is handled on
+    its own. If an alert fails, or its optimizer trigger does, the claims
+    of the alerts not yet processed are released so a redelivery retries
+    them; alerts already notified keep theirs.
+    """
+    claimed = []
+    for message in messages:
+        key = alert_deduplicator.claim(message)
+        if key is None:
+            print(f"Skipping duplicate budget alert: {message.get('budgetName', 'Unknown')} "
+                  f"at {message.get('threshold', 0)}%")
+            continue
+        claimed.append((key, message))
+    
+    metrics.count('alerts_processed', len(claimed))
+    if not claimed:
+        return
+    
+    unprocessed = [key for key, _ in claimed]
+    try:
+        if not BATCH_ALERTS or len(claimed) == 1:
+            for key, message in claimed:
+                process_budget_alert(message)
+                unprocessed.remove(key)
+        else:
+            process_budget_alert_batch([message for _, message in claimed])
+            unprocessed = []
+    except Exception:
+        # Let a redelivery retry the alerts this invocation failed on
+        for key in unprocessed:
+            alert_deduplicator.release(key)
+        raise
+
+
+def process_budget_alert_batch(messages: List[Dict[str, Any]]):
+    """Process several budget alerts with one cost lookup, action and notification"""
+    alerts = [parse_budget_alert(message) for message in messages]
+    print(f"Processing {len(alerts)} budget alerts as a batch")
+    for alert in alerts:
+        print(f"Budget: {alert['budget_name']} at {alert['threshold']}%")
+    
+    cost_details = get_current_costs()
+    
+    # The strongest alert decides the action for the whole batch
+    threshold = max(alert['threshold'] for alert in alerts)
+    action_taken = take_budget_action(threshold)
+    
+    send_batch_notification(alerts, cost_details, action_taken)
+
+
 def process_budget_alert(message: Dict[str, Any]):
     """Process budget alert and take appropriate action"""
     print(f"Processing budget alert: {json.dumps(message)}")
     
     # Extract budget information
-    budget_name = message.get('budgetName', 'Unknown')
-    threshold = message.get('threshold', 0)
-    actual_spend = message.get('actualSpend', 0)
-    forecasted_spend = message.get('forecastedSpend', 0)
+    alert = parse_budget_alert(message)
     
-    print(f"Budget: {budget_name}")
-    print(f"Threshold: {threshold}%")
-    print(f"Actual Spend: ${actual_spend}")
-    print(f"Forecasted Spend: ${forecasted_spend}")
+    print(f"Budget: {alert['budget_name']}")
+    print(f"Threshold: {alert['threshold']}%")
+    print(f"Actual Spend: ${alert['actual_spend']}")
+    print(f"Forecasted Spend: ${alert['forecasted_spend']}")
     
     # Get current cost details
     cost_details = get_current_costs()
     
     # Determine action based on threshold
-    action_taken = None
+    action_taken = take_budget_action(alert['threshold'])
     
+    # Send detailed notification
+    send_budget_notification(
+        budget_name=alert['budget_name'],
+        threshold=alert['threshold'],
+        actual_spend=alert['actual_spend'],
+        forecasted_spend=alert['forecasted_spend'],
+        cost_details=cost_details,
+        action_taken=action_taken
+    )
+
+
+def parse_budget_alert(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the budget fields used by the handler from an alert message"""
+    return {
+        'budget_name': message.get('budgetName', 'Unknown'),
+        'threshold': message.get('threshold', 0),
+        'actual_spend': message.get('actualSpend', 0),
+        'forecasted_spend': message.get('forecastedSpend', 0)
+    }
+
+
+def take_budget_action(threshold: float) -> str:
+    """Trigger the optimizer as the threshold warrants and return the action taken"""
     if threshold >= 100:
         # Critical: Budget exceeded
         print("CRITICAL: Budget exceeded! Triggering aggressive cost optimization...")
-        action_taken = trigger_cost_optimization(aggressive=True)
+        return trigger_cost_optimization(aggressive=True)
     elif threshold >= 80:
         # Warning: Approaching budget limit
         print("WARNING: Approaching budget limit. Triggering standard cost optimization...")
-        action_taken = trigger_cost_optimization(aggressive=False)
+        return trigger_cost_optimization(aggressive=False)
     else:
         # Info: Early warning
         print("INFO: Budget threshold reached. Monitoring only.")
-        action_taken = "monitoring_only"
-    
-    # Send detailed notification
-    send_budget_notification(
-        budget_name=budget_name,
-        threshold=threshold,
-        actual_spend=actual_spend,
-        forecasted_spend=forecasted_spend,
-        cost_details=cost_details,
-        action_taken=action_taken
-    )
+        return "monitoring_only"
+
+
+def alert_severity(threshold: float) -> str:
+    """Map a budget threshold percentage to a notification severity"""
+    if threshold >= 100:
+        return "CRITICAL"
+    elif threshold >= 80:
+        return "WARNING"
+    return "INFO"
 
 
 def get_current_costs() -> Dict[str, Any]:
-    """Get current month's cost breakdown by service"""
+    """
+    Get current month's cost breakdowns by service and COST_BREAKDOWNS
+
+    Every breakdown comes from one grouped query. Results are served from
+    the Cost Explorer cache, keyed on (period, granularity, group-by), so
+    an alert burst pays for the query once.
+    """
     try:
+        api_calls['cost_lookups'] += 1
+        
         # Get current month's costs
         now = datetime.now(timezone.utc)
         start_date = now.replace(day=1).strftime('%Y-%m-%d')
         end_date = now.strftime('%Y-%m-%d')
+        granularity = 'MONTHLY'
         
-        response = ce_client.get_cost_and_usage(
-            TimePeriod={
-                'Start': start_date,
-                'End': end_date
-            },
-            Granularity='MONTHLY',
-            Metrics=['UnblendedCost'],
-            GroupBy=[
-                {
-                    'Type': 'DIMENSION',
-                    'Key': 'SERVICE'
-                }
-            ]
-        )
-        
-        costs_by_service = {}
-        total_cost = 0
-        
-        for result in response['ResultsByTime']:
-            for group in result['Groups']:
-                service = group['Keys'][0]
-                cost = float(group['Metrics']['UnblendedCost']['Amount'])
-                costs_by_service[service] = cost
-                total_cost += cost
-        
-        # Sort by cost descending
-        sorted_costs = dict(sorted(costs_by_service.items(), key=lambda x: x[1], reverse=True))
+        cache_key = f"{start_date}:{end_date}|{granularity}|{'+'.join(COST_BREAKDOWNS)}"
+        with metrics.span('cost_lookup'):
+            result = cost_cache.get(
+                cache_key,
+                lambda: query_costs(start_date, end_date, granularity, COST_BREAKDOWNS, COST_TOP_N)
+            )
+        breakdowns = dict(result['groups'])
         
         return {
-            'total': round(total_cost, 2),
-            'by_service': {k: round(v, 2) for k, v in list(sorted_costs.items())[:10]},
+            'total': result['total'],
+            'by_service': breakdowns.pop('SERVICE'),
+            'breakdowns': breakdowns,
             'period': f"{start_date} to {end_date}"
         }
     
@@ -140,8 +279,56 @@ def get_current_costs() -> Dict[str, Any]:
         return {'error': str(e)}
 
 
+def run_spend_forecast() -> Dict[str, Any]:
+    """
+    Project this month's spend from the cached daily history and act on it
+
+    The optimizer is triggered when the projected month-end total reaches
+    FORECAST_TRIGGER_RATIO of MONTHLY_BUDGET_LIMIT, before AWS Budgets
+    would alert on actual spend. The trigger is claimed through the alert
+    deduplicator, so repeated forecasts on one day trigger it once.
+    Operations is notified of a projected breach or of anomalous spend.
+    """
+    # Imported here so budget alert invocations don't pay for loading numpy
+    from spend_forecast import forecast_spend
+    
+    with metrics.span('forecast'):
+        forecast = forecast_spend(MONTHLY_BUDGET_LIMIT)
+    if 'skipped' in forecast:
+        return forecast
+    
+    trigger = bool(MONTHLY_BUDGET_LIMIT) and (
+        forecast['projected_month_total'] >= MONTHLY_BUDGET_LIMIT * FORECAST_TRIGGER_RATIO
+    )
+    action_taken = "monitoring_only"
+    if trigger:
+        claim = {'budgetName': 'spend-forecast', 'threshold': 100, 'period': forecast['as_of']}
+        claim_key = alert_deduplicator.claim(claim)
+        if claim_key is None:
+            action_taken = "already_triggered"
+        else:
+            print(f"Projected spend ${forecast['projected_month_total']:.2f} reaches the budget, "
+                  f"triggering cost optimization")
+            try:
+                action_taken = trigger_cost_optimization(aggressive=False)
+            except Exception:
+                # The next forecast run tries again
+                alert_deduplicator.release(claim_key)
+                raise
+    forecast['action_taken'] = action_taken
+    
+    if trigger or forecast['anomalies']:
+        send_forecast_notification(forecast)
+    return forecast
+
+
 def trigger_cost_optimization(aggressive: bool = False) -> str:
-    """Trigger cost optimizer Lambda function"""
+    """
+    Trigger cost optimizer Lambda function
+
+    Invoke errors propagate, so the caller can release the alert's claim
+    and have the trigger retried.
+    """
     if not COST_OPTIMIZER_LAMBDA_ARN:
         print("Cost optimizer Lambda ARN not configured")
         return "not_configured"
@@ -151,26 +338,27 @@ def trigger_cost_optimization(aggressive: bool = False) -> str:
         print("Skipping cost optimization for production environment")
         return "skipped_production"
     
-    try:
-        payload = {
-            'action': 'stop_dev_instances',
-            'dry_run': False,
-            'triggered_by': 'budget_alert',
-            'aggressive': aggressive
-        }
-        
-        response = lambda_client.invoke(
-            FunctionName=COST_OPTIMIZER_LAMBDA_ARN,
-            InvocationType='Event',  # Async invocation
-            Payload=json.dumps(payload)
-        )
-        
-        print(f"Cost optimizer invoked: {response['StatusCode']}")
-        return "cost_optimizer_triggered"
+    payload = {
+        'action': 'stop_dev_instances',
+        'dry_run': False,
+        'triggered_by': 'budget_alert',
+        'aggressive': aggressive
+    }
     
+    api_calls['lambda:Invoke'] += 1
+    try:
+        with metrics.span('optimizer_trigger'):
+            response = get_client('lambda').invoke(
+                FunctionName=COST_OPTIMIZER_LAMBDA_ARN,
+                InvocationType='Event',  # Async invocation
+                Payload=json.dumps(payload)
+            )
     except Exception as e:
         print(f"Error invoking cost optimizer: {e}")
-        return f"error: {str(e)}"
+        raise
+    
+    print(f"Cost optimizer invoked: {response['StatusCode']}")
+    return "cost_optimizer_triggered"
 
 
 def send_budget_notification(
@@ -186,14 +374,7 @@ def send_budget_notification(
         print("Operations SNS topic ARN not configured")
         return
     
-    # Determine severity
-    if threshold >= 100:
-        severity = "CRITICAL"
-    elif threshold >= 80:
-        severity = "WARNING"
-    else:
-        severity = "INFO"
-    
+    severity = alert_severity(threshold)
     subject = f"{severity}: Budget Alert - {budget_name} ({threshold}%)"
     
     message = f"""
@@ -212,6 +393,108 @@ Forecasted Spend: ${forecasted_spend:.2f}
 
 """
     
+    message += format_cost_details(cost_details)
+    message += format_action_and_recommendations(threshold, action_taken)
+    
+    publish_notification(subject, message)
+
+
+def send_batch_notification(
+    alerts: List[Dict[str, Any]],
+    cost_details: Dict[str, Any],
+    action_taken: str
+):
+    """Send one notification covering every alert in a batch"""
+    if not OPERATIONS_SNS_TOPIC_ARN:
+        print("Operations SNS topic ARN not configured")
+        return
+    
+    alerts = sorted(alerts, key=lambda alert: alert['threshold'], reverse=True)
+    threshold = alerts[0]['threshold']
+    severity = alert_severity(threshold)
+    subject = f"{severity}: Budget Alerts - {len(alerts)} budgets (up to {threshold}%)"
+    # SNS subjects are limited to 100 characters
+    subject = subject[:100]
+    
+    message = f"""
+AWS Budget Alerts
+=================
+Severity: {severity}
+Environment: {ENVIRONMENT}
+Alerts: {len(alerts)}
+Timestamp: {datetime.now(timezone.utc).isoformat()}
+
+Budgets:
+--------
+"""
+    for alert in alerts:
+        message += (
+            f"  - [{alert_severity(alert['threshold'])}] {alert['budget_name']}: "
+            f"{alert['threshold']}% (actual ${alert['actual_spend']:.2f}, "
+            f"forecasted ${alert['forecasted_spend']:.2f})\n"
+        )
+    message += "\n"
+    
+    message += format_cost_details(cost_details)
+    message += format_action_and_recommendations(threshold, action_taken)
+    
+    publish_notification(subject, message)
+
+
+def send_forecast_notification(forecast: Dict[str, Any]):
+    """Send the projected month-end spend, anomalies and fastest-growing costs"""
+    if not OPERATIONS_SNS_TOPIC_ARN:
+        print("Operations SNS topic ARN not configured")
+        return
+    
+    severity = "WARNING" if forecast['action_taken'] != "monitoring_only" else "INFO"
+    subject = f"{severity}: Spend Forecast - {ENVIRONMENT}"
+    if 'projected_utilization' in forecast:
+        subject += f" (projected {forecast['projected_utilization']}% of budget)"
+    elif forecast['anomalies']:
+        subject += f" ({len(forecast['anomalies'])} cost anomalies)"
+    
+    message = f"""
+AWS Spend Forecast
+==================
+Severity: {severity}
+Environment: {ENVIRONMENT}
+Costs Through: {forecast['as_of']}
+Timestamp: {datetime.now(timezone.utc).isoformat()}
+
+Spending Summary:
+-----------------
+Month to Date: ${forecast['month_to_date']:.2f}
+Projected Month Total: ${forecast['projected_month_total']:.2f}
+Monthly Budget: ${MONTHLY_BUDGET_LIMIT:.2f}
+"""
+    
+    if forecast['anomalies']:
+        message += "\nCost Anomalies (latest day):\n"
+        for anomaly in forecast['anomalies']:
+            message += (
+                f"  - {' / '.join(anomaly['keys'].values())}: ${anomaly['cost']:.2f} "
+                f"(typically ${anomaly['baseline']:.2f}, score {anomaly['score']})\n"
+            )
+    
+    if forecast['trending']:
+        message += "\nFastest Growing Costs:\n"
+        for entry in forecast['trending']:
+            message += f"  - {' / '.join(entry['keys'].values())}: +${entry['daily_increase']:.2f}/day\n"
+    
+    message += f"""
+
+Action Taken:
+-------------
+{forecast['action_taken'].replace('_', ' ').title()}
+"""
+    
+    publish_notification(subject[:100], message)
+
+
+def format_cost_details(cost_details: Dict[str, Any]) -> str:
+    """Render the current month's cost breakdowns for a notification"""
+    message = ""
     if 'total' in cost_details:
         message += f"""
 Current Month Costs:
@@ -223,8 +506,25 @@ Top Services by Cost:
 """
         for service, cost in cost_details.get('by_service', {}).items():
             message += f"  - {service}: ${cost:.2f}\n"
+        
+        for dimension, costs in cost_details.get('breakdowns', {}).items():
+            if not costs:
+                continue
+            message += f"\nTop by {dimension.replace('TAG:', 'tag ').replace('_', ' ').title()}:\n"
+            for key, cost in costs.items():
+                message += f"  - {key}: ${cost:.2f}\n"
     
-    message += f"""
+    stats = cost_cache.stats
+    message += (
+        f"\nCost Explorer cache: {stats['hits']} hits, {stats['stale_hits']} stale hits, "
+        f"{stats['misses']} misses\n"
+    )
+    return message
+
+
+def format_action_and_recommendations(threshold: float, action_taken: str) -> str:
+    """Render the action taken and the recommendations for a threshold"""
+    message = f"""
 
 Action Taken:
 -------------
@@ -254,13 +554,19 @@ Recommendations:
 2. Review cost optimization opportunities
 3. Ensure proper tagging for cost allocation
 """
-    
+    return message
+
+
+def publish_notification(subject: str, message: str):
+    """Publish a budget notification to the operations topic"""
     try:
-        sns_client.publish(
-            TopicArn=OPERATIONS_SNS_TOPIC_ARN,
-            Subject=subject,
-            Message=message
-        )
+        api_calls['sns:Publish'] += 1
+        with metrics.span('notification'):
+            get_client('sns').publish(
+                TopicArn=OPERATIONS_SNS_TOPIC_ARN,
+                Subject=subject,
+                Message=message
+            )
         print("Budget notification sent successfully")
     except Exception as e:
         print(f"Error sending notification: {e}")
@@ -272,7 +578,7 @@ def send_error_notification(error_message: str):
         return
     
     try:
-        sns_client.publish(
+        get_client('sns').publish(
             TopicArn=OPERATIONS_SNS_TOPIC_ARN,
             Subject=f"ERROR: Budget Alert Handler - {ENVIRONMENT}",
             Message=f"""
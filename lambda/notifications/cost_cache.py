@@ -0,0 +1,183 @@
+"""
+Cost Explorer Cache
+TTL cache for Cost Explorer query results with an optional persistent layer
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from state_store import get_state_store
+
+# Results younger than this are served without touching Cost Explorer
+COST_CACHE_TTL_SECONDS = int(os.environ.get('COST_CACHE_TTL_SECONDS', '900'))
+# Past the TTL, results are still served for this long while a refresh runs
+COST_CACHE_STALE_SECONDS = int(os.environ.get('COST_CACHE_STALE_SECONDS', '3600'))
+# Share results across containers through the state store
+COST_CACHE_PERSIST = os.environ.get('COST_CACHE_PERSIST', 'true').lower() == 'true'
+
+STATE_NAMESPACE = 'budget-handler'
+STORE_PREFIX = 'cost-cache/'
+
+
+class CostCache:
+    """
+    Two-level TTL cache with stale-while-revalidate
+
+    Entries are kept in memory for warm containers and, when a store is
+    given, written through to it so other containers can reuse them. A
+    stale entry is returned immediately while a background thread fetches
+    a fresh one; call wait_for_refresh() before the handler returns so the
+    refresh is not frozen with the container.
+    """
+
+    def __init__(self, ttl_seconds: int = COST_CACHE_TTL_SECONDS,
+                 stale_seconds: int = COST_CACHE_STALE_SECONDS, store=None):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.store = store
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._refreshing: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        # Bumped by invalidate(); values loaded under an older generation are dropped
+        self._generation = 0
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
+
+    def reset_stats(self):
+        """Zero the counters, keeping the cached entries, e.g. at the start of an invocation"""
+        with self._lock:
+            self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
+
+    @staticmethod
+    def _store_key(key: str) -> str:
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in key)
+        return f"{STORE_PREFIX}{safe}.json"
+
+    def _load(self, key: str, generation: int) -> Optional[Dict[str, Any]]:
+        """Read an entry missing from memory from the store, outside the lock"""
+        if self.store is None:
+            return None
+        try:
+            entry = self.store.get(self._store_key(key))
+        except Exception as e:
+            print(f"Error reading cost cache: {e}")
+            return None
+        if entry is not None:
+            with self._lock:
+                if generation == self._generation:
+                    entry = self._entries.setdefault(key, entry)
+        return entry
+
+    def _put(self, key: str, value: Any, generation: int):
+        """
+        Cache a loaded value unless an invalidation happened since it was requested
+
+        The store is written outside the lock; if an invalidation lands
+        while the write is in flight the entry is deleted again, so a stale
+        value never outlives it.
+        """
+        entry = {'fetched_at': time.time(), 'value': value}
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = entry
+        if self.store is None:
+            return
+        try:
+            self.store.put(self._store_key(key), entry)
+            with self._lock:
+                invalidated = generation != self._generation
+            if invalidated:
+                self.store.delete(self._store_key(key))
+        except Exception as e:
+            print(f"Error writing cost cache: {e}")
+
+    def _refresh(self, key: str, loader: Callable[[], Any], generation: int):
+        try:
+            self._put(key, loader(), generation)
+        except Exception as e:
+            print(f"Error refreshing cost cache entry {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, calling loader on a miss
+
+        The lock only guards the in-memory entries; store reads and writes,
+        and the loader, run outside it.
+
+        Args:
+            key: Cache key, e.g. period|granularity|group-by
+            loader: Callable that queries Cost Explorer; exceptions propagate
+                on a miss and are never cached
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation
+        if entry is None:
+            entry = self._load(key, generation)
+
+        with self._lock:
+            age = time.time() - entry['fetched_at'] if entry else None
+
+            if entry is not None and age < self.ttl_seconds:
+                self.stats['hits'] += 1
+                return entry['value']
+
+            if entry is not None and age < self.ttl_seconds + self.stale_seconds:
+                self.stats['stale_hits'] += 1
+                if key not in self._refreshing:
+                    self.stats['refreshes'] += 1
+                    thread = threading.Thread(target=self._refresh, args=(key, loader, generation), daemon=True)
+                    self._refreshing[key] = thread
+                    thread.start()
+                return entry['value']
+
+            self.stats['misses'] += 1
+
+        value = loader()
+        self._put(key, value, generation)
+        return value
+
+    def invalidate(self, key: Optional[str] = None):
+        """
+        Drop one entry, or every entry when key is None
+
+        A full invalidation deletes everything persisted under the cache's
+        store prefix, including entries other containers wrote. Loads and
+        refreshes already in flight are discarded when they finish.
+        """
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        if self.store is not None:
+            try:
+                store_keys = self.store.keys(STORE_PREFIX) if key is None else [self._store_key(key)]
+            except Exception as e:
+                print(f"Error listing cost cache entries: {e}")
+                store_keys = []
+            for store_key in store_keys:
+                try:
+                    self.store.delete(store_key)
+                except Exception as e:
+                    print(f"Error invalidating cost cache entry {store_key}: {e}")
+
+    def wait_for_refresh(self, timeout: float = 5.0):
+        """Block until in-flight background refreshes finish or timeout passes"""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+cost_cache = CostCache(store=get_state_store(STATE_NAMESPACE) if COST_CACHE_PERSIST else None)
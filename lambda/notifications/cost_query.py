@@ -0,0 +1,112 @@
+"""
+Cost Query Engine
+Streams Cost Explorer results across pages and accumulates per-dimension totals
+"""
+import heapq
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Tuple
+
+from aws_clients import get_client
+
+# Cost Explorer accepts at most two GroupBy keys per query
+MAX_GROUP_BY = 2
+UNTAGGED = '(untagged)'
+
+
+def group_by_spec(group_by: str) -> Dict[str, str]:
+    """Translate 'SERVICE' or 'TAG:Environment' into a Cost Explorer GroupBy entry"""
+    if group_by.startswith('TAG:'):
+        return {'Type': 'TAG', 'Key': group_by[len('TAG:'):]}
+    return {'Type': 'DIMENSION', 'Key': group_by}
+
+
+def _group_label(group_by: str, key: str) -> str:
+    # Tag group keys come back as 'Environment$dev'
+    if group_by.startswith('TAG:'):
+        return key.split('$', 1)[-1] or UNTAGGED
+    return key
+
+
+def _iter_results(start_date: str, end_date: str, granularity: str,
+                  group_by: List[str]) -> Iterator[Dict[str, Any]]:
+    """Yield every ResultsByTime entry, following NextPageToken until Cost Explorer reports no more pages"""
+    request = {
+        'TimePeriod': {'Start': start_date, 'End': end_date},
+        'Granularity': granularity,
+        'Metrics': ['UnblendedCost'],
+        'GroupBy': [group_by_spec(g) for g in group_by]
+    }
+    ce_client = get_client('ce')
+
+    while True:
+        response = ce_client.get_cost_and_usage(**request)
+        yield from response['ResultsByTime']
+
+        next_token = response.get('NextPageToken')
+        if not next_token:
+            break
+        request['NextPageToken'] = next_token
+
+
+def iter_cost_groups(start_date: str, end_date: str, granularity: str,
+                     group_by: List[str]) -> Iterator[Tuple[List[str], float]]:
+    """
+    Yield (keys, amount) for every cost group across all result pages
+
+    Follows NextPageToken until Cost Explorer reports no more pages.
+    """
+    for result in _iter_results(start_date, end_date, granularity, group_by):
+        for group in result['Groups']:
+            yield group['Keys'], float(group['Metrics']['UnblendedCost']['Amount'])
+
+
+def iter_daily_cost_groups(start_date: str, end_date: str,
+                           group_by: List[str]) -> Iterator[Tuple[str, List[str], float]]:
+    """Yield (day, keys, amount) for every daily cost group, day as YYYY-MM-DD"""
+    for result in _iter_results(start_date, end_date, 'DAILY', group_by):
+        day = result['TimePeriod']['Start']
+        for group in result['Groups']:
+            yield day, group['Keys'], float(group['Metrics']['UnblendedCost']['Amount'])
+
+
+def top_n(costs: Dict[str, float], n: int) -> Dict[str, float]:
+    """Return the n most expensive entries, largest first, rounded to cents"""
+    return {key: round(cost, 2) for key, cost in heapq.nlargest(n, costs.items(), key=itemgetter(1))}
+
+
+def query_costs(start_date: str, end_date: str, granularity: str,
+                group_by: List[str], limit: int = 10) -> Dict[str, Any]:
+    """
+    Query costs grouped by up to two dimensions in one streaming pass
+
+    Each group's amount is added to the running total and to the marginal
+    total of every requested dimension, so a SERVICE x LINKED_ACCOUNT query
+    yields both breakdowns without a second request.
+
+    Args:
+        start_date: Inclusive start date (YYYY-MM-DD)
+        end_date: Exclusive end date (YYYY-MM-DD)
+        granularity: DAILY or MONTHLY
+        group_by: Dimension names or 'TAG:<key>' entries (at most two)
+        limit: Number of top entries kept per dimension
+
+    Returns:
+        Dictionary with 'total' and the top entries per dimension under 'groups'
+    """
+    if not 1 <= len(group_by) <= MAX_GROUP_BY:
+        raise ValueError(f"Cost Explorer supports 1-{MAX_GROUP_BY} group-by keys, got {group_by}")
+
+    totals: List[Dict[str, float]] = [{} for _ in group_by]
+    total_cost = 0.0
+
+    for keys, amount in iter_cost_groups(start_date, end_date, granularity, group_by):
+        total_cost += amount
+        for index, key in enumerate(keys):
+            label = _group_label(group_by[index], key)
+            totals[index][label] = totals[index].get(label, 0.0) + amount
+
+    return {
+        'total': round(total_cost, 2),
+        'groups': {g: top_n(totals[index], limit) for index, g in enumerate(group_by)},
+        'period': f"{start_date} to {end_date}"
+    }
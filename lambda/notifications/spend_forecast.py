@@ -0,0 +1,278 @@
+"""
+Spend Forecast Module
+Daily cost history kept as a column matrix in the state store, with vectorized trend and anomaly scoring
+"""
+import calendar
+import io
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    # Forecasting is skipped when the package is built without numpy
+    np = None
+
+from cost_query import iter_daily_cost_groups
+from state_store import get_state_store
+
+STATE_NAMESPACE = 'budget-handler'
+# The history matrix, kept in the state store since the daily run almost always starts cold
+HISTORY_KEY = 'cost-history/history.npz'
+
+FORECAST_ENABLED = os.environ.get('FORECAST_ENABLED', 'true').lower() == 'true'
+FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', '90'))
+# Trailing days Cost Explorer may still revise, fetched again on every refresh
+FORECAST_REFRESH_DAYS = int(os.environ.get('FORECAST_REFRESH_DAYS', '2'))
+# One cost series per combination of these Cost Explorer dimensions (at most two)
+FORECAST_GROUP_BY = [
+    g.strip() for g in os.environ.get('FORECAST_GROUP_BY', 'SERVICE,LINKED_ACCOUNT').split(',') if g.strip()
+]
+# Days the linear trend of each series is fitted over
+FORECAST_TREND_DAYS = int(os.environ.get('FORECAST_TREND_DAYS', '28'))
+# Days the latest day is compared against for anomaly scoring
+ANOMALY_BASELINE_DAYS = int(os.environ.get('ANOMALY_BASELINE_DAYS', '28'))
+ANOMALY_Z_THRESHOLD = float(os.environ.get('ANOMALY_Z_THRESHOLD', '3.5'))
+# Spikes smaller than this many dollars a day are not reported
+ANOMALY_MIN_DOLLARS = float(os.environ.get('ANOMALY_MIN_DOLLARS', '10'))
+FORECAST_TOP_N = int(os.environ.get('FORECAST_TOP_N', '10'))
+
+# Scale of a normal distribution's MAD, so MAD-based scores read like z-scores
+MAD_SCALE = 1.4826
+MIN_BASELINE_DAYS = 7
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class CostHistory:
+    """
+    Daily costs as a (series x day) matrix
+
+    Each row is one combination of group_by keys, e.g. (service, account);
+    column 0 is the start date and columns are consecutive days.
+    """
+
+    def __init__(self, group_by: List[str], start: date, keys: Optional[List[Tuple[str, ...]]] = None,
+                 costs: Optional['np.ndarray'] = None):
+        self.group_by = list(group_by)
+        self.start = start
+        self.keys: List[Tuple[str, ...]] = keys or []
+        self.index = {key: row for row, key in enumerate(self.keys)}
+        self.costs = costs if costs is not None else np.zeros((len(self.keys), 0))
+
+    @property
+    def days(self) -> int:
+        return self.costs.shape[1]
+
+    @property
+    def end(self) -> date:
+        """Day after the last column"""
+        return self.start + timedelta(days=self.days)
+
+    @classmethod
+    def load(cls, group_by: List[str], store=None) -> Optional['CostHistory']:
+        """Load the stored history, or None if there is none for these group_by keys"""
+        store = store or get_state_store(STATE_NAMESPACE)
+        try:
+            blob = store.get_bytes(HISTORY_KEY)
+            if blob is None:
+                return None
+            with np.load(io.BytesIO(blob), allow_pickle=False) as data:
+                if list(data['group_by']) != list(group_by):
+                    return None
+                keys = [tuple(key) for key in data['keys'].tolist()]
+                return cls(group_by, date.fromisoformat(str(data['start'])), keys, data['costs'].astype(np.float64))
+        except Exception as e:
+            print(f"Error reading stored cost history, rebuilding: {e}")
+            return None
+
+    def save(self, store=None):
+        keys = np.array(self.keys, dtype=str).reshape(len(self.keys), len(self.group_by))
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, group_by=np.array(self.group_by), start=np.array(self.start.isoformat()),
+                            keys=keys, costs=self.costs)
+        (store or get_state_store(STATE_NAMESPACE)).put_bytes(
+            HISTORY_KEY, buffer.getvalue(), content_type='application/octet-stream'
+        )
+
+    def update(self, start: date, end: date, rows: Iterable[Tuple[str, List[str], float]]):
+        """
+        Replace the days [start, end) with freshly fetched rows
+
+        Args:
+            start: First fetched day, no earlier than self.start
+            end: Day after the last fetched day
+            rows: (day, keys, amount) tuples as yielded by iter_daily_cost_groups
+        """
+        if end > self.end:
+            self.costs = np.pad(self.costs, ((0, 0), (0, (end - self.end).days)))
+        first, last = (start - self.start).days, (end - self.start).days
+        self.costs[:, first:last] = 0.0
+
+        row_index, col_index, amounts = [], [], []
+        for day, keys, amount in rows:
+            key = tuple(keys)
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.keys)
+                self.keys.append(key)
+            row_index.append(row)
+            col_index.append((date.fromisoformat(day) - self.start).days)
+            amounts.append(amount)
+
+        if len(self.keys) > self.costs.shape[0]:
+            self.costs = np.pad(self.costs, ((0, len(self.keys) - self.costs.shape[0]), (0, 0)))
+        if amounts:
+            np.add.at(self.costs, (np.array(row_index), np.array(col_index)), np.array(amounts))
+
+    def trim(self, first_day: date):
+        """Drop days before first_day and series with no cost left"""
+        drop = (first_day - self.start).days
+        if drop > 0:
+            self.costs = self.costs[:, drop:]
+            self.start = first_day
+        live = np.flatnonzero(self.costs.any(axis=1))
+        if len(live) < len(self.keys):
+            self.keys = [self.keys[row] for row in live]
+            self.index = {key: row for row, key in enumerate(self.keys)}
+            self.costs = self.costs[live]
+
+
+def refresh_history(today: date, group_by: List[str] = FORECAST_GROUP_BY,
+                    store=None) -> Tuple[CostHistory, int]:
+    """
+    Bring the stored history up to yesterday, fetching only missing days
+
+    The last FORECAST_REFRESH_DAYS stored days are fetched again since
+    Cost Explorer keeps revising recent costs.
+
+    Returns:
+        (history, number of days fetched)
+    """
+    first_day = today - timedelta(days=FORECAST_HISTORY_DAYS)
+    history = CostHistory.load(group_by, store)
+    if history is None or history.end <= first_day:
+        history = CostHistory(group_by, first_day)
+        fetch_start = first_day
+    else:
+        fetch_start = max(history.start, first_day, history.end - timedelta(days=FORECAST_REFRESH_DAYS))
+
+    fetched = (today - fetch_start).days
+    if fetched > 0:
+        rows = iter_daily_cost_groups(fetch_start.isoformat(), today.isoformat(), group_by)
+        history.update(fetch_start, today, rows)
+    history.trim(first_day)
+    history.save(store)
+    return history, max(fetched, 0)
+
+
+def _labels(history: CostHistory, row: int) -> Dict[str, str]:
+    return dict(zip(history.group_by, history.keys[row]))
+
+
+def score_history(history: CostHistory, today: date, budget_limit: float = 0.0) -> Dict[str, Any]:
+    """
+    Project month-end spend and flag anomalous days for every series at once
+
+    Each series gets a least-squares linear trend over its last
+    FORECAST_TREND_DAYS days, extended over the rest of the month and
+    added to the month-to-date actuals. The latest day of each series is
+    scored against the median and MAD of the ANOMALY_BASELINE_DAYS before
+    it, which a single earlier spike does not skew.
+
+    Returns:
+        Month-to-date and projected totals, whether the budget is expected
+        to be breached, the top anomalies and the fastest-growing series
+    """
+    costs = history.costs
+    series, days = costs.shape
+    month_start = today.replace(day=1)
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining_days = days_in_month - (today - month_start).days
+
+    month_to_date = costs[:, max(0, (month_start - history.start).days):].sum(axis=1)
+
+    window = costs[:, -FORECAST_TREND_DAYS:]
+    n = window.shape[1]
+    if n >= 2:
+        x = np.arange(n) - (n - 1) / 2
+        mean = window.mean(axis=1)
+        slope = window @ x / (x @ x)
+        # Days today..month end sit at x = (n - 1) / 2 + 1 ... + remaining_days
+        future_x_sum = remaining_days * (n - 1) / 2 + remaining_days * (remaining_days + 1) / 2
+        rest_of_month = np.clip(remaining_days * mean + slope * future_x_sum, 0, None)
+    else:
+        slope = np.zeros(series)
+        rest_of_month = (window[:, -1] if n else np.zeros(series)) * remaining_days
+
+    projected = float(month_to_date.sum() + rest_of_month.sum())
+    result = {
+        'as_of': (today - timedelta(days=1)).isoformat(),
+        'series': series,
+        'days': days,
+        'month_to_date': round(float(month_to_date.sum()), 2),
+        'projected_month_total': round(projected, 2),
+        'budget_limit': budget_limit,
+        'breach_expected': bool(budget_limit) and projected >= budget_limit,
+        'anomalies': [],
+        'trending': []
+    }
+    if budget_limit:
+        result['projected_utilization'] = round(projected / budget_limit * 100, 1)
+
+    if days > MIN_BASELINE_DAYS:
+        latest = costs[:, -1]
+        baseline = costs[:, -(ANOMALY_BASELINE_DAYS + 1):-1]
+        median = np.median(baseline, axis=1)
+        mad = np.median(np.abs(baseline - median[:, None]), axis=1) * MAD_SCALE
+        # A flat baseline has no spread; a dollar a day keeps its score finite
+        z = (latest - median) / np.maximum(mad, 1.0)
+        excess = latest - median
+        flagged = np.flatnonzero((z >= ANOMALY_Z_THRESHOLD) & (excess >= ANOMALY_MIN_DOLLARS))
+        for row in flagged[np.argsort(-excess[flagged])][:FORECAST_TOP_N]:
+            result['anomalies'].append({
+                'keys': _labels(history, row),
+                'cost': round(float(latest[row]), 2),
+                'baseline': round(float(median[row]), 2),
+                'score': round(float(z[row]), 1)
+            })
+
+    growing = np.flatnonzero(slope > 0)
+    for row in growing[np.argsort(-slope[growing])][:FORECAST_TOP_N]:
+        result['trending'].append({
+            'keys': _labels(history, row),
+            'daily_increase': round(float(slope[row]), 2),
+            'month_to_date': round(float(month_to_date[row]), 2)
+        })
+    return result
+
+
+def forecast_spend(budget_limit: float = 0.0, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Refresh the cost history and score it
+
+    Returns:
+        score_history's result plus 'fetched_days' and timings, or
+        {'skipped': reason} when forecasting is disabled or numpy is missing
+    """
+    if not FORECAST_ENABLED:
+        return {'skipped': 'forecasting disabled'}
+    if not numpy_available():
+        print("numpy is not installed, skipping spend forecast")
+        return {'skipped': 'numpy not installed'}
+
+    today = today or datetime.now(timezone.utc).date()
+    started = time.perf_counter()
+    history, fetched_days = refresh_history(today)
+    refreshed = time.perf_counter()
+    result = score_history(history, today, budget_limit)
+    result['fetched_days'] = fetched_days
+    result['refresh_ms'] = round((refreshed - started) * 1000, 1)
+    result['scoring_ms'] = round((time.perf_counter() - refreshed) * 1000, 1)
+    print(f"Spend forecast: {result['series']} series x {result['days']} days, "
+          f"{fetched_days} days fetched, scored in {result['scoring_ms']}ms")
+    return result
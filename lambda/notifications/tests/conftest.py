@@ -0,0 +1,17 @@
+"""
+Shared setup for the budget handler tests
+
+Modules are imported the way the Lambda runtime sees them: the function
+package and the shared layer on sys.path, with state kept locally.
+"""
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.pop('STATE_BUCKET', None)
+os.environ.pop('ALERT_DEDUP_TABLE', None)
+os.environ['COST_CACHE_PERSIST'] = 'false'
+sys.path.insert(0, os.path.join(ROOT, 'lambda', 'shared', 'python'))
+sys.path.insert(0, os.path.join(ROOT, 'lambda', 'notifications'))
@@ -0,0 +1,114 @@
+"""Tests for budget alert claims and their release on failure"""
+import pytest
+
+import budget_alert_handler
+from alert_dedup import AlertDeduplicator, LocalClaimStore, alert_key
+
+ALERT = {'budgetName': 'monthly', 'threshold': 90, 'period': '2026-10'}
+
+
+@pytest.fixture
+def deduplicator(monkeypatch):
+    """A fresh deduplicator with in-memory claims, installed in the handler"""
+    deduplicator = AlertDeduplicator(store=LocalClaimStore(), ttl_seconds=3600, enabled=True)
+    monkeypatch.setattr(budget_alert_handler, 'alert_deduplicator', deduplicator)
+    return deduplicator
+
+
+def test_alert_key_includes_budget_threshold_and_period():
+    assert alert_key(ALERT) == 'monthly|90|2026-10'
+    assert alert_key({**ALERT, 'threshold': 100}) != alert_key(ALERT)
+
+
+def test_alert_is_claimed_once(deduplicator):
+    assert deduplicator.claim(ALERT) == 'monthly|90|2026-10'
+    assert deduplicator.claim(dict(ALERT)) is None
+    assert deduplicator.stats == {'accepted': 1, 'duplicates': 1}
+
+
+def test_released_alert_can_be_claimed_again(deduplicator):
+    key = deduplicator.claim(ALERT)
+    deduplicator.release(key)
+    assert deduplicator.claim(ALERT) == key
+
+
+def test_expired_claim_lets_alert_through():
+    deduplicator = AlertDeduplicator(store=LocalClaimStore(), ttl_seconds=0, enabled=True)
+    assert deduplicator.claim(ALERT)
+    assert deduplicator.claim(ALERT)
+
+
+def test_store_errors_fail_open():
+    class BrokenStore:
+        def claim(self, key, ttl_seconds):
+            raise RuntimeError('table unavailable')
+
+        def release(self, key):
+            raise RuntimeError('table unavailable')
+
+    deduplicator = AlertDeduplicator(store=BrokenStore(), enabled=True)
+    key = deduplicator.claim(ALERT)
+    assert key == alert_key(ALERT)
+    deduplicator.release(key)
+
+
+def test_disabled_deduplicator_lets_everything_through():
+    deduplicator = AlertDeduplicator(store=LocalClaimStore(), enabled=False)
+    assert deduplicator.claim(ALERT) and deduplicator.claim(ALERT)
+    assert deduplicator.stats == {'accepted': 0, 'duplicates': 0}
+
+
+def test_reset_stats(deduplicator):
+    deduplicator.claim(ALERT)
+    deduplicator.reset_stats()
+    assert deduplicator.stats == {'accepted': 0, 'duplicates': 0}
+
+
+def alerts(count):
+    return [{**ALERT, 'budgetName': f"budget-{i}"} for i in range(count)]
+
+
+def test_failed_alert_releases_only_unprocessed_claims(deduplicator, monkeypatch):
+    messages = alerts(3)
+    processed = []
+
+    def process(message):
+        if message['budgetName'] == 'budget-1':
+            raise RuntimeError('Cost Explorer unavailable')
+        processed.append(message['budgetName'])
+
+    monkeypatch.setattr(budget_alert_handler, 'BATCH_ALERTS', False)
+    monkeypatch.setattr(budget_alert_handler, 'process_budget_alert', process)
+    with pytest.raises(RuntimeError):
+        budget_alert_handler.process_budget_alerts(messages)
+
+    assert processed == ['budget-0']
+    # The processed alert keeps its claim; the failed one and the one never reached are retried
+    assert deduplicator.claim(messages[0]) is None
+    assert deduplicator.claim(messages[1]) is not None
+    assert deduplicator.claim(messages[2]) is not None
+
+
+def test_failed_batch_releases_every_claim(deduplicator, monkeypatch):
+    messages = alerts(2)
+
+    def fail(batch):
+        raise RuntimeError('optimizer invoke failed')
+
+    monkeypatch.setattr(budget_alert_handler, 'BATCH_ALERTS', True)
+    monkeypatch.setattr(budget_alert_handler, 'process_budget_alert_batch', fail)
+    with pytest.raises(RuntimeError):
+        budget_alert_handler.process_budget_alerts(messages)
+
+    assert all(deduplicator.claim(message) is not None for message in messages)
+
+
+def test_redelivered_alerts_are_skipped(deduplicator, monkeypatch):
+    processed = []
+    monkeypatch.setattr(budget_alert_handler, 'BATCH_ALERTS', False)
+    monkeypatch.setattr(budget_alert_handler, 'process_budget_alert', lambda message: processed.append(message))
+
+    budget_alert_handler.process_budget_alerts(alerts(2))
+    budget_alert_handler.process_budget_alerts(alerts(2))
+
+    assert len(processed) == 2
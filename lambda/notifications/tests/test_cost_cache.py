@@ -0,0 +1,107 @@
+"""Tests for the Cost Explorer result cache"""
+import pytest
+
+from cost_cache import STORE_PREFIX, CostCache
+
+
+class MemoryStore:
+    """State store holding documents in a dict"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def get(self, key):
+        return self.documents.get(key)
+
+    def put(self, key, document):
+        self.documents[key] = document
+
+    def delete(self, key):
+        self.documents.pop(key, None)
+
+    def keys(self, prefix=''):
+        return [key for key in self.documents if key.startswith(prefix)]
+
+
+class Loader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values.pop(0)
+
+
+def test_fresh_entry_is_served_without_loading():
+    cache = CostCache(ttl_seconds=60)
+    loader = Loader(1, 2)
+
+    assert cache.get('k', loader) == 1
+    assert cache.get('k', loader) == 1
+    assert loader.calls == 1
+    assert cache.stats == {'hits': 1, 'stale_hits': 0, 'misses': 1, 'refreshes': 0}
+
+
+def test_stale_entry_is_served_while_it_refreshes():
+    cache = CostCache(ttl_seconds=0, stale_seconds=60)
+    loader = Loader(1, 2)
+    cache.get('k', loader)
+
+    assert cache.get('k', loader) == 1
+    cache.wait_for_refresh()
+    assert cache._entries['k']['value'] == 2
+    assert cache.stats['stale_hits'] == 1 and cache.stats['refreshes'] == 1
+
+
+def test_entry_past_the_stale_window_is_loaded_again():
+    cache = CostCache(ttl_seconds=0, stale_seconds=0)
+    loader = Loader(1, 2)
+    cache.get('k', loader)
+
+    assert cache.get('k', loader) == 2
+    assert cache.stats['misses'] == 2
+
+
+def test_loader_errors_propagate_and_are_not_cached():
+    cache = CostCache()
+
+    def failing():
+        raise RuntimeError('throttled')
+
+    with pytest.raises(RuntimeError):
+        cache.get('k', failing)
+    assert cache.get('k', Loader(1)) == 1
+
+
+def test_store_shares_entries_between_caches():
+    store = MemoryStore()
+    CostCache(store=store).get('2026-10-01|MONTHLY', Loader(1))
+    loader = Loader(2)
+
+    assert CostCache(store=store).get('2026-10-01|MONTHLY', loader) == 1
+    assert loader.calls == 0
+
+
+def test_invalidate_drops_memory_and_persisted_entries():
+    store = MemoryStore()
+    cache = CostCache(store=store)
+    cache.get('a', Loader(1))
+    cache.get('b', Loader(1))
+
+    cache.invalidate('a')
+    assert cache.get('a', Loader(2)) == 2
+    assert cache.get('b', Loader(2)) == 1
+
+    cache.invalidate()
+    assert store.keys(STORE_PREFIX) == []
+    assert cache.get('b', Loader(3)) == 3
+
+
+def test_reset_stats_keeps_entries():
+    cache = CostCache()
+    cache.get('k', Loader(1))
+    cache.reset_stats()
+
+    assert cache.get('k', Loader(2)) == 1
+    assert cache.stats == {'hits': 1, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
@@ -0,0 +1,69 @@
+"""Tests for the Cost Explorer query engine and the handler's cost lookup"""
+import pytest
+
+import budget_alert_handler
+import cost_query
+from cost_cache import CostCache
+from cost_query import query_costs, top_n
+
+
+class FakeCostExplorer:
+    """Serves fixed groups across pages, recording each request"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get_cost_and_usage(self, **request):
+        self.requests.append(request)
+        index = int(request.get('NextPageToken', 0))
+        response = {'ResultsByTime': [{'TimePeriod': {'Start': '2026-10-01'}, 'Groups': self.pages[index]}]}
+        if index + 1 < len(self.pages):
+            response['NextPageToken'] = str(index + 1)
+        return response
+
+
+def group(amount, *keys):
+    return {'Keys': list(keys), 'Metrics': {'UnblendedCost': {'Amount': str(amount)}}}
+
+
+@pytest.fixture
+def ce(monkeypatch):
+    fake = FakeCostExplorer([
+        [group(10, 'Amazon EC2', 'Environment$dev'), group(5, 'Amazon RDS', 'Environment$')],
+        [group(2.5, 'Amazon EC2', 'Environment$prod')]
+    ])
+    monkeypatch.setattr(cost_query, 'get_client', lambda service_name: fake)
+    return fake
+
+
+def test_query_follows_every_page_and_totals_each_dimension(ce):
+    result = query_costs('2026-10-01', '2026-10-17', 'MONTHLY', ['SERVICE', 'TAG:Environment'])
+
+    assert len(ce.requests) == 2
+    assert result['total'] == 17.5
+    assert result['groups']['SERVICE'] == {'Amazon EC2': 12.5, 'Amazon RDS': 5.0}
+    assert result['groups']['TAG:Environment'] == {'dev': 10.0, cost_query.UNTAGGED: 5.0, 'prod': 2.5}
+    assert ce.requests[0]['GroupBy'] == [{'Type': 'DIMENSION', 'Key': 'SERVICE'},
+                                         {'Type': 'TAG', 'Key': 'Environment'}]
+
+
+def test_query_rejects_more_group_by_keys_than_cost_explorer_takes(ce):
+    with pytest.raises(ValueError):
+        query_costs('2026-10-01', '2026-10-17', 'MONTHLY', ['SERVICE', 'REGION', 'LINKED_ACCOUNT'])
+
+
+def test_top_n_keeps_the_largest_rounded():
+    assert top_n({'a': 1.004, 'b': 3.0, 'c': 2.0}, 2) == {'b': 3.0, 'c': 2.0}
+
+
+def test_cost_lookup_is_one_query_and_cached(ce, monkeypatch):
+    ce.pages = [[group(10, 'Amazon EC2', '111111111111')]]
+    monkeypatch.setattr(budget_alert_handler, 'cost_cache', CostCache())
+
+    costs = budget_alert_handler.get_current_costs()
+    budget_alert_handler.get_current_costs()
+
+    assert len(ce.requests) == 1
+    assert costs['by_service'] == {'Amazon EC2': 10.0}
+    assert costs['breakdowns'] == {'LINKED_ACCOUNT': {'111111111111': 10.0}}
@@ -0,0 +1,88 @@
+"""Tests for the stored cost history and its month-end forecast"""
+from datetime import date, timedelta
+
+import pytest
+
+import spend_forecast
+from spend_forecast import CostHistory, forecast_spend, refresh_history, score_history
+from state_store import LocalStateStore
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.fixture
+def np():
+    return pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def daily_costs(monkeypatch):
+    """Cost Explorer stand-in charging two series every day, recording each fetched range"""
+    fetched = []
+
+    def iter_daily_cost_groups(start_date, end_date, group_by):
+        fetched.append((start_date, end_date))
+        day = date.fromisoformat(start_date)
+        while day < date.fromisoformat(end_date):
+            yield day.isoformat(), ['Amazon EC2', '111111111111'], 10.0
+            yield day.isoformat(), ['Amazon RDS', '111111111111'], 5.0
+            day += timedelta(days=1)
+
+    monkeypatch.setattr(spend_forecast, 'iter_daily_cost_groups', iter_daily_cost_groups)
+    return fetched
+
+
+def test_forecast_is_skipped_without_numpy(monkeypatch):
+    monkeypatch.setattr(spend_forecast, 'np', None)
+    assert forecast_spend(1000.0) == {'skipped': 'numpy not installed'}
+
+
+def test_refresh_fetches_only_missing_and_recent_days(np, daily_costs, tmp_path):
+    store = LocalStateStore(str(tmp_path))
+    group_by = ['SERVICE', 'LINKED_ACCOUNT']
+
+    history, fetched_days = refresh_history(TODAY, group_by, store)
+    assert fetched_days == spend_forecast.FORECAST_HISTORY_DAYS
+    assert history.costs.shape == (2, spend_forecast.FORECAST_HISTORY_DAYS)
+
+    history, fetched_days = refresh_history(TODAY + timedelta(days=1), group_by, store)
+    assert fetched_days == spend_forecast.FORECAST_REFRESH_DAYS + 1
+    assert daily_costs[-1] == ((TODAY - timedelta(days=2)).isoformat(), (TODAY + timedelta(days=1)).isoformat())
+    # Refetched days replace what was stored rather than adding to it
+    assert history.costs.sum(axis=0).tolist() == [15.0] * spend_forecast.FORECAST_HISTORY_DAYS
+    assert history.end == TODAY + timedelta(days=1)
+
+
+def test_history_of_other_group_by_keys_is_rebuilt(np, daily_costs, tmp_path):
+    store = LocalStateStore(str(tmp_path))
+    refresh_history(TODAY, ['SERVICE', 'LINKED_ACCOUNT'], store)
+
+    assert CostHistory.load(['SERVICE'], store) is None
+
+
+def test_flat_spend_projects_the_daily_rate_over_the_rest_of_the_month(np):
+    start = TODAY - timedelta(days=30)
+    history = CostHistory(['SERVICE'], start, [('flat',)], np.full((1, 30), 10.0))
+
+    result = score_history(history, TODAY, budget_limit=300.0)
+
+    # 16 days of October so far, 15 days still to come
+    assert result['month_to_date'] == 160.0
+    assert result['projected_month_total'] == 310.0
+    assert result['breach_expected'] and result['projected_utilization'] == 103.3
+    assert result['anomalies'] == [] and result['trending'] == []
+
+
+def test_spikes_and_growing_series_are_reported(np):
+    start = TODAY - timedelta(days=30)
+    spike = np.full(30, 5.0)
+    spike[-1] = 100.0
+    costs = np.stack([np.full(30, 10.0), spike, np.arange(1.0, 31.0)])
+    history = CostHistory(['SERVICE'], start, [('flat',), ('spike',), ('growing',)], costs)
+
+    result = score_history(history, TODAY)
+
+    assert [anomaly['keys'] for anomaly in result['anomalies']] == [{'SERVICE': 'spike'}]
+    assert result['anomalies'][0]['baseline'] == 5.0
+    assert [trend['keys'] for trend in result['trending']] == [{'SERVICE': 'growing'}, {'SERVICE': 'spike'}]
+    assert result['trending'][0]['daily_increase'] == 1.0
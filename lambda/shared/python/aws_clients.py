@@ -0,0 +1,112 @@
+"""
+AWS Client Registry
+Lazily builds and memoizes boto3 clients shared by the Lambda packages
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import boto3
+import botocore.session
+from botocore.config import Config
+
+from rate_limiter import rate_limiters
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '5'))
+
+# Connection pool sized for the thread-pool fan-out; keep-alive lets warm
+# containers reuse TLS connections between invocations. Throttled calls are
+# retried with backoff while rate_limiter paces every attempt.
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    connect_timeout=5,
+    read_timeout=30,
+    tcp_keepalive=True,
+    retries={'mode': 'standard', 'max_attempts': MAX_ATTEMPTS}
+)
+
+_data_loader = None
+_data_loader_lock = threading.Lock()
+
+
+def new_session(**credentials) -> boto3.Session:
+    """
+    Build a boto3 session whose botocore session shares the model loader
+
+    Service models and endpoint data are parsed once per container rather
+    than once per session, which matters when many assumed-role sessions
+    are created.
+
+    Args:
+        **credentials: Optional aws_access_key_id, aws_secret_access_key and
+            aws_session_token; omitted for the default credential chain
+    """
+    global _data_loader
+    core_session = botocore.session.Session()
+    with _data_loader_lock:
+        if _data_loader is None:
+            _data_loader = core_session.get_component('data_loader')
+        else:
+            core_session.register_component('data_loader', _data_loader)
+    if credentials:
+        core_session.set_credentials(
+            credentials['aws_access_key_id'],
+            credentials['aws_secret_access_key'],
+            credentials.get('aws_session_token')
+        )
+    return boto3.Session(botocore_session=core_session)
+
+
+class ClientRegistry:
+    """
+    Memoized boto3 clients for one session, built on first use
+
+    Every client is paced by the shared rate limiter for its service and
+    region, whichever session it belongs to.
+
+    boto3 sessions are not thread-safe, so client construction is
+    serialized; cached lookups take no lock.
+    """
+
+    def __init__(self, session: Optional[boto3.Session] = None, config: Config = CLIENT_CONFIG):
+        self._session = session
+        self._config = config
+        self._clients: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name: str, region: Optional[str] = None):
+        """Return the client for a service and region, creating it if needed"""
+        key = (service_name, region)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    if self._session is None:
+                        self._session = new_session()
+                    client = self._session.client(service_name, region_name=region, config=self._config)
+                    rate_limiters.instrument(client)
+                    self._clients[key] = client
+        return client
+
+    def bind(self, region: Optional[str] = None) -> Callable[[str], Any]:
+        """Return a factory that builds clients bound to the given region"""
+        return lambda service_name: self.client(service_name, region)
+
+    def created(self) -> list:
+        """(service, region) pairs of the clients built so far"""
+        return list(self._clients)
+
+
+default_registry = ClientRegistry()
+
+
+def get_client(service_name: str, region: Optional[str] = None):
+    """Return a client from the default registry"""
+    return default_registry.client(service_name, region)
+
+
+def regional_clients(region: Optional[str] = None) -> Callable[[str], Any]:
+    """Return a default-registry client factory bound to the given region"""
+    return default_registry.bind(region)
@@ -0,0 +1,182 @@
+"""
+Metrics Module
+Per-invocation timing spans and counters, emitted as CloudWatch Embedded Metric Format
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+# 'emf' writes EMF records to stdout for CloudWatch Logs to extract; 'noop' records nothing
+METRICS_BACKEND = os.environ.get('METRICS_BACKEND', 'emf')
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'CostOptimization')
+FUNCTION_NAME = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+
+
+def metric_name(name: str) -> str:
+    """CloudWatch metric name for a snake_case span or counter name"""
+    return ''.join(part.title() for part in name.split('_'))
+
+
+class EmfMetrics:
+    """
+    Span timings and counters for one invocation
+
+    Spans accumulate: a phase timed in several places or by several
+    region workers reports its total time and how many times it ran.
+    Nothing is written until emit(), which prints one EMF record for the
+    invocation and one per AWS service called.
+
+    Args:
+        namespace: CloudWatch namespace of the emitted metrics
+        writer: Called with each EMF record as a JSON string
+    """
+
+    def __init__(self, namespace: str = METRICS_NAMESPACE, writer=print):
+        self.namespace = namespace
+        self.writer = writer
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all spans and counters, e.g. at the start of an invocation"""
+        with self._lock:
+            self.spans: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[str, float] = {}
+            self._started = time.perf_counter()
+
+    def _add_span(self, name: str, elapsed_ms: float, count: int = 1):
+        with self._lock:
+            span = self.spans.setdefault(name, {'count': 0, 'ms': 0.0})
+            span['count'] += count
+            span['ms'] += elapsed_ms
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block as part of phase name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_span(name, (time.perf_counter() - start) * 1000)
+
+    def timed(self, name: str, iterable: Iterable[Any], count_as: Optional[str] = None) -> Iterator[Any]:
+        """
+        Yield from iterable, timing only the time spent producing items
+
+        Paginated discovery is consumed lazily, so the time the caller
+        spends on each item is not charged to the phase. Items yielded are
+        added to the count_as counter when given.
+        """
+        iterator = iter(iterable)
+        elapsed = 0.0
+        items = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                elapsed += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            self._add_span(name, elapsed * 1000, 1)
+            if count_as:
+                self.count(count_as, items)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> Dict[str, Any]:
+        """Spans in milliseconds and counters recorded so far"""
+        with self._lock:
+            return {
+                'duration_ms': round((time.perf_counter() - self._started) * 1000, 1),
+                'spans': {name: {'count': s['count'], 'ms': round(s['ms'], 1)} for name, s in self.spans.items()},
+                'counters': dict(self.counters)
+            }
+
+    def _record(self, dimensions: Dict[str, str], values: Dict[str, float], units: Dict[str, str]) -> str:
+        return json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': units.get(name, 'Count')} for name in values]
+                }]
+            },
+            **dimensions,
+            **values
+        })
+
+    def emit(self, dimensions: Dict[str, str], api_stats: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Write the invocation's metrics
+
+        Args:
+            dimensions: Dimensions of the invocation record, e.g. {'Action': ...};
+                'Function' is added automatically
+            api_stats: rate_limiters.stats() output, summed per service into
+                API call, throttle and retry counts
+        """
+        dimensions = {'Function': FUNCTION_NAME, **dimensions}
+        summary = self.summary()
+        duration_seconds = summary['duration_ms'] / 1000
+
+        values = {'Duration': summary['duration_ms']}
+        units = {'Duration': 'Milliseconds'}
+        for name, span in summary['spans'].items():
+            values[f"{metric_name(name)}Time"] = span['ms']
+            units[f"{metric_name(name)}Time"] = 'Milliseconds'
+        for name, value in summary['counters'].items():
+            values[metric_name(name)] = value
+        processed = summary['counters'].get('resources_processed')
+        if processed is not None and duration_seconds > 0:
+            values['ResourcesPerSecond'] = round(processed / duration_seconds, 2)
+            units['ResourcesPerSecond'] = 'Count/Second'
+
+        services: Dict[str, Dict[str, float]] = {}
+        for key, stats in (api_stats or {}).items():
+            service = services.setdefault(key.split(':')[0], {'ApiCalls': 0, 'Throttles': 0, 'Retries': 0})
+            service['ApiCalls'] += stats['calls']
+            service['Throttles'] += stats['throttles']
+            service['Retries'] += stats['retries']
+        if services:
+            values['ApiCalls'] = sum(service['ApiCalls'] for service in services.values())
+            values['Throttles'] = sum(service['Throttles'] for service in services.values())
+
+        self.writer(self._record(dimensions, values, units))
+        for service, service_values in sorted(services.items()):
+            self.writer(self._record({'Function': FUNCTION_NAME, 'Service': service}, service_values, {}))
+
+
+class NoopMetrics:
+    """Drop-in backend that records nothing, for tests and when metrics are off"""
+
+    def reset(self):
+        pass
+
+    def span(self, name: str):
+        return nullcontext()
+
+    def timed(self, name: str, iterable: Iterable[Any], count_as: Optional[str] = None) -> Iterable[Any]:
+        return iterable
+
+    def count(self, name: str, value: float = 1):
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {'duration_ms': 0.0, 'spans': {}, 'counters': {}}
+
+    def emit(self, dimensions: Dict[str, str], api_stats: Optional[Dict[str, Dict[str, Any]]] = None):
+        pass
+
+
+metrics = NoopMetrics() if METRICS_BACKEND == 'noop' else EmfMetrics()
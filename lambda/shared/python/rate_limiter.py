@@ -0,0 +1,181 @@
+"""
+Rate Limiter Module
+Adaptive token buckets shared by every boto3 client, one per service and region
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Starting and ceiling request rates (per second) for each service and region
+RATE_LIMIT_INITIAL = float(os.environ.get('AWS_RATE_LIMIT_INITIAL', '20'))
+RATE_LIMIT_MAX = float(os.environ.get('AWS_RATE_LIMIT_MAX', '100'))
+RATE_LIMIT_MIN = 1.0
+# AIMD: add this much rate per successful call, multiply by this on a throttle
+RATE_INCREASE = 0.5
+RATE_DECREASE = 0.5
+
+THROTTLE_ERROR_CODES = frozenset((
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+    'ProvisionedThroughputExceededException',
+    'LimitExceededException',
+    'EC2ThrottledException'
+))
+
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate follows additive-increase, multiplicative-decrease
+
+    Every HTTP attempt, retries included, takes one token. The bucket
+    holds at most one second of tokens, so a burst after an idle period
+    cannot exceed the current rate.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_INITIAL, max_rate: float = RATE_LIMIT_MAX,
+                 min_rate: float = RATE_LIMIT_MIN):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'calls': 0, 'throttles': 0, 'retries': 0, 'wait_seconds': 0.0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a token is available"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats['calls'] += 1
+                    self.stats['wait_seconds'] += waited
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self):
+        with self._lock:
+            self.stats['throttles'] += 1
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+            self._tokens = min(self._tokens, self.rate)
+
+    def on_retry(self):
+        with self._lock:
+            self.stats['retries'] += 1
+
+
+def _error_code(response: Optional[Tuple[Any, Dict[str, Any]]]) -> Optional[str]:
+    if not response:
+        return None
+    http_response, parsed = response
+    if getattr(http_response, 'status_code', None) == 429:
+        return 'TooManyRequestsException'
+    return (parsed or {}).get('Error', {}).get('Code')
+
+
+class RateLimiterRegistry:
+    """
+    Token buckets keyed by (service, region), shared across clients and sessions
+
+    instrument() hooks a client's botocore event system so every attempt
+    waits on the bucket, throttling errors shrink the rate before botocore's
+    own retry backoff, and successes grow it back.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, service_name: str, region: str) -> TokenBucket:
+        key = (service_name, region)
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket()
+            return self._buckets[key]
+
+    def instrument(self, client):
+        """Attach the client's (service, region) bucket to its request lifecycle"""
+        service_model = client.meta.service_model
+        bucket = self.bucket(service_model.service_name, client.meta.region_name or 'global')
+        events = client.meta.events
+        event_suffix = service_model.service_id.hyphenize()
+
+        def before_send(request=None, **kwargs):
+            if request is not None and request.context.get('retries', {}).get('attempt', 1) > 1:
+                bucket.on_retry()
+            bucket.acquire()
+
+        def needs_retry(response=None, **kwargs):
+            if _error_code(response) in THROTTLE_ERROR_CODES:
+                bucket.on_throttle()
+
+        def after_call(http_response=None, parsed=None, **kwargs):
+            # after-call also fires for error responses, just before botocore raises them
+            if http_response is not None and http_response.status_code >= 300:
+                return
+            if (parsed or {}).get('Error'):
+                return
+            bucket.on_success()
+
+        # Registered first on the service's own event so it sees every response
+        # before botocore's retry handler answers and ends the emit
+        events.register(f"before-send.{event_suffix}", before_send)
+        events.register_first(f"needs-retry.{event_suffix}", needs_retry)
+        events.register(f"after-call.{event_suffix}", after_call)
+        return client
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Counters and current rate per 'service:region'"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            f"{service_name}:{region}": {**bucket.stats, 'rate': round(bucket.rate, 2)}
+            for (service_name, region), bucket in buckets.items()
+        }
+
+    def clear(self):
+        """Forget every bucket and its learned rate"""
+        with self._lock:
+            self._buckets.clear()
+
+    def reset_stats(self):
+        """Zero the counters, keeping the learned rates, e.g. at the start of an invocation"""
+        with self._lock:
+            buckets = list(self._buckets.values())
+        for bucket in buckets:
+            bucket.reset_stats()
+
+    def totals(self) -> Dict[str, Any]:
+        """Counters summed over every bucket"""
+        totals = {'calls': 0, 'throttles': 0, 'retries': 0, 'wait_seconds': 0.0}
+        for stats in self.stats().values():
+            for key in totals:
+                totals[key] += stats[key]
+        totals['wait_seconds'] = round(totals['wait_seconds'], 3)
+        return totals
+
+
+rate_limiters = RateLimiterRegistry()
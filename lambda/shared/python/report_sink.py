@@ -0,0 +1,127 @@
+"""
+Report Sink Module
+Streams run reports as gzip-compressed JSON Lines to S3, or to the local filesystem when no bucket is configured
+"""
+import gzip
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable
+
+from aws_clients import get_client
+from state_store import STATE_BUCKET, STATE_DIR
+
+# Longest event or payload a log line carries; the rest is cut off
+LOG_MAX_CHARS = int(os.environ.get('LOG_MAX_CHARS', '2000'))
+
+
+def bounded_json(value: Any, limit: int = LOG_MAX_CHARS) -> str:
+    """JSON for a log line, truncated to limit characters"""
+    text = json.dumps(value, default=str)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} more characters)"
+
+
+class ReportSink(ABC):
+    """
+    Writes records as JSON Lines into a gzip file under /tmp
+
+    Records are compressed as they are written, so memory use does not
+    grow with the report; close() moves the file to its destination and
+    returns a pointer to it.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.records = 0
+        self._file = tempfile.NamedTemporaryFile(suffix='.jsonl.gz', delete=False)
+        self._gzip = gzip.GzipFile(fileobj=self._file, mode='wb')
+
+    def write(self, record: Dict[str, Any]):
+        self._gzip.write(json.dumps(record, default=str).encode('utf-8'))
+        self._gzip.write(b'\n')
+        self.records += 1
+
+    def write_all(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.write(record)
+
+    def close(self) -> Dict[str, Any]:
+        """Finish the file and store it; returns {'location', 'records', 'bytes'}"""
+        self._gzip.close()
+        self._file.close()
+        try:
+            size = os.path.getsize(self._file.name)
+            location = self._store(self._file.name)
+        finally:
+            if os.path.exists(self._file.name):
+                os.remove(self._file.name)
+        return {'location': location, 'records': self.records, 'bytes': size}
+
+    def discard(self):
+        """Drop a report that could not be finished"""
+        self._gzip.close()
+        self._file.close()
+        if os.path.exists(self._file.name):
+            os.remove(self._file.name)
+
+    @abstractmethod
+    def _store(self, path: str) -> str:
+        """Move the finished file at path to its destination and return its location"""
+
+
+class S3ReportSink(ReportSink):
+    """Report uploaded to a bucket; large files go up as a multipart upload"""
+
+    def __init__(self, bucket: str, key: str):
+        super().__init__(key)
+        self.bucket = bucket
+
+    def _store(self, path: str) -> str:
+        get_client('s3').upload_file(
+            path, self.bucket, self.key,
+            ExtraArgs={'ContentType': 'application/x-ndjson', 'ContentEncoding': 'gzip'}
+        )
+        return f"s3://{self.bucket}/{self.key}"
+
+
+class LocalReportSink(ReportSink):
+    """Report moved into a local directory, standing in for the bucket"""
+
+    def __init__(self, directory: str, key: str):
+        super().__init__(key)
+        self.directory = directory
+
+    def _store(self, path: str) -> str:
+        target = os.path.join(self.directory, self.key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return target
+
+
+def open_report_sink(namespace: str, key: str) -> ReportSink:
+    """
+    Open a sink for one report
+
+    Reports live at '<namespace>/<key>' in STATE_BUCKET when it is set,
+    otherwise under STATE_DIR/<namespace> on the local filesystem, next
+    to the namespace's state documents.
+    """
+    if STATE_BUCKET:
+        return S3ReportSink(STATE_BUCKET, f"{namespace}/{key}")
+    return LocalReportSink(os.path.join(STATE_DIR, namespace), key)
+
+
+def read_report(location: str) -> Iterable[Dict[str, Any]]:
+    """Yield the records of a report written by a sink"""
+    if location.startswith('s3://'):
+        bucket, key = location[len('s3://'):].split('/', 1)
+        body = get_client('s3').get_object(Bucket=bucket, Key=key)['Body']
+        stream = gzip.GzipFile(fileobj=body)
+    else:
+        stream = gzip.open(location, 'rb')
+    with stream:
+        for line in stream:
+            yield json.loads(line)
@@ -0,0 +1,131 @@
+"""
+State Store Module
+Persists small JSON documents, and binary blobs, in S3 or on the local filesystem when no bucket is configured
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from aws_clients import get_client
+
+STATE_BUCKET = os.environ.get('STATE_BUCKET')
+STATE_DIR = os.environ.get('STATE_DIR', '/tmp/state')
+
+# Error codes S3 answers a read of a missing key with, given s3:ListBucket on the bucket;
+# AccessDenied is a permissions problem and is raised
+MISSING_KEY_ERROR_CODES = ('NoSuchKey', '404')
+
+
+class LocalStateStore:
+    """JSON documents stored as files under a local directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.get_bytes(key)
+        return None if data is None else json.loads(data)
+
+    def put(self, key: str, document: Dict[str, Any]):
+        self.put_bytes(key, json.dumps(document, default=str).encode('utf-8'))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes, content_type: str = 'application/json'):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a reader never sees a partial document
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """Keys of the documents starting with prefix, sorted"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                key = os.path.relpath(os.path.join(root, name), self.directory).replace(os.sep, '/')
+                if key.startswith(prefix) and not key.endswith('.tmp'):
+                    found.append(key)
+        return sorted(found)
+
+
+class S3StateStore:
+    """JSON documents stored as objects under a bucket prefix"""
+
+    def __init__(self, bucket: str, prefix: str):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.get_bytes(key)
+        return None if data is None else json.loads(data)
+
+    def put(self, key: str, document: Dict[str, Any]):
+        self.put_bytes(key, json.dumps(document, default=str).encode('utf-8'))
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        s3_client = get_client('s3')
+        try:
+            response = s3_client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except s3_client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in MISSING_KEY_ERROR_CODES:
+                return None
+            raise
+        return response['Body'].read()
+
+    def put_bytes(self, key: str, data: bytes, content_type: str = 'application/json'):
+        get_client('s3').put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType=content_type
+        )
+
+    def delete(self, key: str):
+        get_client('s3').delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """Keys of the documents starting with prefix, sorted"""
+        paginator = get_client('s3').get_paginator('list_objects_v2')
+        return sorted(
+            item['Key'][len(self.prefix):]
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix)
+            for item in page.get('Contents', [])
+        )
+
+
+_stores: Dict[str, Any] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(namespace: str):
+    """
+    Return the state store for a namespace
+
+    Documents live under '<namespace>/' in STATE_BUCKET when it is set,
+    otherwise under STATE_DIR/<namespace> on the local filesystem.
+    """
+    with _stores_lock:
+        if namespace not in _stores:
+            if STATE_BUCKET:
+                _stores[namespace] = S3StateStore(STATE_BUCKET, f"{namespace}/")
+            else:
+                _stores[namespace] = LocalStateStore(os.path.join(STATE_DIR, namespace))
+        return _stores[namespace]
@@ -0,0 +1,120 @@
+"""
+Build Price Index
+Rebuilds lambda/cost_optimizer/price_index.json from the AWS Pricing API
+
+Run offline (it needs pricing:GetProducts); the Lambda only ever reads
+the bundled file. By default the regions, instance types, DB classes and
+engines already in the index are refreshed; Fargate prices are carried
+over unchanged.
+
+Usage:
+    python scripts/build_price_index.py [--regions us-east-1,eu-west-1] [--output PATH]
+"""
+import argparse
+import json
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import boto3
+
+INDEX_PATH = os.path.join(os.path.dirname(__file__), '..', 'lambda', 'cost_optimizer', 'price_index.json')
+# Pricing API databaseEngine values for the engines the index uses
+RDS_ENGINES = {'mysql': 'MySQL', 'postgres': 'PostgreSQL'}
+
+
+def format_index(value: Any, indent: int = 0) -> str:
+    """
+    JSON in the bundled file's layout
+
+    Objects nest with two-space indents; arrays, and objects holding only
+    scalars, stay on one line, so each price row reads as one line and a
+    rebuild diffs cleanly against the committed index.
+    """
+    if not isinstance(value, dict) or all(not isinstance(item, (dict, list)) for item in value.values()):
+        return json.dumps(value)
+    inner = ' ' * (indent + 2)
+    members = [f"{inner}{json.dumps(key)}: {format_index(item, indent + 2)}" for key, item in value.items()]
+    return '{\n' + ',\n'.join(members) + '\n' + ' ' * indent + '}'
+
+
+def on_demand_price(pricing, service_code: str, filters: Dict[str, str]) -> Optional[float]:
+    """Hourly on-demand USD price of the single product matching filters"""
+    response = pricing.get_products(
+        ServiceCode=service_code,
+        Filters=[{'Type': 'TERM_MATCH', 'Field': field, 'Value': value} for field, value in filters.items()],
+        MaxResults=10
+    )
+    for product in response['PriceList']:
+        terms = json.loads(product)['terms'].get('OnDemand', {})
+        for term in terms.values():
+            for dimension in term['priceDimensions'].values():
+                price = float(dimension['pricePerUnit'].get('USD', 0))
+                if dimension['unit'] in ('Hrs', 'Hours') and price > 0:
+                    return round(price, 4)
+    return None
+
+
+def ec2_prices(pricing, regions: List[str], instance_type: str) -> List[Optional[float]]:
+    return [
+        on_demand_price(pricing, 'AmazonEC2', {
+            'regionCode': region,
+            'instanceType': instance_type,
+            'operatingSystem': 'Linux',
+            'tenancy': 'Shared',
+            'preInstalledSw': 'NA',
+            'capacitystatus': 'Used'
+        })
+        for region in regions
+    ]
+
+
+def rds_prices(pricing, regions: List[str], db_class: str, engine: str) -> List[Optional[float]]:
+    return [
+        on_demand_price(pricing, 'AmazonRDS', {
+            'regionCode': region,
+            'instanceType': db_class,
+            'databaseEngine': RDS_ENGINES[engine],
+            'deploymentOption': 'Single-AZ'
+        })
+        for region in regions
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--regions', help='Comma-separated regions (default: those in the current index)')
+    parser.add_argument('--output', default=INDEX_PATH)
+    args = parser.parse_args()
+
+    with open(INDEX_PATH) as f:
+        current = json.load(f)
+    regions = args.regions.split(',') if args.regions else current['regions']
+    # The Pricing API is only served from a few regions
+    pricing = boto3.client('pricing', region_name='us-east-1')
+
+    index = {
+        'generated': date.today().isoformat(),
+        'currency': 'USD',
+        'regions': regions,
+        'engine_aliases': current.get('engine_aliases', {}),
+        'ec2': {},
+        'rds': {},
+        'fargate': current['fargate'] if regions == current['regions'] else {}
+    }
+    for instance_type in current['ec2']:
+        print(f"EC2 {instance_type}")
+        index['ec2'][instance_type] = ec2_prices(pricing, regions, instance_type)
+    for engine, classes in current['rds'].items():
+        index['rds'][engine] = {}
+        for db_class in classes:
+            print(f"RDS {engine} {db_class}")
+            index['rds'][engine][db_class] = rds_prices(pricing, regions, db_class, engine)
+
+    with open(args.output, 'w') as f:
+        f.write(format_index(index) + '\n')
+    print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -83,6 +83,9 @@ module "iam" {
   project_name = var.project_name
   environment  = var.environment
 
+  state_bucket_arn       = module.s3.bucket_arn
+  organization_role_name = var.organization_role_name
+
   tags = local.common_tags
 }
 
@@ -102,6 +105,13 @@ module "lambda" {
   enable_cost_automation = var.enable_cost_automation
   business_hours_start   = var.business_hours_start
   business_hours_end     = var.business_hours_end
+  target_regions         = var.target_regions
+  organization_mode      = var.organization_mode
+  organization_role_name = var.organization_role_name
+  use_inventory          = var.use_inventory
+
+  state_bucket_name     = module.s3.bucket_name
+  monthly_budget_amount = var.monthly_budget_amount
 
   tags = local.common_tags
 }
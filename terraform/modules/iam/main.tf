@@ -39,15 +39,44 @@ resource "aws_iam_role_policy" "cost_optimizer" {
         Action = [
           "ec2:DescribeInstances",
           "ec2:StopInstances",
+          "ec2:StartInstances",
           "ec2:DescribeTags"
         ]
         Resource = "*"
         Condition = {
-          StringEquals = {
+          StringEqualsIgnoreCase = {
             "ec2:ResourceTag/AutoStop" = "true"
           }
         }
       },
+      {
+        # Aggressive runs also stop, and restore later starts, instances of the
+        # environment that carry no AutoStop tag; never production ones
+        Effect = "Allow"
+        Action = [
+          "ec2:StopInstances",
+          "ec2:StartInstances"
+        ]
+        Resource = "*"
+        Condition = {
+          Null = {
+            "ec2:ResourceTag/AutoStop" = "true"
+          }
+          StringEqualsIgnoreCase = {
+            "ec2:ResourceTag/Environment" = var.environment
+          }
+          StringNotEqualsIgnoreCase = {
+            "ec2:ResourceTag/Environment" = "prod"
+          }
+        }
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "ec2:DescribeRegions"
+        ]
+        Resource = "*"
+      },
       {
         Effect = "Allow"
         Action = [
@@ -64,6 +93,7 @@ resource "aws_iam_role_policy" "cost_optimizer" {
         Action = [
           "rds:DescribeDBInstances",
           "rds:StopDBInstance",
+          "rds:StartDBInstance",
           "rds:ListTagsForResource"
         ]
         Resource = "*"
@@ -81,6 +111,60 @@ resource "aws_iam_role_policy" "cost_optimizer" {
           "tag:GetResources"
         ]
         Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "organizations:ListAccounts"
+        ]
+        Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sts:AssumeRole"
+        ]
+        Resource = "arn:aws:iam::*:role/${var.organization_role_name}"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = "${var.state_bucket_arn}/cost-optimizer/*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:Query"
+        ]
+        Resource = [
+          "arn:aws:dynamodb:*:*:table/${var.project_name}-${var.environment}-inventory",
+          "arn:aws:dynamodb:*:*:table/${var.project_name}-${var.environment}-inventory/index/*"
+        ]
+      },
+      {
+        # Without ListBucket, S3 answers a missing key with AccessDenied instead of NoSuchKey.
+        # GetObject carries no s3:prefix key, so the grant cannot be limited by prefix.
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = var.state_bucket_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = "arn:aws:lambda:*:*:function:${var.project_name}-${var.environment}-cost-optimizer"
       }
     ]
   })
@@ -143,6 +227,32 @@ resource "aws_iam_role_policy" "budget_handler" {
           "ce:GetCostForecast"
         ]
         Resource = "*"
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject",
+          "s3:DeleteObject"
+        ]
+        Resource = "${var.state_bucket_arn}/budget-handler/*"
+      },
+      {
+        # Without ListBucket, S3 answers a missing key with AccessDenied instead of NoSuchKey.
+        # GetObject carries no s3:prefix key, so the grant cannot be limited by prefix.
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket"
+        ]
+        Resource = var.state_bucket_arn
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem"
+        ]
+        Resource = "arn:aws:dynamodb:*:*:table/${var.project_name}-${var.environment}-alert-dedup"
       }
     ]
   })
@@ -8,6 +8,16 @@ variable "environment" {
   type        = string
 }
 
+variable "organization_role_name" {
+  description = "IAM role name the cost optimizer may assume in member accounts; pass the lambda module the same value"
+  type        = string
+}
+
+variable "state_bucket_arn" {
+  description = "ARN of the S3 bucket holding cost optimizer run state"
+  type        = string
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
@@ -10,6 +10,37 @@ data "archive_file" "budget_handler" {
   output_path = "${path.module}/budget_handler.zip"
 }
 
+# Modules shared by both functions (client registry), installed under /opt/python
+data "archive_file" "shared_layer" {
+  type        = "zip"
+  source_dir  = "${path.module}/../../../lambda/shared"
+  output_path = "${path.module}/shared_layer.zip"
+}
+
+data "aws_region" "current" {}
+
+resource "aws_lambda_layer_version" "shared" {
+  filename            = data.archive_file.shared_layer.output_path
+  layer_name          = "${var.project_name}-${var.environment}-shared"
+  source_code_hash    = data.archive_file.shared_layer.output_base64sha256
+  compatible_runtimes = ["python3.11"]
+}
+
+# numpy for the budget handler's spend forecast: an existing layer ARN, or the
+# zip built by `make package`. Without either the forecast is skipped.
+locals {
+  numpy_layer_zip = "${path.module}/numpy_layer.zip"
+}
+
+resource "aws_lambda_layer_version" "numpy" {
+  count = var.numpy_layer_arn == "" && fileexists(local.numpy_layer_zip) ? 1 : 0
+
+  filename            = local.numpy_layer_zip
+  layer_name          = "${var.project_name}-${var.environment}-numpy"
+  source_code_hash    = filebase64sha256(local.numpy_layer_zip)
+  compatible_runtimes = ["python3.11"]
+}
+
 # Cost Optimizer Lambda Function
 resource "aws_lambda_function" "cost_optimizer" {
   filename         = data.archive_file.cost_optimizer.output_path
@@ -20,6 +51,7 @@ resource "aws_lambda_function" "cost_optimizer" {
   runtime          = "python3.11"
   timeout          = 300
   memory_size      = 256
+  layers           = [aws_lambda_layer_version.shared.arn]
 
   environment {
     variables = {
@@ -28,6 +60,16 @@ resource "aws_lambda_function" "cost_optimizer" {
       ENABLE_COST_AUTOMATION = var.enable_cost_automation
       BUSINESS_HOURS_START   = var.business_hours_start
       BUSINESS_HOURS_END     = var.business_hours_end
+      MAX_CONCURRENCY        = var.max_concurrency
+      TARGET_REGIONS         = join(",", var.target_regions)
+      ORGANIZATION_MODE      = var.organization_mode
+      ORGANIZATION_ROLE_NAME = var.organization_role_name
+      STATE_BUCKET           = var.state_bucket_name
+      USE_INVENTORY          = var.use_inventory
+      INVENTORY_TABLE        = var.use_inventory ? aws_dynamodb_table.inventory[0].name : ""
+      INVENTORY_REGIONS      = var.use_inventory ? data.aws_region.current.name : ""
+      METRICS_NAMESPACE      = var.metrics_namespace
+      TAG_POLICY             = var.tag_policy
     }
   }
 
@@ -39,6 +81,59 @@ resource "aws_lambda_function" "cost_optimizer" {
   )
 }
 
+# Inventory index, one item per resource; the sparse candidates index holds stop candidates only
+resource "aws_dynamodb_table" "inventory" {
+  count = var.use_inventory ? 1 : 0
+
+  name         = "${var.project_name}-${var.environment}-inventory"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "region"
+  range_key    = "resource"
+
+  attribute {
+    name = "region"
+    type = "S"
+  }
+
+  attribute {
+    name = "resource"
+    type = "S"
+  }
+
+  attribute {
+    name = "candidate_region"
+    type = "S"
+  }
+
+  global_secondary_index {
+    name            = "candidates"
+    hash_key        = "candidate_region"
+    range_key       = "resource"
+    projection_type = "KEYS_ONLY"
+  }
+
+  tags = var.tags
+}
+
+# Budget alert idempotency claims, expired by DynamoDB TTL
+resource "aws_dynamodb_table" "alert_dedup" {
+  name         = "${var.project_name}-${var.environment}-alert-dedup"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "alert_key"
+
+  attribute {
+    name = "alert_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
 # Budget Alert Handler Lambda Function
 resource "aws_lambda_function" "budget_handler" {
   filename         = data.archive_file.budget_handler.output_path
@@ -49,12 +144,24 @@ resource "aws_lambda_function" "budget_handler" {
   runtime          = "python3.11"
   timeout          = 60
   memory_size      = 128
+  layers = concat(
+    [aws_lambda_layer_version.shared.arn],
+    var.numpy_layer_arn != "" ? [var.numpy_layer_arn] : aws_lambda_layer_version.numpy[*].arn
+  )
 
   environment {
     variables = {
       ENVIRONMENT               = var.environment
       COST_OPTIMIZER_LAMBDA_ARN = aws_lambda_function.cost_optimizer.arn
       OPERATIONS_SNS_TOPIC_ARN  = var.operations_alert_topic_arn
+      STATE_BUCKET              = var.state_bucket_name
+      COST_BREAKDOWNS           = var.cost_breakdown
+      COST_CACHE_TTL_SECONDS    = var.cost_cache_ttl_seconds
+      ALERT_DEDUP_TABLE         = aws_dynamodb_table.alert_dedup.name
+      ALERT_DEDUP_TTL_SECONDS   = var.alert_dedup_ttl_seconds
+      METRICS_NAMESPACE         = var.metrics_namespace
+      MONTHLY_BUDGET_LIMIT      = var.monthly_budget_amount
+      FORECAST_TRIGGER_RATIO    = var.forecast_trigger_ratio
     }
   }
 
@@ -97,6 +204,33 @@ resource "aws_lambda_permission" "budget_handler_sns" {
   source_arn    = var.budget_alert_topic_arn
 }
 
+# EventBridge Rule for the daily spend forecast (8 AM UTC, after Cost Explorer's overnight refresh)
+resource "aws_cloudwatch_event_rule" "spend_forecast_schedule" {
+  name                = "${var.project_name}-${var.environment}-spend-forecast-schedule"
+  description         = "Project month-end spend and flag cost anomalies daily"
+  schedule_expression = "cron(0 8 * * ? *)"
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "spend_forecast_schedule" {
+  rule      = aws_cloudwatch_event_rule.spend_forecast_schedule.name
+  target_id = "BudgetHandlerForecast"
+  arn       = aws_lambda_function.budget_handler.arn
+
+  input = jsonencode({
+    action = "forecast"
+  })
+}
+
+resource "aws_lambda_permission" "spend_forecast_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridgeForecast"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.budget_handler.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.spend_forecast_schedule.arn
+}
+
 # EventBridge Rule for Scheduled Cost Optimization (weekdays at 6 PM UTC)
 resource "aws_cloudwatch_event_rule" "cost_optimizer_schedule" {
   name                = "${var.project_name}-${var.environment}-cost-optimizer-schedule"
@@ -150,3 +284,133 @@ resource "aws_lambda_permission" "ecs_scaler_eventbridge" {
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.ecs_scaler_schedule.arn
 }
+
+# EventBridge Rule for the morning restore (weekdays, ahead of business hours)
+locals {
+  business_hours_start_minutes = (
+    parseint(split(":", var.business_hours_start)[0], 10) * 60 + parseint(split(":", var.business_hours_start)[1], 10)
+  )
+  restore_minutes = (local.business_hours_start_minutes - var.restore_lead_minutes + 1440) % 1440
+}
+
+resource "aws_cloudwatch_event_rule" "restore_schedule" {
+  name                = "${var.project_name}-${var.environment}-restore-schedule"
+  description         = "Start back stopped resources ${var.restore_lead_minutes} minutes before business hours"
+  schedule_expression = "cron(${local.restore_minutes % 60} ${floor(local.restore_minutes / 60)} ? * MON-FRI *)"
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "restore_schedule" {
+  rule      = aws_cloudwatch_event_rule.restore_schedule.name
+  target_id = "CostOptimizerRestore"
+  arn       = aws_lambda_function.cost_optimizer.arn
+
+  input = jsonencode({
+    action = "restore"
+  })
+}
+
+resource "aws_lambda_permission" "restore_eventbridge" {
+  statement_id  = "AllowExecutionFromEventBridgeRestore"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.cost_optimizer.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.restore_schedule.arn
+}
+
+# EventBridge Rules keeping the inventory index current between reconciles.
+# Rules only see events from the provider's region, so INVENTORY_REGIONS above
+# lists just that region and the optimizer scans every other target region live.
+locals {
+  inventory_event_patterns = {
+    ec2-state = {
+      source      = ["aws.ec2"]
+      detail-type = ["EC2 Instance State-change Notification"]
+    }
+    rds-instance = {
+      source      = ["aws.rds"]
+      detail-type = ["RDS DB Instance Event"]
+    }
+    ecs-service = {
+      source      = ["aws.ecs"]
+      detail-type = ["ECS Service Action"]
+    }
+    ecs-api = {
+      source      = ["aws.ecs"]
+      detail-type = ["AWS API Call via CloudTrail"]
+      detail = {
+        eventSource = ["ecs.amazonaws.com"]
+        eventName   = ["CreateService", "UpdateService", "DeleteService"]
+      }
+    }
+    tag-change = {
+      source      = ["aws.tag"]
+      detail-type = ["Tag Change on Resource"]
+      detail = {
+        service = ["ec2", "rds", "ecs"]
+      }
+    }
+  }
+}
+
+resource "aws_cloudwatch_event_rule" "inventory" {
+  for_each = var.use_inventory ? local.inventory_event_patterns : {}
+
+  name          = "${var.project_name}-${var.environment}-inventory-${each.key}"
+  description   = "Update the cost optimizer inventory index on ${each.key} events"
+  event_pattern = jsonencode(each.value)
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "inventory" {
+  for_each = aws_cloudwatch_event_rule.inventory
+
+  rule      = each.value.name
+  target_id = "CostOptimizerInventory"
+  arn       = aws_lambda_function.cost_optimizer.arn
+}
+
+resource "aws_lambda_permission" "inventory_eventbridge" {
+  for_each = aws_cloudwatch_event_rule.inventory
+
+  statement_id  = "AllowExecutionFromEventBridgeInventory-${each.key}"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.cost_optimizer.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = each.value.arn
+}
+
+# EventBridge Rule for the daily inventory reconcile (5 PM UTC, ahead of the stop run)
+resource "aws_cloudwatch_event_rule" "inventory_reconcile" {
+  count = var.use_inventory ? 1 : 0
+
+  name                = "${var.project_name}-${var.environment}-inventory-reconcile"
+  description         = "Rebuild the cost optimizer inventory index from a full scan"
+  schedule_expression = "cron(0 17 * * ? *)"
+
+  tags = var.tags
+}
+
+resource "aws_cloudwatch_event_target" "inventory_reconcile" {
+  count = var.use_inventory ? 1 : 0
+
+  rule      = aws_cloudwatch_event_rule.inventory_reconcile[0].name
+  target_id = "CostOptimizerReconcile"
+  arn       = aws_lambda_function.cost_optimizer.arn
+
+  input = jsonencode({
+    action = "reconcile_inventory"
+  })
+}
+
+resource "aws_lambda_permission" "inventory_reconcile_eventbridge" {
+  count = var.use_inventory ? 1 : 0
+
+  statement_id  = "AllowExecutionFromEventBridgeReconcile"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.cost_optimizer.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.inventory_reconcile[0].arn
+}
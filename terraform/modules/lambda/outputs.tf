@@ -17,3 +17,13 @@ output "budget_handler_lambda_name" {
   description = "Name of budget handler Lambda function"
   value       = aws_lambda_function.budget_handler.function_name
 }
+
+output "alert_dedup_table_name" {
+  description = "Name of the budget alert deduplication table"
+  value       = aws_dynamodb_table.alert_dedup.name
+}
+
+output "inventory_table_name" {
+  description = "Name of the inventory index table, when the index is enabled"
+  value       = var.use_inventory ? aws_dynamodb_table.inventory[0].name : null
+}
@@ -46,8 +46,96 @@ variable "business_hours_end" {
   default     = "18:00"
 }
 
+variable "restore_lead_minutes" {
+  description = "How long before business hours start the restore run starts stopped resources back"
+  type        = number
+  default     = 30
+}
+
+variable "max_concurrency" {
+  description = "Maximum concurrent stop/scale API calls per cost optimizer run"
+  type        = number
+  default     = 10
+}
+
+variable "target_regions" {
+  description = "Regions the cost optimizer scans (empty for the deployment region, [\"all\"] for every enabled region)"
+  type        = list(string)
+  default     = []
+}
+
+variable "organization_mode" {
+  description = "Run the cost optimizer across every member account of the AWS Organization"
+  type        = bool
+  default     = false
+}
+
+variable "organization_role_name" {
+  description = "IAM role name the cost optimizer assumes in each member account; pass the iam module the same value"
+  type        = string
+}
+
+variable "state_bucket_name" {
+  description = "S3 bucket for cost optimizer run state such as resume checkpoints"
+  type        = string
+}
+
+variable "cost_breakdown" {
+  description = "Breakdown reported next to SERVICE in budget alerts: a Cost Explorer dimension such as LINKED_ACCOUNT or REGION, or TAG:<key>; both come from one query"
+  type        = string
+  default     = "LINKED_ACCOUNT"
+}
+
+variable "use_inventory" {
+  description = "Maintain an event-driven inventory index and read scheduled stop candidates from it. Only the provider's region has event rules; other target regions are scanned"
+  type        = bool
+  default     = false
+}
+
+variable "numpy_layer_arn" {
+  description = "Existing Lambda layer providing numpy for the spend forecast (empty uses numpy_layer.zip from `make package` if built, otherwise the forecast is skipped)"
+  type        = string
+  default     = ""
+}
+
+variable "tag_policy" {
+  description = "Tag policy JSON selecting the resources the cost optimizer acts on (empty uses the bundled tag_policy.json)"
+  type        = string
+  default     = ""
+}
+
+variable "cost_cache_ttl_seconds" {
+  description = "How long the budget handler reuses a Cost Explorer result before refreshing it"
+  type        = number
+  default     = 900
+}
+
+variable "alert_dedup_ttl_seconds" {
+  description = "How long a processed budget alert suppresses redeliveries of itself"
+  type        = number
+  default     = 86400
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
   default     = {}
 }
+
+variable "metrics_namespace" {
+  description = "CloudWatch namespace for the Lambda functions' embedded-format metrics"
+  type        = string
+  default     = "CostOptimization"
+}
+
+variable "monthly_budget_amount" {
+  description = "Monthly budget the daily spend forecast is checked against (0 disables the forecast trigger)"
+  type        = number
+  default     = 0
+}
+
+variable "forecast_trigger_ratio" {
+  description = "Share of the monthly budget the projected spend must reach to trigger the cost optimizer"
+  type        = number
+  default     = 1.0
+}
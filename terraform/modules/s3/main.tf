@@ -90,6 +90,20 @@ resource "aws_s3_bucket_lifecycle_configuration" "app_data" {
     }
   }
 
+  # Expire cost optimizer run reports
+  rule {
+    id     = "expire-run-reports"
+    status = "Enabled"
+
+    expiration {
+      days = var.report_expiration_days
+    }
+
+    filter {
+      prefix = "cost-optimizer/reports/"
+    }
+  }
+
   # Clean up incomplete multipart uploads
   rule {
     id     = "cleanup-multipart-uploads"
@@ -38,6 +38,12 @@ variable "expiration_days" {
   default     = 365
 }
 
+variable "report_expiration_days" {
+  description = "Days before cost optimizer run reports are expired"
+  type        = number
+  default     = 90
+}
+
 variable "tags" {
   description = "Tags to apply to resources"
   type        = map(string)
@@ -174,3 +174,27 @@ variable "business_hours_end" {
   type        = string
   default     = "18:00"
 }
+
+variable "target_regions" {
+  description = "Regions the cost optimizer scans (empty for the deployment region, [\"all\"] for every enabled region)"
+  type        = list(string)
+  default     = []
+}
+
+variable "organization_mode" {
+  description = "Run the cost optimizer across every member account of the AWS Organization"
+  type        = bool
+  default     = false
+}
+
+variable "organization_role_name" {
+  description = "IAM role name the cost optimizer assumes in each member account; one value for the IAM grant and the function"
+  type        = string
+  default     = "CostOptimizerMemberRole"
+}
+
+variable "use_inventory" {
+  description = "Maintain an event-driven inventory index and read scheduled stop candidates from it"
+  type        = bool
+  default     = false
+}